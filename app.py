@@ -1,16 +1,42 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 
 from fastapi.templating import Jinja2Templates
-from starlette.responses import RedirectResponse
-from pydantic import BaseModel
-import pandas as pd
+from starlette.responses import RedirectResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict, create_model, model_validator
+from typing import List, Optional
+from contextlib import asynccontextmanager
 import numpy as np
 import joblib
+import json
 from pathlib import Path
 from datetime import datetime
 from fastapi.middleware.cors import CORSMiddleware
+from ml_service.components.calendar_features import CalendarFeatures
+from ml_service.components.lag_features import LagFeatureGenerator
+from ml_service.components.segment_router import SegmentRouter
+from ml_service.components.tree_predictor import CompiledTreeEnsemble
+from ml_service.components.feature_plan import FeaturePlan, CAT_COLUMNS
+from ml_service.components.micro_batcher import MicroBatcher
+from ml_service.config.configuration import ConfigurationManager
 
-app = FastAPI()
+# Set on startup when serving.micro_batching is enabled
+batcher = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global batcher
+    batching = serving_config.micro_batching
+    if batching.enabled and feature_plan is not None:
+        batcher = MicroBatcher(predict_inputs, batching.max_batch_size, batching.max_wait_ms)
+        batcher.start()
+        print(f"✅ Micro-batching /predict: up to {batching.max_batch_size} rows or {batching.max_wait_ms} ms")
+    yield
+    if batcher is not None:
+        await batcher.stop()
+        batcher = None
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",
@@ -27,15 +53,46 @@ app.add_middleware(
 
 MODEL_DIR = Path("./artifacts/model")
 FEATURES_DIR = Path("./artifacts/features_dataTransformation")
+serving_config = ConfigurationManager().get_serving_config()
 
 try:
     scaler = joblib.load(FEATURES_DIR / "scaler.joblib")
-    model = joblib.load(MODEL_DIR / "model.joblib")
-    print("✅ Model and scaler loaded successfully")
+    # The compiled model predicts without XGBoost; fall back to the trained model
+    if (MODEL_DIR / "model_compiled.joblib").exists():
+        model = joblib.load(MODEL_DIR / "model_compiled.joblib")
+    else:
+        model = joblib.load(MODEL_DIR / "model.joblib")
+    # Holiday flags are model inputs: serving without the fitted calendar would silently zero them
+    calendar = CalendarFeatures.load(FEATURES_DIR / "calendar.joblib")
+    # Sales features of the days after the training data come from the stored lag history
+    lag_state = None
+    if any(str(name).startswith("sales_") for name in model.feature_names_in_):
+        lag_state = LagFeatureGenerator.load(FEATURES_DIR / "lag_state.joblib")
+    print("✅ Model, scaler and calendar loaded successfully")
 except Exception as e:
     print(f"❌ Error loading artifacts: {e}")
     scaler = None
     model = None
+    calendar = None
+    lag_state = None
+
+# Models trained with `encoding: categorical` take the raw columns as category codes
+vocabulary = None
+if model is not None and set(CAT_COLUMNS).issubset(model.feature_names_in_):
+    with open(FEATURES_DIR / "vocabulary.json") as f:
+        vocabulary = json.load(f)
+
+# Column sources and scaling resolved once; requests only fill a float32 matrix
+feature_plan = None
+array_input = False
+row_buffer = None
+if model is not None and scaler is not None:
+    feature_plan = FeaturePlan(model.feature_names_in_, calendar, scaler, vocabulary, lag_state)
+    # Models compiled to NumPy take the matrix as is; others get a DataFrame with names
+    served_models = model.models.values() if isinstance(model, SegmentRouter) else [model]
+    array_input = all(isinstance(m, CompiledTreeEnsemble) for m in served_models)
+    # Reused by /predict: the handler fills and predicts without yielding to the event loop
+    row_buffer = np.empty((1, len(feature_plan.feature_names)), dtype=np.float32)
 
 class PredictionInput(BaseModel):
     date: str
@@ -50,6 +107,38 @@ class PredictionInput(BaseModel):
     store_nbr: int
     cluster: int = 1
 
+# Columnar batch: one list per PredictionInput field, optional fields may be left out
+PredictionColumns = create_model(
+    "PredictionColumns",
+    __config__=ConfigDict(extra="forbid"),
+    **{name: (List[field.annotation], ...) if field.is_required() else (Optional[List[field.annotation]], None)
+       for name, field in PredictionInput.model_fields.items()}
+)
+
+class PredictionBatchInput(BaseModel):
+    """Either `rows` (a list of PredictionInput) or `columns` (field -> list of values)."""
+    rows: Optional[List[PredictionInput]] = None
+    columns: Optional[PredictionColumns] = None
+
+    @model_validator(mode="after")
+    def one_layout(self):
+        if (self.rows is None) == (self.columns is None):
+            raise ValueError("Send exactly one of 'rows' or 'columns'")
+        if self.columns is not None:
+            lengths = {len(values) for values in self.columns.model_dump(exclude_none=True).values()}
+            if len(lengths) != 1:
+                raise ValueError(f"All columns must have the same length, got lengths {sorted(lengths)}")
+        return self
+
+    def inputs(self) -> dict:
+        """{field: list of values} in request order, with defaults for omitted fields."""
+        if self.rows is not None:
+            return {name: [getattr(row, name) for row in self.rows] for name in PredictionInput.model_fields}
+        columns = self.columns.model_dump(exclude_none=True)
+        n_rows = len(next(iter(columns.values())))
+        return {name: columns[name] if name in columns else [field.default] * n_rows
+                for name, field in PredictionInput.model_fields.items()}
+
 # @app.get("/")
 # def health_check():
 #     return {"status": "healthy", "model_loaded": model is not None}
@@ -58,27 +147,57 @@ class PredictionInput(BaseModel):
 async def index():
     return RedirectResponse(url="/docs")
 
-@app.post("/predict")
-async def predict(data: PredictionInput):
+@app.middleware("http")
+async def limit_batch_payload(request: Request, call_next):
+    """Reject oversized batch bodies before they are read and parsed."""
+    if request.url.path == "/predict/batch" and request.method == "POST":
+        length = request.headers.get("content-length")
+        if length is None:
+            return JSONResponse(status_code=411, content={"detail": "Content-Length required"})
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return JSONResponse(status_code=400, content={"detail": "Invalid Content-Length"})
+        if length > serving_config.max_payload_mb * 2**20:
+            return JSONResponse(status_code=413, content={
+                "detail": f"Payload larger than {serving_config.max_payload_mb} MB"})
+    return await call_next(request)
+
+def check_model_loaded():
     if model is None or scaler is None:
         raise HTTPException(
             status_code=503,
             detail="Service Unavailable: Model not loaded"
         )
+
+def predict_inputs(inputs: dict, out: np.ndarray = None) -> np.ndarray:
+    """Predict every row of {field: list of values}, in row order"""
+    X = feature_plan.transform(inputs, out=out)
+    if not array_input:
+        X = feature_plan.frame(X)
+
+    # Per-segment models route on a raw input field
+    if isinstance(model, SegmentRouter):
+        return model.predict(X, inputs[model.column])
+    return model.predict(X)
+
+@app.post("/predict")
+async def predict(data: PredictionInput):
+    check_model_loaded()
     
     try:
-        input_dict = data.dict()
-        df = pd.DataFrame([input_dict])
-        
-        df = process_features(df)
-        
-        df = align_features(df)
-        
-        prediction = model.predict(df)
+        if batcher is not None:
+            # Scored in one model call with the requests arriving alongside it
+            predicted_sales = await batcher.submit(data.model_dump())
+        else:
+            inputs = {name: [value] for name, value in data.model_dump().items()}
+            predicted_sales = float(predict_inputs(inputs, out=row_buffer)[0])
         
         return {
             "status": "success",
-            "predicted_sales": float(prediction[0]),
+            "predicted_sales": predicted_sales,
             "message": "Prediction successful"
         }
         
@@ -88,55 +207,42 @@ async def predict(data: PredictionInput):
             detail=f"Prediction error: {str(e)}"
         )
 
-def process_features(df: pd.DataFrame) -> pd.DataFrame:
-    """Apply all feature engineering steps"""
-    df["date"] = pd.to_datetime(df["date"])
-    df["year"] = df["date"].dt.year
-    df["month"] = df["date"].dt.month
-    df["day"] = df["date"].dt.day
-    df["day_of_week"] = df["date"].dt.dayofweek
-    df["is_weekend"] = (df["day_of_week"] >= 5).astype(int)
-    df["day_of_year"] = df["date"].dt.dayofyear
-    df["is_month_start"] = df["date"].dt.is_month_start.astype(int)
-    df["is_month_end"] = df["date"].dt.is_month_end.astype(int)
-    
-    df["month_sin"] = np.sin(2 * np.pi * df["month"] / 12)
-    df["month_cos"] = np.cos(2 * np.pi * df["month"] / 12)
-    df["day_of_week_sin"] = np.sin(2 * np.pi * df["day_of_week"] / 7)
-    df["day_of_week_cos"] = np.cos(2 * np.pi * df["day_of_week"] / 7)
-    
-    
-    df["onpromotion_trend"] = df["onpromotion"] * df["day_of_year"]
-    df["month_sales_interaction"] = 0
-    
-    return df
+@app.get("/metrics/batching")
+async def batching_metrics():
+    """Batch-size distribution and queue wait of the /predict micro-batcher"""
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.metrics()}
 
-def align_features(df: pd.DataFrame) -> pd.DataFrame:
-    """Ensure the DataFrame has all expected columns"""
-    cat_columns = ["family", "state", "city", "type_x", "type_y"]
-    df = pd.get_dummies(df, columns=cat_columns, drop_first=True, dtype=int)
-    
-    expected_columns = model.feature_names_in_
-    
-    for col in expected_columns:
-        if col not in df.columns:
-            df[col] = 0
-    
-    df = df[expected_columns]
-    
-    scale_columns = [
-        col for col in df.columns 
-        if any(x in col for x in [
-            "sales_lag_", "sales_roll", "sales_expanding",
-            "onpromotion_trend", "month_sales_interaction",
-            "dcoilwtico", "transactions"
-        ])
-    ]
-    
-    if scale_columns:
-        df[scale_columns] = scaler.transform(df[scale_columns])
-    
-    return df
+@app.post("/predict/batch")
+async def predict_batch(data: PredictionBatchInput):
+    """Predict many rows with one feature matrix and one model call"""
+    check_model_loaded()
+
+    inputs = data.inputs()
+    n_rows = len(inputs["date"])
+    if n_rows > serving_config.max_batch_rows:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {n_rows} rows exceeds the limit of {serving_config.max_batch_rows}"
+        )
+
+    try:
+        # Featurized and scored on a worker thread, so the event loop keeps serving other requests
+        predictions = await run_in_threadpool(predict_inputs, inputs)
+
+        return {
+            "status": "success",
+            "count": len(predictions),
+            "predicted_sales": np.asarray(predictions, dtype=np.float64).tolist(),
+            "message": "Prediction successful"
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Prediction error: {str(e)}"
+        )
 
 if __name__ == "__main__":
     import uvicorn
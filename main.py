@@ -3,11 +3,18 @@ from ml_service.pipeline.stage_01_data_acquisition import DataAcquisitionTrainin
 from ml_service.pipeline.stage_02_data_preprocessing import DataPreprocessingTrainingPipeline 
 from ml_service.pipeline.stage_03_featureEngineering_and_dataTransformation import FeatureEngineeringTrainingPipeline
 from ml_service.pipeline.stage_04_modelBuilding_and_training import ModelBuildingAndEvaluationTrainingPipeline
+from ml_service.pipeline.stage_05_model_tuning import ModelTuningTrainingPipeline
+from ml_service.pipeline.stage_06_backend_benchmark import BackendBenchmarkTrainingPipeline
+from ml_service.config.configuration import ConfigurationManager
+from ml_service.utils.stage_cache import StageCache
 
 import sys
 import io
 
 
+# Stages whose inputs, settings and code are unchanged since their last run are skipped
+stage_cache = StageCache(ConfigurationManager().get_stage_cache_config())
+
 STAGE_NAME = "Data Acquisition Stage"
 try:
         logging.info("*******************************")
@@ -26,7 +33,7 @@ try:
         logging.info("*******************************")
         logging.info(f">>>>>>> stage {STAGE_NAME} started <<<<<<")
         obj = DataPreprocessingTrainingPipeline()
-        obj.main()
+        stage_cache.run(STAGE_NAME, obj.main, obj.cache_spec())
         logging.info(f">>>>>>> stage {STAGE_NAME} completed <<<<<<")
 except Exception as e:
         logging.exception(e)
@@ -38,7 +45,7 @@ try:
         logging.info("*******************************")
         logging.info(f">>>>>>> stage {STAGE_NAME} started <<<<<<")
         obj = FeatureEngineeringTrainingPipeline()
-        obj.main()
+        stage_cache.run(STAGE_NAME, obj.main, obj.cache_spec())
         logging.info(f">>>>>>> stage {STAGE_NAME} completed <<<<<<")
 except Exception as e:
         logging.exception(e)
@@ -51,8 +58,36 @@ try:
         logging.info("*******************************")
         logging.info(f">>>>>>> stage {STAGE_NAME} started <<<<<<")
         pipeline = ModelBuildingAndEvaluationTrainingPipeline()
-        pipeline.main()
+        stage_cache.run(STAGE_NAME, pipeline.main, pipeline.cache_spec())
         logging.info(f">>>>>>> stage {STAGE_NAME} completed <<<<<<")
 except Exception as e:
         logging.exception(e)
-        raise e
\ No newline at end of file
+        raise e
+
+
+
+STAGE_NAME = "Model Tuning Stage"
+if ConfigurationManager().get_model_tuning_config().enabled:
+    try:
+            logging.info("*******************************")
+            logging.info(f">>>>>>> stage {STAGE_NAME} started <<<<<<")
+            pipeline = ModelTuningTrainingPipeline()
+            stage_cache.run(STAGE_NAME, pipeline.main, pipeline.cache_spec())
+            logging.info(f">>>>>>> stage {STAGE_NAME} completed <<<<<<")
+    except Exception as e:
+            logging.exception(e)
+            raise e
+
+
+
+STAGE_NAME = "Backend Benchmark Stage"
+if ConfigurationManager().get_backend_benchmark_config().enabled:
+    try:
+            logging.info("*******************************")
+            logging.info(f">>>>>>> stage {STAGE_NAME} started <<<<<<")
+            pipeline = BackendBenchmarkTrainingPipeline()
+            stage_cache.run(STAGE_NAME, pipeline.main, pipeline.cache_spec())
+            logging.info(f">>>>>>> stage {STAGE_NAME} completed <<<<<<")
+    except Exception as e:
+            logging.exception(e)
+            raise e
@@ -0,0 +1,28 @@
+"""Run the end-to-end pipeline benchmark (settings: pipelineBenchmark in config/config.yaml).
+
+    python -m ml_service.benchmark                      # every scale, compared with the baseline
+    python -m ml_service.benchmark --scale small        # one scale (repeatable)
+    python -m ml_service.benchmark --update-baseline    # store this run as the new baseline
+
+Exits with status 1 when a measure regressed beyond the tolerance.
+"""
+import argparse
+import sys
+from ml_service.config.configuration import ConfigurationManager
+from ml_service.benchmark.pipeline_benchmark import PipelineBenchmark
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m ml_service.benchmark",
+                                     description="Benchmark pipeline stages 1-4 on synthetic data")
+    parser.add_argument("--scale", action="append", help="scale name from pipelineBenchmark.scales")
+    parser.add_argument("--update-baseline", action="store_true", help="save this run as the baseline")
+    args = parser.parse_args()
+
+    benchmark = PipelineBenchmark(ConfigurationManager().get_pipeline_benchmark_config(), scales=args.scale)
+    report = benchmark.run(update_baseline=args.update_baseline)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import importlib
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+import pandas as pd
+from ml_service.constants import CONFIG_FILE_PATH, PARAMS_FILE_PATH
+from ml_service.utils.main_utils import read_yaml, save_yaml, save_json, load_json
+from ml_service.benchmark.synthetic_data import SyntheticSalesData
+
+
+# Stage name, pipeline module and class, and the config section whose root_dir holds the stage's artifacts
+STAGES = [
+    ("Data Acquisition Stage", "ml_service.pipeline.stage_01_data_acquisition",
+     "DataAcquisitionTrainingPipeline", "data_acquisition"),
+    ("Data Preprocessing Stage", "ml_service.pipeline.stage_02_data_preprocessing",
+     "DataPreprocessingTrainingPipeline", "data_preprocessing"),
+    ("Feature Engineering & Data Transformation", "ml_service.pipeline.stage_03_featureEngineering_and_dataTransformation",
+     "FeatureEngineeringTrainingPipeline", "features_dataTransformation"),
+    ("Model Building and Evaluation Stage", "ml_service.pipeline.stage_04_modelBuilding_and_training",
+     "ModelBuildingAndEvaluationTrainingPipeline", "modelBuildingAndEvaluation"),
+]
+
+# Stage measures compared with the baseline (higher is worse for all of them)
+MEASURES = ["wall_seconds", "peak_rss_mb", "artifact_mb"]
+
+
+def _size_mb(path: Path) -> float:
+    path = Path(path)
+    if not path.exists():
+        return 0.0
+    if path.is_file():
+        return path.stat().st_size / 2**20
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file()) / 2**20
+
+
+def _run_stage(workspace: str, module: str, class_name: str) -> Dict:
+    """Run one pipeline stage inside `workspace` and measure it (in a fresh interpreter process)."""
+    os.chdir(workspace)
+    pipeline = getattr(importlib.import_module(module), class_name)()
+
+    start = time.perf_counter()
+    pipeline.main()
+    wall_seconds = time.perf_counter() - start
+
+    # ru_maxrss is in KB on Linux; CHILDREN is the largest worker process the stage started
+    return {
+        "wall_seconds": wall_seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "worker_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }
+
+
+class PipelineBenchmark:
+    """Wall time, peak memory and artifact size of stages 1-4 at several data scales.
+
+    For every scale a workspace is created under `root_dir` with the project
+    config (stage cache disabled, MLflow tracking local) and params, and
+    filled with synthetic raw files, so stage 1 finds its data and skips the
+    download. Each stage then
+    runs in its own freshly spawned process: its peak RSS is not inflated by
+    the generator or earlier stages, and imports are not timed.
+
+    The report is compared measure by measure with the stored baseline of
+    the same scale; anything more than `tolerance` above its baseline is a
+    regression.
+    """
+
+    def __init__(self, config, scales: Optional[List[str]] = None) -> None:
+        self.config = config
+        unknown = set(scales or []) - set(config.scales)
+        if unknown:
+            raise ValueError(f"Unknown benchmark scales {sorted(unknown)}. Expected any of {list(config.scales)}")
+        self.scales = {name: config.scales[name] for name in (scales or config.scales)}
+        self.project_config = read_yaml(CONFIG_FILE_PATH).to_dict()
+
+    def prepare_workspace(self, name: str, scale: Dict[str, int]):
+        """Fresh workspace for a scale with config, params and generated raw files."""
+        workspace = Path(self.config.root_dir).resolve() / name
+        shutil.rmtree(workspace, ignore_errors=True)
+        (workspace / "config").mkdir(parents=True)
+
+        # Benchmark runs are tracked inside the workspace, not on the project's tracking server
+        config = {**self.project_config,
+                  "stage_cache": {**self.project_config.get("stage_cache", {}), "enabled": False},
+                  "experimentTracking": {**self.project_config.get("experimentTracking", {}),
+                                         "tracking_uri": "sqlite:///mlflow.db", "dagshub_repo": ""}}
+        save_yaml(workspace / CONFIG_FILE_PATH, config)
+        shutil.copy(PARAMS_FILE_PATH, workspace / PARAMS_FILE_PATH)
+
+        start = time.perf_counter()
+        data = SyntheticSalesData(**scale, end_date=self.config.end_date, test_days=self.config.test_days,
+                                  seed=self.config.seed)
+        rows = data.write(workspace / config["data_acquisition"]["local_dir"])
+        return workspace, rows, time.perf_counter() - start
+
+    def run_scale(self, name: str, scale: Dict[str, int]) -> Dict:
+        workspace, rows, generate_seconds = self.prepare_workspace(name, scale)
+        print(f"✅ [{name}] Generated {rows['train']} train rows in {generate_seconds:.1f}s: {workspace}")
+
+        stages = []
+        # Spawned, not forked, so a stage does not start with this process's memory
+        context = multiprocessing.get_context("spawn")
+        for stage_name, module, class_name, section in STAGES:
+            print(f"⏳ [{name}] {stage_name}")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(_run_stage, str(workspace), module, class_name).result()
+            result["artifact_mb"] = _size_mb(workspace / self.project_config[section]["root_dir"])
+            stages.append({"stage": stage_name, **result})
+
+        return {"scale": scale, "rows": rows, "generate_seconds": generate_seconds, "stages": stages}
+
+    def compare(self, report: Dict, baseline: Dict) -> List[Dict]:
+        """Every measure of every stage next to its baseline, flagged when above the tolerance."""
+        comparison = []
+        for name, result in report["scales"].items():
+            previous = baseline.get("scales", {}).get(name)
+            if previous is None or previous["scale"] != result["scale"]:
+                print(f"⚠️ No baseline for scale '{name}' {result['scale']}")
+                continue
+
+            previous_stages = {stage["stage"]: stage for stage in previous["stages"]}
+            for stage in result["stages"]:
+                if stage["stage"] not in previous_stages:
+                    continue
+                for measure in MEASURES:
+                    current, before = stage[measure], previous_stages[stage["stage"]][measure]
+                    if measure == "wall_seconds" and max(current, before) < self.config.min_seconds:
+                        continue
+                    ratio = current / before if before else (1.0 if not current else float("inf"))
+                    comparison.append({"scale": name, "stage": stage["stage"], "measure": measure,
+                                       "baseline": before, "current": current, "ratio": ratio,
+                                       "regression": ratio > 1 + self.config.tolerance})
+        return comparison
+
+    def run(self, update_baseline: bool = False) -> Dict:
+        """Benchmark every scale, write the report, and compare it with (or store it as) the baseline."""
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count(),
+            "scales": {name: self.run_scale(name, scale) for name, scale in self.scales.items()},
+        }
+
+        for name, result in report["scales"].items():
+            print(f"\n[{name}] {result['scale']}")
+            print(pd.DataFrame(result["stages"]).set_index("stage").round(2).to_string())
+
+        baseline_file = Path(self.config.baseline_file)
+        if baseline_file.exists() and not update_baseline:
+            baseline = load_json(baseline_file).to_dict()
+            if (baseline.get("cpus"), baseline.get("python")) != (report["cpus"], report["python"]):
+                print(f"⚠️ Baseline was measured with {baseline.get('cpus')} CPUs / Python {baseline.get('python')}, "
+                      f"this run with {report['cpus']} / {report['python']}")
+            report["comparison"] = self.compare(report, baseline)
+            report["regressions"] = [row for row in report["comparison"] if row["regression"]]
+            for row in report["regressions"]:
+                print(f"❌ Regression [{row['scale']}] {row['stage']} {row['measure']}: "
+                      f"{row['baseline']:.2f} -> {row['current']:.2f} (x{row['ratio']:.2f})")
+            if not report["regressions"]:
+                print(f"✅ No regressions against {baseline_file} (tolerance {self.config.tolerance:.0%})")
+
+        Path(self.config.report_file).parent.mkdir(parents=True, exist_ok=True)
+        save_json(Path(self.config.report_file), report)
+        print(f"✅ Benchmark report saved to: {self.config.report_file}")
+
+        if update_baseline:
+            baseline_file.parent.mkdir(parents=True, exist_ok=True)
+            save_json(baseline_file, report)
+            print(f"✅ Baseline saved to: {baseline_file}")
+        return report
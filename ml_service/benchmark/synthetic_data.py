@@ -0,0 +1,207 @@
+from pathlib import Path
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+
+# The 33 product families and 22 cities (with their states) of the Kaggle data
+FAMILIES = [
+    "AUTOMOTIVE", "BABY CARE", "BEAUTY", "BEVERAGES", "BOOKS", "BREAD/BAKERY", "CELEBRATION", "CLEANING",
+    "DAIRY", "DELI", "EGGS", "FROZEN FOODS", "GROCERY I", "GROCERY II", "HARDWARE", "HOME AND KITCHEN I",
+    "HOME AND KITCHEN II", "HOME APPLIANCES", "HOME CARE", "LADIESWEAR", "LAWN AND GARDEN", "LINGERIE",
+    "LIQUOR,WINE,BEER", "MAGAZINES", "MEATS", "PERSONAL CARE", "PET SUPPLIES", "PLAYERS AND ELECTRONICS",
+    "POULTRY", "PREPARED FOODS", "PRODUCE", "SCHOOL AND OFFICE SUPPLIES", "SEAFOOD",
+]
+CITIES = {
+    "Quito": "Pichincha", "Guayaquil": "Guayas", "Cuenca": "Azuay", "Santo Domingo": "Santo Domingo de los Tsachilas",
+    "Manta": "Manabi", "Machala": "El Oro", "Latacunga": "Cotopaxi", "Ambato": "Tungurahua",
+    "Riobamba": "Chimborazo", "Loja": "Loja", "Babahoyo": "Los Rios", "Quevedo": "Los Rios", "Daule": "Guayas",
+    "Libertad": "Guayas", "Playas": "Guayas", "Salinas": "Santa Elena", "Esmeraldas": "Esmeraldas",
+    "Ibarra": "Imbabura", "Cayambe": "Pichincha", "El Carmen": "Manabi", "Guaranda": "Bolivar", "Puyo": "Pastaza",
+}
+# Families sold by weight have fractional sales
+WEIGHED_FAMILIES = {"DELI", "MEATS", "POULTRY", "PREPARED FOODS", "PRODUCE", "SEAFOOD"}
+
+# Yearly national calendar: (month-day, type, description)
+NATIONAL_HOLIDAYS = [
+    ("01-01", "Holiday", "Primer dia del ano"), ("05-01", "Holiday", "Dia del Trabajo"),
+    ("05-24", "Holiday", "Batalla de Pichincha"), ("08-10", "Holiday", "Primer Grito de Independencia"),
+    ("10-09", "Holiday", "Independencia de Guayaquil"), ("11-02", "Holiday", "Dia de Difuntos"),
+    ("11-03", "Holiday", "Independencia de Cuenca"), ("12-25", "Holiday", "Navidad"),
+    ("12-24", "Additional", "Navidad-1"), ("12-26", "Additional", "Navidad+1"),
+    ("12-31", "Additional", "Primer dia del ano-1"), ("05-13", "Event", "Dia de la Madre"),
+]
+
+# Relative sales by day of week (Monday first) and on the 15th / last day of the month (paydays)
+WEEKDAY_FACTORS = np.array([1.0, 0.93, 0.95, 0.9, 1.02, 1.2, 1.25])
+PAYDAY_FACTOR = 1.12
+
+
+class SyntheticSalesData:
+    """Kaggle-schema store sales data of any size, generated with vectorized NumPy.
+
+    Writes train, test, stores, oil, holidays_events, transactions and
+    sample_submission CSVs with the columns, dtypes and row order of the
+    competition files for `stores` x `families` x `days` (the train period
+    ends on `end_date`, Christmas days are left out as in the original).
+    Sales combine a per store/family level with weekly and yearly
+    seasonality, paydays, holidays, promotions, a trend, late store openings
+    and zero-inflated noise, so the features and model have signal to fit.
+    The same seed gives the same files.
+    """
+
+    def __init__(self, stores: int = 54, families: int = 33, days: int = 1688, end_date: str = "2017-08-15",
+                 test_days: int = 16, seed: int = 42) -> None:
+        if not 1 <= stores <= 127:
+            raise ValueError(f"stores must be between 1 and 127 (store_nbr is int8 in the schema), got {stores}")
+        if not 1 <= families <= len(FAMILIES):
+            raise ValueError(f"families must be between 1 and {len(FAMILIES)}, got {families}")
+        self.n_stores = stores
+        self.families = FAMILIES[:families]
+        self.end_date = pd.Timestamp(end_date)
+        self.dates = pd.date_range(end=self.end_date, periods=days, freq="D")
+        self.dates = self.dates[~((self.dates.month == 12) & (self.dates.day == 25))]
+        self.test_dates = pd.date_range(self.end_date + pd.Timedelta(days=1), periods=test_days, freq="D")
+        self.rng = np.random.default_rng(seed)
+
+    def stores(self) -> pd.DataFrame:
+        cities = np.array(list(CITIES))
+        # About a third of the stores are in Quito, as in the original data
+        weights = np.full(len(cities), 0.5 / (len(cities) - 2))
+        weights[:2] = [0.33, 0.17]
+        city = self.rng.choice(cities, self.n_stores, p=weights / weights.sum())
+        return pd.DataFrame({
+            "store_nbr": np.arange(1, self.n_stores + 1),
+            "city": city,
+            "state": [CITIES[name] for name in city],
+            "type": self.rng.choice(list("ABCDE"), self.n_stores, p=[0.17, 0.15, 0.28, 0.33, 0.07]),
+            "cluster": self.rng.integers(1, 18, self.n_stores),
+        })
+
+    def holidays_events(self, stores: pd.DataFrame) -> pd.DataFrame:
+        years = np.arange(self.dates[0].year, self.test_dates[-1].year + 1)
+        national = pd.DataFrame(NATIONAL_HOLIDAYS, columns=["month_day", "type", "description"])
+        national = national.assign(locale="National", locale_name="Ecuador")
+
+        # One founding day per city and provincialization day per state, on the same date every year
+        cities = sorted(stores["city"].unique())
+        states = sorted(stores["state"].unique())
+        month_days = pd.date_range("2001-01-01", "2001-12-31").strftime("%m-%d").to_numpy()
+        local = pd.DataFrame({"month_day": self.rng.choice(month_days, len(cities)), "type": "Holiday",
+                              "description": [f"Fundacion de {city}" for city in cities],
+                              "locale": "Local", "locale_name": cities})
+        regional = pd.DataFrame({"month_day": self.rng.choice(month_days, len(states)), "type": "Holiday",
+                                 "description": [f"Provincializacion de {state}" for state in states],
+                                 "locale": "Regional", "locale_name": states})
+
+        template = pd.concat([national, local, regional], ignore_index=True)
+        calendar = template.merge(pd.DataFrame({"year": years}), how="cross")
+        calendar["date"] = pd.to_datetime(calendar["year"].astype(str) + "-" + calendar["month_day"],
+                                          errors="coerce")
+        calendar["transferred"] = False
+
+        # Independence day is moved to the Friday before, every year
+        moved = calendar[calendar["description"] == "Primer Grito de Independencia"].copy()
+        calendar.loc[moved.index, "transferred"] = True
+        moved["date"] = moved["date"] - pd.to_timedelta((moved["date"].dt.dayofweek - 4) % 7, unit="D")
+        moved["type"] = "Transfer"
+        moved["description"] = "Traslado Primer Grito de Independencia"
+
+        events = pd.concat([calendar, moved], ignore_index=True).dropna(subset=["date"])
+        events = events[events["date"] <= self.test_dates[-1]].sort_values("date", kind="stable")
+        return events[["date", "type", "locale", "locale_name", "description", "transferred"]]
+
+    def oil(self) -> pd.DataFrame:
+        dates = pd.bdate_range(self.dates[0], self.test_dates[-1])
+        price = np.clip(95 + np.cumsum(self.rng.normal(-0.03, 1.2, len(dates))), 20, 120)
+        price = np.round(price, 2)
+        price[self.rng.random(len(dates)) < 0.03] = np.nan
+        price[0] = np.nan
+        return pd.DataFrame({"date": dates, "dcoilwtico": price})
+
+    def train_and_test(self, stores: pd.DataFrame, holidays: pd.DataFrame):
+        """Train and test rows (date, store, family order) plus each store's first day open."""
+        n_dates, n_stores, n_families = len(self.dates), self.n_stores, len(self.families)
+        all_dates = self.dates.append(self.test_dates)
+        total = len(all_dates)
+
+        # Late openings: some stores sell nothing before a date in the first half of the data
+        opening = np.zeros(n_stores, dtype=np.int64)
+        late = self.rng.random(n_stores) < 0.1
+        opening[late] = self.rng.integers(1, max(2, n_dates // 2), late.sum())
+
+        # Per-day factors shared by every store and family
+        day_of_year = all_dates.dayofyear.to_numpy()
+        years = (all_dates - all_dates[0]).days.to_numpy() / 365.25
+        national = holidays.loc[(holidays["locale"] == "National") & ~holidays["transferred"], "date"]
+        day_factor = (WEEKDAY_FACTORS[all_dates.dayofweek.to_numpy()]
+                      * (1 + 0.08 * np.sin(2 * np.pi * day_of_year / 365.25))
+                      * np.where((all_dates.day == 15) | all_dates.is_month_end, PAYDAY_FACTOR, 1.0)
+                      * np.where(all_dates.isin(national), 1.3, 1.0)
+                      * np.where((all_dates.month == 12) & (all_dates.day >= 15), 1.35, 1.0)
+                      * (1 + 0.06 * years))
+        day_factor[(all_dates.month == 1) & (all_dates.day == 1)] = 0.0   # stores closed
+
+        family_level = np.exp(self.rng.normal(2.5, 1.6, n_families))
+        family_zero_rate = np.clip(0.6 - 0.12 * np.log1p(family_level), 0.01, 0.9)
+        store_level = np.exp(self.rng.normal(0, 0.45, n_stores)) * stores["type"].map(
+            {"A": 1.6, "B": 1.1, "C": 0.8, "D": 1.0, "E": 0.7}).to_numpy()
+        promo_rate = self.rng.gamma(0.6, 4, n_families)
+        # Promotions are recorded from about a fifth into the data on
+        promo_start = int(total * 0.2)
+
+        # Rows in date, store, family order; one index array per dimension
+        d = np.repeat(np.arange(total), n_stores * n_families)
+        s = np.tile(np.repeat(np.arange(n_stores), n_families), total)
+        f = np.tile(np.arange(n_families), total * n_stores)
+
+        onpromotion = self.rng.poisson(promo_rate[f] * store_level[s] * (d >= promo_start)).astype(np.int16)
+        mean = family_level[f] * store_level[s] * day_factor[d] * (1 + 0.04 * np.minimum(onpromotion, 50))
+        sales = self.rng.gamma(3.0, mean / 3.0)
+        sales[(d < opening[s]) | (self.rng.random(len(d)) < family_zero_rate[f])] = 0.0
+        weighed = np.isin(np.array(self.families), list(WEIGHED_FAMILIES))
+        sales = np.where(weighed[f], np.round(sales, 3), np.round(sales))
+
+        rows = pd.DataFrame({
+            "id": np.arange(len(d), dtype=np.int64),
+            "date": all_dates[d],
+            "store_nbr": s + 1,
+            "family": pd.Categorical.from_codes(f, self.families),
+            "sales": sales,
+            "onpromotion": onpromotion,
+        })
+        is_train = d < n_dates
+        train = rows[is_train]
+        test = rows[~is_train].drop(columns="sales")
+        return train, test, opening
+
+    def transactions(self, train: pd.DataFrame, opening: np.ndarray) -> pd.DataFrame:
+        """Tickets per open store and day, loosely following its sales; closed days have no row."""
+        per_store = train.groupby(["date", "store_nbr"], sort=True, observed=True)["sales"].sum().reset_index()
+        store = per_store["store_nbr"].to_numpy() - 1
+        day = (per_store["date"] - self.dates[0]).dt.days.to_numpy()
+        tickets = (600 + per_store["sales"].to_numpy() / 3) * self.rng.lognormal(0, 0.1, len(per_store))
+        open_days = (per_store["sales"].to_numpy() > 0) & (day >= opening[store])
+        per_store["transactions"] = np.clip(np.round(tickets), 1, 32767).astype(np.int16)
+        return per_store.loc[open_days, ["date", "store_nbr", "transactions"]]
+
+    def write(self, out_dir: Path) -> Dict[str, int]:
+        """Write the raw CSVs into `out_dir`; returns the rows of each file."""
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        stores = self.stores()
+        holidays = self.holidays_events(stores)
+        train, test, opening = self.train_and_test(stores, holidays)
+        tables = {
+            "train": train,
+            "test": test,
+            "stores": stores,
+            "oil": self.oil(),
+            "holidays_events": holidays,
+            "transactions": self.transactions(train, opening),
+            "sample_submission": pd.DataFrame({"id": test["id"], "sales": 0.0}),
+        }
+        for name, table in tables.items():
+            table.to_csv(out_dir / f"{name}.csv", index=False, date_format="%Y-%m-%d")
+        return {name: len(table) for name, table in tables.items()}
@@ -0,0 +1,146 @@
+import multiprocessing
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+import joblib
+import numpy as np
+import pandas as pd
+from ml_service.utils.main_utils import save_json
+from ml_service.components.model_backends import get_backend
+from ml_service.components.modelBuilding_and_evaluation import (ModelBuildingAndEvaluation, regression_metrics,
+                                                                cpu_budget)
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident memory of this process so far.
+
+    On Linux this is VmHWM, which starts over when the worker execs. ru_maxrss
+    (KB on Linux) is kept across exec, so a spawned worker would report the
+    peak of the process it was forked from.
+    """
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _benchmark_backend(model_config, backend_name: str, train_entry: Path, valid_entry: Path,
+                       batch_repeats: int, single_row_repeats: int) -> Dict:
+    """Fit, save and time one backend on the cached matrices (runs in a fresh worker process)."""
+    process = ModelBuildingAndEvaluation(model_config)
+    cache = process.matrix_cache()
+    X, y = cache.frame(train_entry)
+    X_val, y_val = cache.frame(valid_entry)
+
+    backend = get_backend(backend_name)
+    try:
+        model = backend.build(model_config.all_params, categorical=model_config.encoding == "categorical")
+    except ImportError as e:
+        return {"backend": backend_name, "error": str(e)}
+
+    rss_before = _peak_rss_mb()
+    start = time.perf_counter()
+    rounds = process.early_stopping_rounds() if backend.early_stopping else None
+    backend.fit(model, X, y, eval_set=[(X_val, y_val)] if rounds else None, early_stopping_rounds=rounds,
+                eval_metric=process.eval_metric())
+    fit_seconds = time.perf_counter() - start
+    peak_rss = _peak_rss_mb()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "model.joblib"
+        joblib.dump(model, path)
+        model_size = path.stat().st_size / 2**20
+
+    batch_times = []
+    for _ in range(batch_repeats):
+        start = time.perf_counter()
+        predictions = model.predict(X_val)
+        batch_times.append(time.perf_counter() - start)
+
+    # One-row frames are sliced up front so only predict is timed
+    rows = [X_val.iloc[[i % len(X_val)]] for i in range(single_row_repeats)]
+    row_times = []
+    for row in rows:
+        start = time.perf_counter()
+        model.predict(row)
+        row_times.append(time.perf_counter() - start)
+
+    return {
+        "backend": backend_name,
+        "fit_seconds": fit_seconds,
+        "best_iteration": backend.best_iteration(model),
+        "peak_rss_mb": peak_rss,
+        "fit_rss_growth_mb": peak_rss - rss_before,
+        "model_size_mb": model_size,
+        "batch_rows": len(X_val),
+        "batch_predict_ms": min(batch_times) * 1e3,
+        "batch_rows_per_second": len(X_val) / min(batch_times),
+        "single_row_predict_us_p50": float(np.percentile(row_times, 50)) * 1e6,
+        "single_row_predict_us_p95": float(np.percentile(row_times, 95)) * 1e6,
+        **regression_metrics(y_val, predictions),
+    }
+
+
+class BackendBenchmark:
+    """Measured train/infer cost of each model backend on the same data.
+
+    Every backend in `backends` is fit on the cached train matrix of stage 4
+    (rows before validation_start, params from params.yaml, early-stopped on
+    the validation split where it can) and scored on the cached validation
+    matrix. Reports fit time, peak resident memory, joblib model size, batch
+    and single-row predict latency, and RMSE/MAE/RMSLE.
+
+    Backends run one after another, each in a fresh process with all CPUs,
+    so timings do not compete and peak memory is the backend's own (the
+    loaded matrices included; `fit_rss_growth_mb` is what fitting added on
+    top). A backend whose library is not installed is reported as an error.
+    """
+
+    def __init__(self, config, model_config) -> None:
+        self.config = config
+        self.model_config = model_config
+        self.process = ModelBuildingAndEvaluation(model_config)
+
+    def load_entries(self):
+        """Train and validation entries of the training matrix cache (built on first use)."""
+        self.process.load_vocabulary()
+        cache = self.process.matrix_cache()
+        val_start, val_end = self.process.validation_range()
+        train_entry = self.process.cached_rows(cache, (None, val_start), name="train")
+        self.process.feature_columns = cache.meta(train_entry)["feature_names"]
+        return train_entry, self.process.cached_rows(cache, (val_start, val_end), name="valid")
+
+    def run(self) -> List[Dict]:
+        """Benchmark every configured backend and write the report."""
+        train_entry, valid_entry = self.load_entries()
+        cache = self.process.matrix_cache()
+
+        results = []
+        # Spawned, not forked, so a backend's peak RSS does not include this process's memory
+        context = multiprocessing.get_context("spawn")
+        for backend_name in self.config.backends:
+            print(f"⏳ Benchmarking {backend_name}")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(_benchmark_backend, self.model_config, backend_name, train_entry, valid_entry,
+                                     self.config.batch_repeats, self.config.single_row_repeats).result()
+            if "error" in result:
+                print(f"⚠️ Skipped {backend_name}: {result['error']}")
+            results.append(result)
+
+        Path(self.config.root_dir).mkdir(parents=True, exist_ok=True)
+        save_json(Path(self.config.report_file), {
+            "train_rows": cache.meta(train_entry)["rows"],
+            "valid_rows": cache.meta(valid_entry)["rows"],
+            "features": len(self.process.feature_columns),
+            "cpus": cpu_budget(),
+            "results": results,
+        })
+
+        print(pd.DataFrame(results).set_index("backend").round(4).to_string())
+        print(f"✅ Backend benchmark saved to: {self.config.report_file}")
+        return results
@@ -0,0 +1,92 @@
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+import joblib
+from ml_service.components.data_ingestion import DEFAULT_DATE_FORMAT, read_raw_file
+
+
+class CalendarFeatures:
+    """Calendar and holiday features computed once per distinct date and broadcast to rows.
+
+    The sales data has millions of rows but only a couple of thousand distinct
+    dates, so every date feature is computed on the unique dates and gathered
+    back to the rows through the date codes. Training (feature engineering
+    stage) and serving (`app.py`) share the same fitted object, saved with
+    `save` and restored with `load`.
+    """
+
+    COLUMNS = [
+        "year", "day", "is_weekend", "day_of_year", "is_month_start", "is_month_end",
+        "month_sin", "month_cos", "day_of_week_sin", "day_of_week_cos",
+        "is_holiday", "is_event", "is_work_day",
+    ]
+
+    HOLIDAY_TYPES = ["Holiday", "Additional", "Bridge", "Transfer"]
+
+    def __init__(self, holidays: Optional[pd.DataFrame] = None) -> None:
+        """
+        Args:
+            holidays (pd.DataFrame, optional): holidays_events data. Only national,
+                non-transferred days are used for the flags.
+        """
+        self.holiday_dates = pd.DatetimeIndex([])
+        self.event_dates = pd.DatetimeIndex([])
+        self.work_dates = pd.DatetimeIndex([])
+
+        if holidays is not None:
+            national = holidays[holidays["locale"].astype(str) == "National"]
+            if "transferred" in national.columns:
+                national = national[~national["transferred"].astype(bool)]
+            dates = pd.to_datetime(national["date"])
+            types = national["type"].astype(str)
+            self.holiday_dates = pd.DatetimeIndex(dates[types.isin(self.HOLIDAY_TYPES)].unique())
+            self.event_dates = pd.DatetimeIndex(dates[types == "Event"].unique())
+            self.work_dates = pd.DatetimeIndex(dates[types == "Work Day"].unique())
+
+    @classmethod
+    def from_file(cls, holidays_file: Path, dtype: Optional[Dict[str, str]] = None,
+                  date_format: str = DEFAULT_DATE_FORMAT) -> "CalendarFeatures":
+        """Build from the raw holidays_events.csv file, read with the data_acquisition schema and date format."""
+        return cls(read_raw_file(holidays_file, dtype, date_format))
+
+    def table(self, dates) -> pd.DataFrame:
+        """Compute all calendar features for the given dates, one row per date."""
+        dates = pd.DatetimeIndex(dates)
+        month = dates.month.to_numpy()
+        day_of_week = dates.dayofweek.to_numpy()
+
+        return pd.DataFrame({
+            "year": dates.year.to_numpy().astype(np.int16),
+            "day": dates.day.to_numpy().astype(np.int8),
+            "is_weekend": (day_of_week >= 5).astype(np.int8),
+            "day_of_year": dates.dayofyear.to_numpy().astype(np.int16),
+            "is_month_start": dates.is_month_start.astype(np.int8),
+            "is_month_end": dates.is_month_end.astype(np.int8),
+            "month_sin": np.sin(2 * np.pi * month / 12),
+            "month_cos": np.cos(2 * np.pi * month / 12),
+            "day_of_week_sin": np.sin(2 * np.pi * day_of_week / 7),
+            "day_of_week_cos": np.cos(2 * np.pi * day_of_week / 7),
+            "is_holiday": dates.normalize().isin(self.holiday_dates).astype(np.int8),
+            "is_event": dates.normalize().isin(self.event_dates).astype(np.int8),
+            "is_work_day": dates.normalize().isin(self.work_dates).astype(np.int8),
+        }, index=dates)
+
+    def transform(self, df: pd.DataFrame, date_column: str = "date") -> pd.DataFrame:
+        """Add the calendar columns to `df` in place and return it."""
+        codes, unique_dates = pd.factorize(pd.to_datetime(df[date_column]))
+        if (codes < 0).any():
+            raise ValueError(f"Column '{date_column}' contains missing dates")
+
+        table = self.table(unique_dates)
+        for col in self.COLUMNS:
+            df[col] = table[col].to_numpy()[codes]
+        return df
+
+    def save(self, path: Path) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path: Path) -> "CalendarFeatures":
+        return joblib.load(path)
@@ -1,25 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable, Optional
 import pandas as pd
 import opendatasets as od
 import shutil
 
+
+DATE_COLUMN = "date"
+DEFAULT_DATE_FORMAT = "%Y-%m-%d"
+
+
+def read_raw_file(path: Path, dtype: Optional[Dict[str, str]] = None,
+                  date_format: str = DEFAULT_DATE_FORMAT, **kwargs):
+    """Read one raw CSV, parsing its 'date' column (if any) during the read.
+
+    Extra keyword arguments go to `pd.read_csv` (e.g. `chunksize`).
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    parse_dates = [DATE_COLUMN] if DATE_COLUMN in header else None
+    return pd.read_csv(path, dtype=dtype, parse_dates=parse_dates, date_format=date_format, **kwargs)
+
+
+def read_raw_files(data_dir: Path, data_files: Dict[str, str],
+                   schema: Optional[Dict[str, Dict[str, str]]] = None,
+                   date_format: str = DEFAULT_DATE_FORMAT, workers: int = 1,
+                   exclude: Iterable[str] = ()) -> Dict[str, pd.DataFrame]:
+    """Read several raw CSVs, concurrently when `workers` > 1.
+
+    Threads are used because the CSV parser releases the GIL for most of the
+    work, and the frames are then shared without pickling.
+    """
+    schema = schema or {}
+    names = [name for name in data_files if name not in exclude]
+
+    def read(name: str) -> pd.DataFrame:
+        path = Path(data_dir) / data_files[name]
+        if not path.exists():
+            raise FileNotFoundError(f"File not found at {path}")
+        print(f"📥 Loading: {path}")
+        return read_raw_file(path, schema.get(name), date_format)
+
+    if workers <= 1:
+        return {name: read(name) for name in names}
+    with ThreadPoolExecutor(max_workers=min(workers, len(names))) as executor:
+        return dict(zip(names, executor.map(read, names)))
+
 class DataLoader:
     """
     Handles downloading, flattening, and loading raw data files from Kaggle.
     """
-    def __init__(self, data_dir: Path, source: str, data_files: Dict[str, str], dataset_name: str) -> None:
+    def __init__(self, data_dir: Path, source: str, data_files: Dict[str, str], dataset_name: str,
+                 schema: Optional[Dict[str, Dict[str, str]]] = None,
+                 date_format: str = DEFAULT_DATE_FORMAT, load_workers: int = 1) -> None:
         """
         Args:
             data_dir (Path): Directory where raw files reside.
             source (str): Kaggle dataset URL.
             data_files (dict): Mapping of dataset names to filenames.
             dataset_name (str): Name of the Kaggle dataset (folder name after download).
+            schema (dict, optional): Mapping of dataset names to column dtypes.
+            date_format (str): Format of the 'date' column in the raw files.
+            load_workers (int): Number of files read concurrently by `load_all`.
         """
         self.data_dir = data_dir
         self.source = source
         self.data_files = data_files
         self.dataset_name = dataset_name
+        self.schema = schema or {}
+        self.date_format = date_format
+        self.load_workers = load_workers
 
     def download(self) -> None:
         """Check if files already exist. If not, download and flatten."""
@@ -56,8 +105,9 @@ class DataLoader:
         if not path.exists():
             raise FileNotFoundError(f"File not found at {path}")
         print(f"📥 Loading: {path}")
-        return pd.read_csv(path)
+        return read_raw_file(path, self.schema.get(name), self.date_format)
 
     def load_all(self) -> Dict[str, pd.DataFrame]:
         """Load all configured datasets as a dict of DataFrames."""
-        return {name: self.load(name) for name in self.data_files.keys()}
+        return read_raw_files(self.data_dir, self.data_files, self.schema,
+                              self.date_format, self.load_workers)
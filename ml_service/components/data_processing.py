@@ -1,25 +1,33 @@
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterable, Iterator, Optional
+import numpy as np
 import pandas as pd
+from ml_service.utils.main_utils import (save_dataframe, append_dataframe, load_dataframe,
+                                        save_json, load_json, ChunkedDataFrameWriter)
+from ml_service.components.data_ingestion import DEFAULT_DATE_FORMAT, read_raw_file, read_raw_files
 
 
 class DataProcessor:
     """Perform merging, cleaning, and exporting of Store Sales Time Series data."""
 
-    def __init__(self, data_dir: Path, data_files: Dict[str, str]) -> None:
+    DROP_COLUMNS = ["description", "locale_name", "locale", "transferred"]
+    # Raw files a daily update may bring; train and transactions are required
+    UPDATE_FILES = ["train", "transactions", "oil"]
+
+    def __init__(self, data_dir: Path, data_files: Dict[str, str],
+                 schema: Optional[Dict[str, Dict[str, str]]] = None,
+                 date_format: str = DEFAULT_DATE_FORMAT, load_workers: int = 1) -> None:
         self.data_dir = data_dir
         self.data_files = data_files
+        self.schema = schema or {}
+        self.date_format = date_format
+        self.load_workers = load_workers
         self.data = {}
 
-    def load(self) -> "DataProcessor":
-        """Load all files and standardize date columns."""
-        self.data = {
-            name: pd.read_csv(self.data_dir / path) for name, path in self.data_files.items()
-        }
-        # ✅ Ensure 'date' columns are ALWAYS datetime
-        for key in ["train", "test", "oil", "holidays_events", "transactions"]:
-            if key in self.data and "date" in self.data[key].columns:
-                self.data[key]["date"] = pd.to_datetime(self.data[key]["date"])
+    def load(self, exclude: Iterable[str] = ()) -> "DataProcessor":
+        """Load all files (except `exclude`); 'date' columns are parsed during the read."""
+        self.data = read_raw_files(self.data_dir, self.data_files, self.schema,
+                                   self.date_format, self.load_workers, exclude)
         return self
 
     def interpolate_oil(self) -> "DataProcessor":
@@ -29,23 +37,25 @@ class DataProcessor:
         self.data["oil"].reset_index(inplace=True)
         return self
 
-    def merge_train_test(self) -> "DataProcessor":
-        """Merge train/test with stores and transactions."""
-        self.data["train_merged"] = (
-            self.data["train"]
-            .merge(self.data["stores"], on="store_nbr", how="left")
-            .merge(self.data["transactions"], on=["store_nbr", "date"], how="left")
-        )
-        self.data["test_merged"] = (
-            self.data["test"]
+    def _merge_stores_and_transactions(self, df: pd.DataFrame) -> pd.DataFrame:
+        return (
+            df
             .merge(self.data["stores"], on="store_nbr", how="left")
             .merge(self.data["transactions"], on=["store_nbr", "date"], how="left")
         )
+
+    def _merge_holidays_with_oil(self) -> pd.DataFrame:
+        return self.data["oil"].merge(self.data["holidays_events"], on="date", how="left")
+
+    def merge_train_test(self) -> "DataProcessor":
+        """Merge train/test with stores and transactions."""
+        self.data["train_merged"] = self._merge_stores_and_transactions(self.data["train"])
+        self.data["test_merged"] = self._merge_stores_and_transactions(self.data["test"])
         return self
 
     def merge_holidays_and_oil(self) -> "DataProcessor":
         """Merge holidays and oil data for final train/test."""
-        holidays_oil_merged = self.data["oil"].merge(self.data["holidays_events"], on="date", how="left")
+        holidays_oil_merged = self._merge_holidays_with_oil()
 
         self.data["train_final"] = self.data["train_merged"].merge(holidays_oil_merged, on="date", how="left")
         self.data["test_final"] = self.data["test_merged"].merge(holidays_oil_merged, on="date", how="left")
@@ -59,19 +69,142 @@ class DataProcessor:
 
     def drop_irrelevant_columns(self) -> "DataProcessor":
         """Drop low-value and sparse columns, remove duplicates."""
-        drop_cols = ["description", "locale_name", "locale", "transferred"]
         for df_name in ["train_final", "test_final"]:
-            self.data[df_name].drop(columns=drop_cols, errors="ignore", inplace=True)
+            self.data[df_name].drop(columns=self.DROP_COLUMNS, errors="ignore", inplace=True)
             self.data[df_name].drop_duplicates(inplace=True)
         return self
 
-    def save(self, train_file: Path, test_file: Path) -> "DataProcessor":
-        """Save final merged train and test files."""
-        train_file.parent.mkdir(parents=True, exist_ok=True) 
-        self.data["train_final"].to_csv(train_file, index=False)
-        self.data["test_final"].to_csv(test_file, index=False)
+    def save(self, train_file: Path, test_file: Path, compression: Optional[str] = None,
+             export_csv: bool = False, partitioned: bool = False) -> "DataProcessor":
+        """Save final merged train and test files (format taken from the file suffix)."""
+        save_dataframe(self.data["train_final"], train_file, compression, export_csv, partitioned)
+        save_dataframe(self.data["test_final"], test_file, compression, export_csv, partitioned)
 
         print(f"✅ Final train saved to: {train_file}")
         print(f"✅ Final test saved to: {test_file}")
 
         return self
+
+    def merge_in_chunks(self, train_file: Path, test_file: Path, chunk_size: int,
+                        compression: Optional[str] = None, export_csv: bool = False,
+                        partitioned: bool = False) -> "DataProcessor":
+        """Stream train/test through all merges in chunks of `chunk_size` rows.
+
+        Only the dimension tables (stores, oil, holidays, transactions) are kept
+        in memory, so call `load(exclude=["train", "test"])` and `interpolate_oil()`
+        first. Each enriched chunk is appended to the output file. The result is
+        identical to merge_train_test -> merge_holidays_and_oil ->
+        drop_irrelevant_columns -> save.
+        """
+        holidays_oil_merged = self._merge_holidays_with_oil()
+
+        for name, output_file in [("train", train_file), ("test", test_file)]:
+            reader = read_raw_file(self.data_dir / self.data_files[name], self.schema.get(name),
+                                   self.date_format, chunksize=chunk_size)
+            with ChunkedDataFrameWriter(output_file, compression, export_csv, partitioned) as writer:
+                for chunk in self._stream_final(reader, holidays_oil_merged):
+                    writer.write(chunk)
+            print(f"✅ Final {name} saved to: {output_file}")
+
+        return self
+
+    def _stream_final(self, reader: Iterator[pd.DataFrame],
+                      holidays_oil_merged: pd.DataFrame) -> Iterator[pd.DataFrame]:
+        """Yield merged and cleaned chunks.
+
+        Oil prices are interpolated row by row across the whole table, so rows
+        after the last known price of a chunk are held back until the next known
+        price arrives. The last known row is kept as the left interpolation edge.
+        """
+        anchor = None
+        pending = None
+        for chunk in reader:
+            frame = self._merge_stores_and_transactions(chunk).merge(holidays_oil_merged, on="date", how="left")
+            if pending is not None:
+                frame = pd.concat([pending, frame], ignore_index=True)
+
+            known = np.flatnonzero(frame["dcoilwtico"].notna().to_numpy())
+            if len(known) == 0:
+                pending = frame
+                continue
+
+            ready, pending = frame.iloc[:known[-1] + 1], frame.iloc[known[-1] + 1:]
+            yield self._finalize_chunk(ready, anchor)
+            anchor = ready.iloc[[-1]]
+
+        if pending is not None and len(pending):
+            yield self._finalize_chunk(pending, anchor)
+
+    def _finalize_chunk(self, rows: pd.DataFrame, anchor: Optional[pd.DataFrame]) -> pd.DataFrame:
+        if anchor is not None:
+            rows = pd.concat([anchor, rows], ignore_index=True)
+        rows = rows.assign(dcoilwtico=rows["dcoilwtico"].interpolate(method="linear").ffill())
+        if anchor is not None:
+            rows = rows.iloc[1:]
+        return rows.drop(columns=self.DROP_COLUMNS, errors="ignore").drop_duplicates()
+
+    def write_update_state(self, state_file: Path, train_file: Path, fingerprint: str) -> "DataProcessor":
+        """Record where the merged train data ends, as the starting point of `update`.
+
+        Call after a full run, with the oil data still loaded. `fingerprint`
+        identifies the raw files, settings and code the full run used.
+        """
+        last_date = load_dataframe(train_file, columns=["date"])["date"].max()
+        oil = self.data["oil"]
+        known = oil[(oil["date"] <= last_date) & oil["dcoilwtico"].notna()]
+        save_json(Path(state_file), {
+            "fingerprint": fingerprint,
+            "last_date": str(last_date.date()),
+            "last_oil": float(known["dcoilwtico"].iloc[-1]) if len(known) else None,
+        })
+        return self
+
+    def update(self, updates_dir: Path, train_file: Path, state_file: Path,
+               compression: Optional[str] = None, export_csv: bool = False) -> "DataProcessor":
+        """Merge only the days after the last processed date and append them to `train_file`.
+
+        `updates_dir` holds train.csv and transactions.csv (optionally oil.csv)
+        with the new days, named as in `data_files`. Stores, holidays and oil
+        are small and re-read from the raw directory; prices in an update
+        oil.csv are added to the raw ones (and win on the same day), so the
+        rows match a full rebuild with the update appended to the raw files.
+        Days without any price carry the last known price forward, as the
+        full merge does at the end of the data.
+        """
+        state = load_json(Path(state_file))
+        last_date = pd.Timestamp(state.last_date)
+
+        files = {name: self.data_files[name] for name in self.UPDATE_FILES
+                 if (Path(updates_dir) / self.data_files[name]).exists()}
+        if "train" not in files:
+            print(f"✅ No new train data in {updates_dir}")
+            return self
+        if "transactions" not in files:
+            raise FileNotFoundError(f"{updates_dir} has {files['train']} but no {self.data_files['transactions']}")
+        updates = read_raw_files(Path(updates_dir), files, self.schema, self.date_format, self.load_workers)
+
+        train = updates["train"][updates["train"]["date"] > last_date]
+        if train.empty:
+            print(f"✅ Merged data already up to date ({state.last_date})")
+            return self
+
+        self.load(exclude=[name for name in self.data_files if name not in ("stores", "holidays_events", "oil")])
+        self.data["transactions"] = updates["transactions"]
+        if "oil" in updates:
+            oil = pd.concat([self.data["oil"], updates["oil"]], ignore_index=True)
+            self.data["oil"] = oil.drop_duplicates(subset="date", keep="last").sort_values("date", ignore_index=True)
+        self.interpolate_oil()
+
+        rows = self._merge_stores_and_transactions(train).merge(self._merge_holidays_with_oil(), on="date", how="left")
+        anchor = rows.iloc[[0]].assign(dcoilwtico=np.nan if state.last_oil is None else state.last_oil)
+        rows = self._finalize_chunk(rows, anchor)
+        part = append_dataframe(rows, train_file, compression, export_csv)
+
+        known = rows["dcoilwtico"].dropna()
+        save_json(Path(state_file), {
+            "fingerprint": state.fingerprint,
+            "last_date": str(rows["date"].max().date()),
+            "last_oil": float(known.iloc[-1]) if len(known) else state.last_oil,
+        })
+        print(f"✅ Appended {len(rows)} new train rows to: {part}")
+        return self
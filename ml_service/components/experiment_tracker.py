@@ -0,0 +1,167 @@
+import shutil
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+import joblib
+import numpy as np
+import pandas as pd
+from ml_service.utils.main_utils import save_json, load_json
+
+MANIFEST_FILE = "run.json"
+EXAMPLE_FILE = "example.parquet"
+PREDICTIONS_FILE = "predictions.npy"
+
+
+class RunBuffer:
+    """Params, metrics, dicts, artifacts and the model of one run, recorded on local disk.
+
+    Nothing here talks to MLflow. Files are copied into the buffer directory
+    and `close` writes the manifest; ExperimentTracker replays a closed
+    buffer to the tracking server and deletes it once that succeeds.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.manifest = {"params": {}, "metrics": {}, "dicts": {}, "artifacts": [], "model": None}
+
+    def log_params(self, params: Dict) -> None:
+        # MLflow stores params as strings anyway
+        self.manifest["params"].update({name: str(value) for name, value in params.items()})
+
+    def log_metrics(self, metrics: Dict) -> None:
+        self.manifest["metrics"].update({name: float(value) for name, value in metrics.items()})
+
+    def log_dict(self, data: Dict, artifact_file: str) -> None:
+        self.manifest["dicts"][artifact_file] = data
+
+    def log_artifact(self, path: Path, artifact_path: Optional[str] = None) -> None:
+        """Copy a file into the buffer (the original may be overwritten before the flush)."""
+        target = self.path / "artifacts" / (artifact_path or "") / Path(path).name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(path, target)
+        self.manifest["artifacts"].append({"file": str(target.relative_to(self.path)),
+                                           "artifact_path": artifact_path})
+
+    def log_model(self, model_file: Path, example: pd.DataFrame, predictions,
+                  registered_model_name: Optional[str] = None) -> None:
+        """Saved sklearn-style model with a sample of its input and predictions for the signature."""
+        self.log_artifact(model_file, artifact_path="_model")
+        example.to_parquet(self.path / EXAMPLE_FILE)
+        np.save(self.path / PREDICTIONS_FILE, np.asarray(predictions))
+        self.manifest["model"] = {"file": self.manifest["artifacts"].pop()["file"],
+                                  "registered_model_name": registered_model_name}
+
+    def close(self) -> None:
+        """Write the manifest; only buffers with one are flushed."""
+        save_json(self.path / MANIFEST_FILE, self.manifest)
+
+
+class ExperimentTracker:
+    """Buffers runs locally and sends them to MLflow on a background thread.
+
+    Training records a run into a RunBuffer (params, metrics and file copies
+    under `buffer_dir`), and `submit` hands it to a single worker thread.
+    The worker connects to the tracking server on first use (no tracking
+    work happens at import), infers the model signature from the small
+    sample in the buffer, and logs everything. The pipeline can write the
+    submission in the meantime and calls `wait` when it is done.
+
+    A buffer whose flush fails stays on disk and is sent again with the next
+    submitted run, so a tracking outage does not lose runs or fail training.
+    """
+
+    def __init__(self, config) -> None:
+        self.config = config
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[Path, Future] = {}
+        self._connected = False
+
+    def new_run(self) -> RunBuffer:
+        name = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        return RunBuffer(Path(self.config.buffer_dir) / name)
+
+    def pending_runs(self) -> List[Path]:
+        """Closed buffers not flushed yet, oldest first."""
+        buffer_dir = Path(self.config.buffer_dir)
+        if not buffer_dir.exists():
+            return []
+        return sorted(path.parent for path in buffer_dir.glob(f"*/{MANIFEST_FILE}"))
+
+    def submit(self, run: RunBuffer) -> Future:
+        """Close the run and queue it, behind any runs left over from earlier flushes."""
+        run.close()
+        if self._executor is None:
+            # Non-daemon thread: queued flushes still finish if the caller never waits
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="experiment-tracker")
+        for path in self.pending_runs():
+            if path not in self._futures:
+                self._futures[path] = self._executor.submit(self._flush, path)
+        print(f"⏳ Logging run to MLflow in the background: {run.path}")
+        return self._futures[run.path]
+
+    def wait(self) -> int:
+        """Block until every submitted run is flushed; returns how many failed (they stay buffered)."""
+        failed = 0
+        for path, future in self._futures.items():
+            error = future.exception()
+            if error is not None:
+                failed += 1
+                print(f"⚠️ MLflow logging failed, run kept in {path}: {error}")
+        self._futures = {}
+        return failed
+
+    def _connect(self) -> None:
+        import mlflow
+
+        if self.config.dagshub_repo:
+            try:
+                import dagshub
+            except ImportError as e:
+                raise ImportError("experimentTracking.dagshub_repo needs dagshub: pip install dagshub") from e
+            repo_owner, repo_name = self.config.dagshub_repo.split("/", 1)
+            dagshub.init(repo_owner=repo_owner, repo_name=repo_name, mlflow=True)
+        else:
+            mlflow.set_tracking_uri(self.config.tracking_uri)
+        if self.config.experiment_name:
+            mlflow.set_experiment(self.config.experiment_name)
+        self._connected = True
+
+    def _flush(self, path: Path) -> Path:
+        """Replay one buffered run to MLflow (runs on the worker thread)."""
+        import mlflow
+        from mlflow.models import infer_signature
+
+        if not self._connected:
+            self._connect()
+        manifest = load_json(path / MANIFEST_FILE).to_dict()
+
+        with mlflow.start_run(run_name=path.name):
+            mlflow.log_params(manifest["params"])
+            mlflow.log_metrics(manifest["metrics"])
+            for artifact_file, data in manifest["dicts"].items():
+                mlflow.log_dict(data, artifact_file)
+            for artifact in manifest["artifacts"]:
+                mlflow.log_artifact(str(path / artifact["file"]), artifact_path=artifact["artifact_path"])
+
+            if manifest["model"] is not None:
+                example = pd.read_parquet(path / EXAMPLE_FILE)
+                signature = infer_signature(example, np.load(path / PREDICTIONS_FILE))
+                # The model registry is not available on a plain file store
+                registered_model_name = manifest["model"]["registered_model_name"]
+                if urlparse(mlflow.get_tracking_uri()).scheme == "file":
+                    registered_model_name = None
+                mlflow.sklearn.log_model(
+                    sk_model=joblib.load(path / manifest["model"]["file"]),
+                    name="model",
+                    registered_model_name=registered_model_name,
+                    signature=signature,
+                    input_example=example.iloc[:5],
+                    serialization_format=mlflow.sklearn.SERIALIZATION_FORMAT_CLOUDPICKLE,
+                )
+
+        shutil.rmtree(path)
+        return path
@@ -2,105 +2,302 @@ import pandas as pd
 import numpy as np
 import joblib
 import os
+import tracemalloc
 from sklearn.preprocessing import MinMaxScaler
 from pathlib import Path
+from ml_service.utils.main_utils import (load_dataframe, load_dataframe_files, save_dataframe, append_dataframe,
+                                        dataframe_parts, save_json, load_json)
+from ml_service.components.calendar_features import CalendarFeatures
+from ml_service.components.data_ingestion import DEFAULT_DATE_FORMAT
+from ml_service.components.lag_features import LagFeatureGenerator
 
 
 class FeatureEngineeringAndDataTransformation:
-    def __init__(self, train_file, test_file, output_dir, scale_file, dtype_spec=None):
+    CAT_COLUMNS = ["family", "state", "city", "type_x", "type_y"]
+    ENCODINGS = ("onehot", "categorical")
+
+    def __init__(self, train_file, test_file, output_dir, scale_file,
+                 train_output_file=None, test_output_file=None,
+                 compression=None, export_csv=False, partitioned=False,
+                 holidays_file=None, calendar_file=None, profile_memory=False,
+                 encoding="onehot", vocabulary_file=None, lag_features=None, lag_state_file=None,
+                 holidays_dtype=None, date_format=DEFAULT_DATE_FORMAT, memory_report_file=None):
         self.train_file = train_file
         self.test_file = test_file
         self.output_dir = output_dir
         self.scale_file = scale_file
-        self.dtype_spec = dtype_spec or {"some_column_name": str}
+        self.train_output_file = train_output_file or Path(output_dir) / "train_final.csv"
+        self.test_output_file = test_output_file or Path(output_dir) / "test_final.csv"
+        self.compression = compression
+        self.export_csv = export_csv
+        self.partitioned = partitioned
+        self.calendar_file = calendar_file or Path(output_dir) / "calendar.joblib"
+        self.calendar = (CalendarFeatures.from_file(holidays_file, holidays_dtype, date_format)
+                         if holidays_file else CalendarFeatures())
+        self.profile_memory = profile_memory
+        if encoding not in self.ENCODINGS:
+            raise ValueError(f"Unsupported encoding '{encoding}'. Expected one of {self.ENCODINGS}")
+        self.encoding = encoding
+        self.vocabulary_file = vocabulary_file or Path(output_dir) / "vocabulary.json"
+        lag_features = dict(lag_features or {})
+        self.lag_features = LagFeatureGenerator(**lag_features) if lag_features.pop("enabled", False) else None
+        self.lag_state_file = lag_state_file or Path(output_dir) / "lag_state.joblib"
+        self.memory_report = {}
+        self.memory_report_file = memory_report_file or Path(output_dir) / "memory_report.json"
+        self.n_train = 0
+        # Set by `update`: the fitted columns/categories the new rows must match
+        self.reference = None
+        self.categories = {}
+        self.refit_reasons = []
 
     def load_data(self):
-        train_df = pd.read_csv(self.train_file, low_memory=False, dtype=self.dtype_spec)
-        test_df = pd.read_csv(self.test_file, low_memory=False, dtype=self.dtype_spec)
+        train_df = load_dataframe(self.train_file)
+        test_df = load_dataframe(self.test_file)
         return train_df, test_df
 
+    @staticmethod
+    def _fill_category(series, value):
+        """fillna that also works on categorical columns."""
+        if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+            series = series.cat.set_categories(series.cat.categories.append(pd.Index([value])).sort_values())
+        return series.fillna(value)
+
+    @staticmethod
+    def _align_categories(train_df, test_df):
+        """Give categorical columns the same categories in both frames so concat keeps them compact."""
+        for col in train_df.columns.intersection(test_df.columns):
+            if isinstance(train_df[col].dtype, pd.CategoricalDtype) and isinstance(test_df[col].dtype, pd.CategoricalDtype):
+                categories = train_df[col].cat.categories.union(test_df[col].cat.categories).sort_values()
+                train_df[col] = train_df[col].cat.set_categories(categories)
+                test_df[col] = test_df[col].cat.set_categories(categories)
+
+    def combine(self, train_df, test_df):
+        """Stack train and test once so every step below runs a single pass over both.
+
+        Rows [0, n_train) are train, the rest test; `self.n_train` records the split.
+        """
+        self._align_categories(train_df, test_df)
+        self.n_train = len(train_df)
+        return pd.concat([train_df, test_df], ignore_index=True)
+
+    def _by_part(self, series, fn):
+        """Apply a row-order dependent op to the train and test parts separately."""
+        return pd.concat([fn(series.iloc[:self.n_train]), fn(series.iloc[self.n_train:])])
+
     def fill_na(self, df):
-        df = df.copy()
-        df["type_y"] = df.get("type_y", pd.Series("Regular Day", index=df.index)).fillna("Regular Day")
+        df["type_y"] = self._fill_category(df.get("type_y", pd.Series("Regular Day", index=df.index)), "Regular Day")
         df["transactions"] = df.get("transactions", pd.Series(0, index=df.index)).fillna(0)
-        df["dcoilwtico"] = df["dcoilwtico"].bfill()
+        df["dcoilwtico"] = self._by_part(df["dcoilwtico"], pd.Series.bfill)
         return df
 
-    def add_dates(self, df):
-        df = df.copy()
-        df["date"] = pd.to_datetime(df["date"])
-        df["year"] = df["date"].dt.year
-        df["month"] = df["date"].dt.month
-        df["day"] = df["date"].dt.day
-        df["day_of_week"] = df["date"].dt.dayofweek
-        df["is_weekend"] = (df["day_of_week"] >= 5).astype(int)
-        df["day_of_year"] = df["date"].dt.dayofyear
-        df["is_month_start"] = df["date"].dt.is_month_start.astype(int)
-        df["is_month_end"] = df["date"].dt.is_month_end.astype(int)
-        return df
+    def add_calendar_features(self, df):
+        """Date parts, cyclical month/weekday encodings and holiday flags, computed per distinct date."""
+        return self.calendar.transform(df)
 
     def add_interactions(self, df):
-        df = df.copy()
-        df["onpromotion_trend"] = df["onpromotion"] * df["day_of_year"]
+        df["onpromotion_trend"] = df["onpromotion"].astype(np.int32) * df["day_of_year"]
         return df
 
-    def encode_cyclical(self, df):
-        df = df.copy()
-        df["month_sin"] = np.sin(2 * np.pi * df["month"] / 12)
-        df["month_cos"] = np.cos(2 * np.pi * df["month"] / 12)
-        df["day_of_week_sin"] = np.sin(2 * np.pi * df["day_of_week"] / 7)
-        df["day_of_week_cos"] = np.cos(2 * np.pi * df["day_of_week"] / 7)
-        df.drop(["month", "day_of_week"], axis=1, inplace=True)
+    def add_lag_features(self, df):
+        """Past sales of each store/family series; test rows have no sales and only read history."""
+        from_state = self.reference is not None
+        df = self.lag_features.transform(df, from_state=from_state)
+        self.lag_features.update_state(df.iloc[:self.n_train], from_state=from_state).save(self.lag_state_file)
         return df
 
-    def encode_and_scale(self, train_df, test_df):
-        cat_columns = ["family", "state", "city", "type_x", "type_y"]
+    def encode_categorical(self, df):
+        """Keep categorical columns as integer category codes with a fixed vocabulary.
 
-        combined = pd.concat([train_df, test_df], keys=["train", "test"])
-        # combined = pd.get_dummies(combined, columns=cat_columns, drop_first=True, dtype=int)
+        The vocabulary is saved next to the scaler so serving maps values to the
+        same codes; values outside it become missing.
+        """
+        vocabulary = {}
+        for col in self.CAT_COLUMNS:
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("category")
+            vocabulary[col] = [str(value) for value in df[col].cat.categories]
+        save_json(Path(self.vocabulary_file), vocabulary)
+        return df
+
+    def encode_and_scale(self, df):
+        if self.reference is not None:
+            return self.encode_and_scale_with_fitted(df)
 
-        encoded = pd.get_dummies(combined[cat_columns], drop_first=True, dtype=int)
-        combined = pd.concat([combined, encoded], axis=1)
+        cat_columns = self.CAT_COLUMNS
+        self.categories = {col: [str(value) for value in df[col].astype("category").cat.categories]
+                           for col in cat_columns}
 
-        train_df = combined.xs("train").copy()
-        test_df = combined.xs("test").copy()
+        if self.encoding == "categorical":
+            df = self.encode_categorical(df)
+        else:
+            # combined = pd.get_dummies(combined, columns=cat_columns, drop_first=True, dtype=int)
+            encoded = pd.get_dummies(df[cat_columns], drop_first=True, dtype=np.int8)
+            # One concat instead of ~100 column inserts, which would fragment the frame
+            df = pd.concat([df, encoded], axis=1)
 
-        print(f"DataFrame cols: {train_df.columns.to_list()}")
+        print(f"DataFrame cols: {df.columns.to_list()}")
         
         scale_columns = [
-            col for col in train_df.columns
+            col for col in df.columns
             if any(x in col for x in [
                 "onpromotion_trend",
-                "dcoilwtico", "transactions"
+                "dcoilwtico", "transactions",
+                "sales_lag_", "sales_roll", "sales_expanding"
             ])
         ]
         scaler = MinMaxScaler()
-        train_df[scale_columns] = scaler.fit_transform(train_df[scale_columns])
-        test_df[scale_columns] = scaler.transform(test_df[scale_columns])
+        scaler.fit(df[scale_columns].iloc[:self.n_train])
+        df[scale_columns] = scaler.transform(df[scale_columns])
 
         os.makedirs(self.output_dir, exist_ok=True)
         joblib.dump(scaler, self.scale_file)
+        self.calendar.save(self.calendar_file)
 
-        return train_df, test_df
+        return df
+
+    def encode_and_scale_with_fitted(self, df):
+        """Encode and scale new rows with the stored categories and scaler instead of refitting.
+
+        Unseen categories and values outside the scaler's fitted range are kept
+        (as missing / out of [0, 1]) and recorded in `refit_reasons`.
+        """
+        for col, categories in self.reference.categories.items():
+            values = df[col].astype(str)[df[col].notna()]
+            unseen = sorted(set(values.unique()) - set(categories))
+            if unseen:
+                self.refit_reasons.append(f"{col}: unseen categories {unseen}")
+            df[col] = pd.Categorical(df[col].astype(object), categories=list(categories))
+
+        if self.encoding == "onehot":
+            # Fixed categories give exactly the fitted dummy columns
+            encoded = pd.get_dummies(df[self.CAT_COLUMNS], drop_first=True, dtype=np.int8)
+            df = pd.concat([df, encoded], axis=1)
 
-    def save(self, train_df, test_df):
-        train_df.to_csv(Path(self.output_dir) / "train_final.csv", index=False)
-        test_df.to_csv(Path(self.output_dir) / "test_final.csv", index=False)
+        scaler = joblib.load(self.scale_file)
+        scale_columns = list(scaler.feature_names_in_)
+        values = df[scale_columns]
+        below = values.min() < scaler.data_min_
+        above = values.max() > scaler.data_max_
+        for col in values.columns[below.to_numpy() | above.to_numpy()]:
+            self.refit_reasons.append(f"{col}: values outside the fitted scaler range")
+        df[scale_columns] = scaler.transform(values)
+
+        missing = [col for col in self.reference.columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"New rows lack fitted columns {missing}; run a full rebuild")
+        return df[list(self.reference.columns)]
+
+    def plan(self):
+        """Ordered transformation steps; each updates the combined frame in place where it can."""
+        steps = [
+            ("fill_na", self.fill_na),
+            ("add_calendar_features", self.add_calendar_features),
+            ("add_interactions", self.add_interactions),
+        ]
+        if self.lag_features is not None:
+            steps.append(("add_lag_features", self.add_lag_features))
+        steps.append(("encode_and_scale", self.encode_and_scale))
+        return steps
+
+    def transform(self, df):
+        """Run every step of the plan once over the combined frame, optionally tracking peak memory."""
+        self.memory_report = {}
+        if self.profile_memory:
+            tracemalloc.start()
+
+        try:
+            for name, step in self.plan():
+                if self.profile_memory:
+                    tracemalloc.reset_peak()
+                    before, _ = tracemalloc.get_traced_memory()
+                df = step(df)
+                if self.profile_memory:
+                    current, peak = tracemalloc.get_traced_memory()
+                    self.memory_report[name] = {
+                        "peak_extra_mb": round((peak - before) / 2**20, 1),
+                        "retained_mb": round((current - before) / 2**20, 1),
+                    }
+                    print(f"📈 {name}: peak +{self.memory_report[name]['peak_extra_mb']} MB, "
+                          f"retained +{self.memory_report[name]['retained_mb']} MB")
+        finally:
+            if self.profile_memory:
+                tracemalloc.stop()
+        if self.memory_report:
+            save_json(Path(self.memory_report_file), self.memory_report)
+        return df
+
+    def save(self, df):
+        if self.reference is not None:
+            append_dataframe(df.iloc[:self.n_train], self.train_output_file, self.compression, self.export_csv)
+        else:
+            save_dataframe(df.iloc[:self.n_train], self.train_output_file, self.compression, self.export_csv,
+                           self.partitioned)
+        save_dataframe(df.iloc[self.n_train:], self.test_output_file, self.compression, self.export_csv,
+                       self.partitioned)
 
     def run(self):
         train_df, test_df = self.load_data()
-        train_df, test_df = self.fill_na(train_df), self.fill_na(test_df)
+        df = self.combine(train_df, test_df)
+        del train_df, test_df
 
-        train_df, test_df = self.add_dates(train_df), self.add_dates(test_df)
+        df = self.transform(df)
 
-        train_df = self.add_interactions(train_df)
-        test_df = self.add_interactions(test_df)
+        self.save(df)
 
-        train_df, test_df = self.encode_cyclical(train_df), self.encode_cyclical(test_df)
+        print(f"Final shapes -> Train: {(self.n_train, df.shape[1])}, Test: {(len(df) - self.n_train, df.shape[1])}")
+        print("✅ Done: Final files saved!")
+        return df.columns.to_list()
 
-        train_df, test_df = self.encode_and_scale(train_df, test_df)
+    def write_update_state(self, state_file, fingerprint, columns):
+        """Record what a full run fitted, as the reference for `update`.
 
-        self.save(train_df, test_df)
+        Args:
+            state_file (Path): JSON file to write
+            fingerprint (str): identifies the inputs, settings and code of the full run
+            columns (list): output columns of the full run
+        """
+        save_json(Path(state_file), {
+            "fingerprint": fingerprint,
+            "columns": list(columns),
+            "categories": self.categories,
+            "parts": [part.name for part in dataframe_parts(self.train_file)],
+            "refit_required": False,
+            "refit_reasons": [],
+        })
 
-        print(f"Final shapes -> Train: {train_df.shape}, Test: {test_df.shape}")
-        print("✅ Done: Final files saved!")
+    def update(self, state_file):
+        """Transform only the merged train parts appended since the last run and append the result.
+
+        The test rows are small and are rebuilt so their lag features see the
+        new days. Scaler, vocabulary and lag history are reused; the state file
+        flags when they no longer fit the data and a full rebuild is due.
+        """
+        state = load_json(Path(state_file))
+        new_parts = [part for part in dataframe_parts(self.train_file) if part.name not in state.parts]
+        if not new_parts:
+            print("✅ Features already up to date")
+            return
+
+        self.reference = state
+        self.refit_reasons = []
+        if self.lag_features is not None:
+            self.lag_features = LagFeatureGenerator.load(self.lag_state_file)
+
+        train_df = load_dataframe_files(new_parts)
+        test_df = load_dataframe(self.test_file)
+        df = self.combine(train_df, test_df)
+        del train_df, test_df
+
+        df = self.transform(df)
+        self.save(df)
+
+        reasons = list(state.refit_reasons) + self.refit_reasons
+        save_json(Path(state_file), {
+            **state.to_dict(),
+            "parts": list(state.parts) + [part.name for part in new_parts],
+            "refit_required": bool(reasons),
+            "refit_reasons": reasons,
+        })
+        if reasons:
+            print(f"⚠️ Refit recommended: {reasons}")
+        print(f"✅ Appended {self.n_train} train rows from {len(new_parts)} new part(s)")
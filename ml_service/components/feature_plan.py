@@ -0,0 +1,152 @@
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from ml_service.components.calendar_features import CalendarFeatures
+from ml_service.components.lag_features import LagFeatureGenerator
+
+# Raw categorical input fields (one-hot dummies or category codes in the model)
+CAT_COLUMNS = ["family", "state", "city", "type_x", "type_y"]
+
+
+class FeaturePlan:
+    """Raw prediction inputs -> model feature matrix, with every lookup resolved at startup.
+
+    Built once from the model's feature names, the fitted scaler, the
+    calendar, the stored lag state and (for `encoding: categorical`) the
+    vocabulary. Each model column is tied to its source: a numeric input
+    field, a calendar column of the row's date, `onpromotion * day_of_year`,
+    a one-hot value or a category code. Scaled columns carry the scaler's
+    per-column affine coefficients.
+
+    Sales features are looked up by (store_nbr, family, date) in the lag
+    state's `forecast_rows`, scaled once at startup: the `horizon` days after
+    the training data get the values of the feature stage's test rows. Rows
+    outside those days or series, and columns without any source, are NaN
+    (missing to the model), as lag features are without history offline.
+
+    `transform` copies a constant row into a float32 buffer and writes only
+    the input-dependent columns, so a single row is a few dict lookups and
+    small array writes instead of a pandas pipeline.
+    """
+
+    NUMERIC_FIELDS = ["store_nbr", "onpromotion", "cluster", "transactions", "dcoilwtico"]
+    MAX_CACHED_DATES = 4096
+
+    def __init__(self, feature_names, calendar: CalendarFeatures, scaler=None,
+                 vocabulary: Optional[Dict[str, List[str]]] = None,
+                 lag_state: Optional[LagFeatureGenerator] = None) -> None:
+        self.feature_names = [str(name) for name in feature_names]
+        index = {name: i for i, name in enumerate(self.feature_names)}
+        self.calendar = calendar
+
+        # Any per-column affine scaler: x * slope + offset
+        self.slope = np.ones(len(self.feature_names), dtype=np.float32)
+        self.offset = np.zeros(len(self.feature_names), dtype=np.float32)
+        if scaler is not None:
+            n_scaler = len(scaler.feature_names_in_)
+            zero = scaler.transform(pd.DataFrame(np.zeros((1, n_scaler)), columns=scaler.feature_names_in_))[0]
+            one = scaler.transform(pd.DataFrame(np.ones((1, n_scaler)), columns=scaler.feature_names_in_))[0]
+            for i, name in enumerate(scaler.feature_names_in_):
+                if name in index:
+                    self.slope[index[name]] = one[i] - zero[i]
+                    self.offset[index[name]] = zero[i]
+
+        self.numeric = [(field, index[field]) for field in self.NUMERIC_FIELDS if field in index]
+        calendar_columns = [name for name in CalendarFeatures.COLUMNS if name in index]
+        self.calendar_index = np.array([index[name] for name in calendar_columns], dtype=np.intp)
+        self.calendar_source = np.array([CalendarFeatures.COLUMNS.index(name) for name in calendar_columns],
+                                        dtype=np.intp)
+        self.trend_index = index.get("onpromotion_trend")
+        self._dates: Dict[str, np.ndarray] = {}
+
+        # Category codes when the model takes the raw columns, otherwise value -> dummy column
+        self.vocabulary = {col: list(vocabulary[col]) for col in CAT_COLUMNS
+                           if vocabulary is not None and col in index and col in vocabulary}
+        self.codes = {col: (index[col], {value: float(code) for code, value in enumerate(values)})
+                      for col, values in self.vocabulary.items()}
+        self.dummies = {}
+        for col in CAT_COLUMNS:
+            if col in self.codes:
+                continue
+            prefix = f"{col}_"
+            self.dummies[col] = {name[len(prefix):]: i for name, i in index.items() if name.startswith(prefix)}
+
+        # Dummies default to 0; every other column is either written by transform or unknown
+        self.base = np.full(len(self.feature_names), np.nan, dtype=np.float32)
+        for columns in self.dummies.values():
+            self.base[list(columns.values())] = 0.0
+
+        # (store_nbr, family, day number) -> row of the scaled sales features; the last row is all NaN
+        self.lag_rows: Dict[tuple, int] = {}
+        lag_columns = [name for name in (lag_state.columns if lag_state is not None else []) if name in index]
+        self.lag_index = np.array([index[name] for name in lag_columns], dtype=np.intp)
+        self.lag_values = np.full((1, len(lag_columns)), np.nan, dtype=np.float32)
+        if lag_columns:
+            rows = lag_state.forecast_rows()
+            self.lag_values = np.vstack([rows[lag_columns].to_numpy(dtype=np.float32) * self.slope[self.lag_index]
+                                         + self.offset[self.lag_index], self.lag_values])
+            self.lag_rows = {key: i for i, key in enumerate(zip(
+                rows["store_nbr"].astype(int), rows["family"].astype(str), self._day_numbers(rows["date"])))}
+
+    @staticmethod
+    def _day_numbers(dates) -> np.ndarray:
+        """Days since 1970-01-01."""
+        return pd.to_datetime(dates).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+    def _calendar_rows(self, dates: List[str]):
+        """All calendar columns and the day number of each date, computed once per distinct date string."""
+        # The cache is replaced rather than mutated, so concurrent callers never see it half-cleared
+        cached = self._dates
+        missing = list(dict.fromkeys(date for date in dates if date not in cached))
+        if missing:
+            parsed = pd.to_datetime(missing)
+            table = self.calendar.table(parsed)[CalendarFeatures.COLUMNS].to_numpy(dtype=np.float32)
+            if len(cached) + len(missing) > self.MAX_CACHED_DATES:
+                cached = {}
+            cached = {**cached, **dict(zip(missing, zip(table, self._day_numbers(parsed).tolist())))}
+            self._dates = cached
+        rows = [cached[date] for date in dates]
+        return np.stack([row for row, _ in rows]), [day for _, day in rows]
+
+    def transform(self, inputs: Dict[str, list], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Feature matrix of raw inputs given as {field: list of values}; every field must be present.
+
+        `out` may be a preallocated (rows, features) float32 buffer to fill.
+        """
+        n_rows = len(inputs["date"])
+        if out is None:
+            out = np.empty((n_rows, len(self.feature_names)), dtype=np.float32)
+        out[:] = self.base
+
+        for field, i in self.numeric:
+            out[:, i] = np.asarray(inputs[field], dtype=np.float32) * self.slope[i] + self.offset[i]
+
+        calendar, days = self._calendar_rows([str(date) for date in inputs["date"]])
+        if len(self.calendar_index):
+            out[:, self.calendar_index] = calendar[:, self.calendar_source]
+        if self.trend_index is not None:
+            day_of_year = calendar[:, CalendarFeatures.COLUMNS.index("day_of_year")]
+            trend = np.asarray(inputs["onpromotion"], dtype=np.float32) * day_of_year
+            out[:, self.trend_index] = trend * self.slope[self.trend_index] + self.offset[self.trend_index]
+
+        if len(self.lag_index):
+            rows = [self.lag_rows.get(key, -1) for key in zip(inputs["store_nbr"], inputs["family"], days)]
+            out[:, self.lag_index] = self.lag_values[rows]
+
+        for col, (i, codes) in self.codes.items():
+            out[:, i] = [codes.get(value, np.nan) for value in inputs[col]]
+        for col, columns in self.dummies.items():
+            # The training baseline value and unseen values have no column: all dummies stay 0
+            targets = [columns.get(value, -1) for value in inputs[col]]
+            rows = [row for row, target in enumerate(targets) if target >= 0]
+            out[rows, [targets[row] for row in rows]] = 1.0
+        return out
+
+    def frame(self, matrix: np.ndarray) -> pd.DataFrame:
+        """Feature matrix as a DataFrame, with category dtypes restored, for models that need names."""
+        df = pd.DataFrame(matrix, columns=self.feature_names, copy=False)
+        for col, values in self.vocabulary.items():
+            codes = df[col].to_numpy()
+            df[col] = pd.Categorical.from_codes(np.where(np.isnan(codes), -1, codes).astype(np.int64),
+                                                categories=values)
+        return df
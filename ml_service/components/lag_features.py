@@ -0,0 +1,216 @@
+from pathlib import Path
+from typing import Sequence
+import numpy as np
+import pandas as pd
+import joblib
+
+
+class LagFeatureGenerator:
+    """Lag, rolling-window and expanding sales features over the (store_nbr, family) panel.
+
+    Rows are scattered into a dense series x day grid (one contiguous row per
+    series), so every feature is a shifted read or a difference of cumulative
+    sums along the day axis. Cost is linear in the number of rows plus the grid
+    size, with no per-group Python work. Days missing from the data (e.g.
+    Christmas) stay empty in the grid, so lags are exact calendar-day lags.
+
+    Features at day t only use target values up to day t - `horizon`, the
+    forecast horizon: every row is featurized as if forecast from an origin
+    `horizon` days earlier. Test rows, at most `horizon` days past the last
+    known sales, then get complete features, and validation rows get them
+    at the same density as train rows without reading their own period.
+    Lags shorter than the horizon would be missing for most test rows and
+    are rejected.
+
+    For incremental updates, `update_state` keeps the last `lookback` days of
+    target values plus per-series totals of everything older, so new days are
+    featurized with `transform(df, from_state=True)` without the full history.
+    """
+
+    def __init__(self, lags: Sequence[int] = (16, 21, 28, 35), rolling_windows: Sequence[int] = (7, 28),
+                 expanding: bool = True, horizon: int = 16,
+                 target: str = "sales", keys: Sequence[str] = ("store_nbr", "family"),
+                 date_column: str = "date") -> None:
+        self.horizon = int(horizon)
+        if self.horizon < 1:
+            raise ValueError(f"horizon must be at least 1 day, got {horizon}")
+        self.lags = sorted(int(lag) for lag in lags)
+        short = [lag for lag in self.lags if lag < self.horizon]
+        if short:
+            raise ValueError(f"Lags {short} are shorter than the {self.horizon}-day horizon; "
+                             "those sales are unknown when forecasting from the origin")
+        self.rolling_windows = sorted(int(window) for window in rolling_windows)
+        self.expanding = expanding
+        self.target = target
+        self.keys = list(keys)
+        self.date_column = date_column
+        self.history = None  # last `lookback` days of target values
+        self.base = None     # per-series sum/count of target values older than `history`
+
+    @property
+    def lookback(self) -> int:
+        """Days of history the lag and rolling features of a day read."""
+        windows = [self.horizon + window - 1 for window in self.rolling_windows]
+        return max(self.lags + windows + [self.horizon])
+
+    @property
+    def columns(self):
+        """Names of the generated columns."""
+        columns = [f"{self.target}_lag_{lag}" for lag in self.lags]
+        for window in self.rolling_windows:
+            columns += [f"{self.target}_roll_mean_{window}", f"{self.target}_roll_std_{window}"]
+        if self.expanding:
+            columns.append(f"{self.target}_expanding_mean")
+        return columns
+
+    def _frame(self, df: pd.DataFrame, from_state: bool) -> pd.DataFrame:
+        frame = df[self.keys + [self.date_column, self.target]]
+        if from_state:
+            if self.history is None:
+                raise ValueError("No stored state; run update_state on the full history first")
+            frame = pd.concat([self.history, frame], ignore_index=True)
+        return frame
+
+    def _target(self, frame: pd.DataFrame) -> np.ndarray:
+        return frame[self.target].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def _series_keys(self, frame: pd.DataFrame, rows=None) -> pd.DataFrame:
+        """Key columns with categoricals as plain values, so frames with different categories join."""
+        keys = frame[self.keys] if rows is None else frame[self.keys].iloc[rows]
+        return keys.astype({col: object for col in self.keys
+                            if isinstance(keys[col].dtype, pd.CategoricalDtype)}).reset_index(drop=True)
+
+    def _grid(self, frame: pd.DataFrame):
+        """Scatter the target into a series x day grid; returns (grid, series code, day code) per row."""
+        series = frame.groupby(self.keys, observed=True, sort=False).ngroup().to_numpy()
+        dates = pd.to_datetime(frame[self.date_column])
+        day = ((dates - dates.min()) // pd.Timedelta(days=1)).to_numpy().astype(np.int64)
+
+        values = self._target(frame)
+        known = ~np.isnan(values)
+        # Rows without a target (test) must not overwrite a known value on the same day
+        grid = np.full((series.max() + 1, day.max() + 1), np.nan)
+        grid[series[known], day[known]] = values[known]
+        return grid, series, day
+
+    def _base_totals(self, frame: pd.DataFrame, series: np.ndarray):
+        """Stored sum/count of older values for each series code."""
+        codes, first = np.unique(series, return_index=True)
+        totals = np.zeros((codes.max() + 1, 2))
+        if self.base is not None and len(self.base):
+            keys = self._series_keys(frame, first)
+            matched = keys.merge(self.base, on=self.keys, how="left")[["sum", "count"]]
+            totals[codes] = matched.fillna(0).to_numpy()
+        return totals[:, 0], totals[:, 1]
+
+    @staticmethod
+    def _prefix(values: np.ndarray) -> np.ndarray:
+        """Cumulative sums along the day axis with a leading zero column: out[:, t] = sum(values[:, :t])."""
+        out = np.zeros((values.shape[0], values.shape[1] + 1))
+        np.cumsum(values, axis=1, out=out[:, 1:])
+        return out
+
+    def _window_stats(self, known: np.ndarray, filled: np.ndarray, count: np.ndarray, total: np.ndarray,
+                      window: int):
+        """Mean and sample std over days [t - horizon - window + 1, t - horizon], for every grid day t.
+
+        The std sums squared deviations from each window's own mean, one pass
+        per day of the window, rather than taking sum(x^2) - n * mean^2 from
+        prefix sums, which loses all precision once the prefix of squares
+        dwarfs the window's spread.
+        """
+        n_days = filled.shape[1]
+        day = np.arange(n_days)
+        hi = np.clip(day - self.horizon + 1, 0, n_days)
+        lo = np.clip(day - self.horizon - window + 1, 0, n_days)
+        n = count[:, hi] - count[:, lo]
+        mean = np.where(n > 0, (total[:, hi] - total[:, lo]) / n, np.nan)
+
+        squares = np.zeros_like(filled)
+        for offset in range(self.horizon, min(self.horizon + window, n_days)):
+            deviation = filled[:, :n_days - offset] - mean[:, offset:]
+            squares[:, offset:] += np.where(known[:, :n_days - offset], deviation ** 2, 0.0)
+        std = np.sqrt(np.where(n > 1, squares / (n - 1), np.nan))
+        return mean, std
+
+    def transform(self, df: pd.DataFrame, from_state: bool = False) -> pd.DataFrame:
+        """Add the lag/rolling/expanding columns to `df` in place and return it.
+
+        With `from_state`, `df` holds only days after the stored history, which
+        is prepended as lookback.
+        """
+        frame = self._frame(df, from_state)
+        skip = len(frame) - len(df)
+        grid, series, day = self._grid(frame)
+
+        known = ~np.isnan(grid)
+        filled = np.where(known, grid, 0.0)
+        count = self._prefix(known.astype(np.float64))
+        total = self._prefix(filled)
+        base_sum, base_count = self._base_totals(frame, series) if from_state else (0.0, 0.0)
+        series, day = series[skip:], day[skip:]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for lag in self.lags:
+                source = day - lag
+                values = grid[series, np.maximum(source, 0)]
+                df[f"{self.target}_lag_{lag}"] = np.where(source >= 0, values, np.nan).astype(np.float32)
+
+            for window in self.rolling_windows:
+                mean, std = self._window_stats(known, filled, count, total, window)
+                df[f"{self.target}_roll_mean_{window}"] = mean[series, day].astype(np.float32)
+                df[f"{self.target}_roll_std_{window}"] = std[series, day].astype(np.float32)
+
+            if self.expanding:
+                if from_state:
+                    base_sum, base_count = base_sum[series], base_count[series]
+                # Days up to t - horizon
+                end = np.maximum(day - self.horizon + 1, 0)
+                n = base_count + count[series, end]
+                df[f"{self.target}_expanding_mean"] = np.where(
+                    n > 0, (base_sum + total[series, end]) / n, np.nan).astype(np.float32)
+
+        return df
+
+    def forecast_rows(self) -> pd.DataFrame:
+        """Keys, date and features of every stored series for the `horizon` days after the stored history.
+
+        Those days only read stored sales, so their features are the ones the
+        feature stage gives test rows.
+        """
+        if self.history is None:
+            raise ValueError("No stored state; run update_state on the full history first")
+        last = pd.to_datetime(self.history[self.date_column]).max()
+        dates = pd.date_range(last + pd.Timedelta(days=1), periods=self.horizon, freq="D")
+        series = self._series_keys(self.history.drop_duplicates(subset=self.keys))
+        rows = series.merge(pd.DataFrame({self.date_column: dates}), how="cross")
+        rows[self.target] = np.nan
+        return self.transform(rows, from_state=True).drop(columns=[self.target])
+
+    def update_state(self, df: pd.DataFrame, from_state: bool = False) -> "LagFeatureGenerator":
+        """Roll the stored lookback forward over the rows of `df` (rows with a known target only)."""
+        frame = self._frame(df, from_state)
+        # Rows duplicated by the holiday merge hold the same value; the grid counts it once
+        frame = frame.drop_duplicates(subset=self.keys + [self.date_column], ignore_index=True)
+        dates = pd.to_datetime(frame[self.date_column])
+        start = dates.max() - pd.Timedelta(days=self.lookback - 1)
+        older = dates < start
+
+        expired = frame.loc[older.to_numpy(), self.keys].reset_index(drop=True)
+        expired = self._series_keys(expired).assign(value=self._target(frame)[older.to_numpy()])
+        totals = expired.groupby(self.keys, sort=False).agg(sum=("value", "sum"), count=("value", "count"))
+        totals = totals.reset_index()
+        if from_state and self.base is not None:
+            totals = pd.concat([self.base, totals]).groupby(self.keys, sort=False).sum().reset_index()
+
+        self.base = totals
+        self.history = frame.loc[~older.to_numpy()].reset_index(drop=True)
+        return self
+
+    def save(self, path: Path) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path: Path) -> "LagFeatureGenerator":
+        return joblib.load(path)
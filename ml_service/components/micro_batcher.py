@@ -0,0 +1,138 @@
+import asyncio
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+import numpy as np
+
+
+class MicroBatcher:
+    """Groups concurrent single-row predictions into one model call.
+
+    `submit` queues a row and awaits its prediction. A background task takes
+    the oldest queued row and waits until `max_batch_size` rows are queued
+    or `max_wait_ms` has passed since that row arrived, whichever comes first.
+    It then predicts all of them with one `predict` call on a worker thread
+    and resolves each caller's future. Rows that arrive while a batch is being
+    scored form the next batch, so batches grow with load and a lone request
+    waits at most `max_wait_ms`.
+
+    `metrics` reports the batch-size distribution (power-of-two buckets) and
+    queue wait / predict time percentiles over the last `window` batches/rows.
+    """
+
+    def __init__(self, predict: Callable[[Dict[str, list]], np.ndarray], max_batch_size: int,
+                 max_wait_ms: float, window: int = 10000) -> None:
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.pending = deque()
+        self.in_flight = []
+        self.ready: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+        self.batch_sizes = Counter()
+        self.queue_waits = deque(maxlen=window)
+        self.predict_times = deque(maxlen=window)
+        self.rows = 0
+        self.batches = 0
+        self.failed_batches = 0
+
+    def start(self) -> None:
+        """Start the batching task on the running event loop."""
+        self.ready = asyncio.Event()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="micro-batcher")
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop batching; queued and in-flight rows fail with CancelledError."""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        for _, future, _ in [*self.in_flight, *self.pending]:
+            future.cancel()
+        self.pending.clear()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+    async def submit(self, row: Dict) -> float:
+        """Prediction of one row ({field: value})."""
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((row, future, time.perf_counter()))
+        self.ready.set()
+        return await future
+
+    async def _next_batch(self) -> list:
+        """Oldest queued rows, once the batch is full or the oldest row has waited max_wait."""
+        while not self.pending:
+            self.ready.clear()
+            await self.ready.wait()
+
+        deadline = self.pending[0][2] + self.max_wait
+        while len(self.pending) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            self.ready.clear()
+            try:
+                await asyncio.wait_for(self.ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return [self.pending.popleft() for _ in range(min(self.max_batch_size, len(self.pending)))]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self.in_flight = await self._next_batch()
+            started = time.perf_counter()
+            rows = [row for row, _, _ in batch]
+            inputs = {name: [row[name] for row in rows] for name in rows[0]}
+            try:
+                predictions = await loop.run_in_executor(self.executor, self.predict, inputs)
+            except Exception as e:
+                self.failed_batches += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                # Callers that disconnected have cancelled their future
+                for (_, future, _), prediction in zip(batch, predictions):
+                    if not future.done():
+                        future.set_result(float(prediction))
+            self.in_flight = []
+            self._record(batch, started, time.perf_counter())
+
+    def _record(self, batch: list, started: float, finished: float) -> None:
+        self.batches += 1
+        self.rows += len(batch)
+        self.batch_sizes[1 << (len(batch) - 1).bit_length()] += 1
+        self.queue_waits.extend(started - enqueued for _, _, enqueued in batch)
+        self.predict_times.append(finished - started)
+
+    @staticmethod
+    def _percentiles_ms(seconds: deque) -> Dict[str, float]:
+        if not seconds:
+            return {}
+        values = np.asarray(seconds) * 1e3
+        return {"mean": float(values.mean()), "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)), "p99": float(np.percentile(values, 99)),
+                "max": float(values.max())}
+
+    def metrics(self) -> Dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1e3,
+            "queued": len(self.pending),
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            # Batches per size bucket: "4" counts batches of 3-4 rows
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            "queue_wait_ms": self._percentiles_ms(self.queue_waits),
+            "predict_ms": self._percentiles_ms(self.predict_times),
+        }
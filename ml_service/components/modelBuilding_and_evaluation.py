@@ -1,86 +1,540 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
 import numpy as np
-import mlflow
 import joblib
 from sklearn.metrics import mean_squared_error, mean_absolute_error
-from urllib.parse import urlparse
+import xgboost as xgb
 from xgboost import XGBRegressor
-from ml_service.utils.main_utils import save_json
+from ml_service.components.model_backends import MODEL_PARAMS, XGBoostBackend, get_backend
+from ml_service.utils.main_utils import save_json, load_json, load_dataframe, iter_dataframe
+from ml_service.components.training_matrix import TrainingMatrixCache
+from ml_service.components.segment_router import SegmentRouter, SEGMENT_COLUMNS
+from ml_service.components.tree_predictor import compile_model
+from ml_service.components.segment_metrics import SegmentMetrics
+from ml_service.components.experiment_tracker import ExperimentTracker
 from ml_service.constants import PARAMS_FILE_PATH
-from mlflow.models import infer_signature
+
+
+# params.yaml METRIC -> XGBoost eval_metric
+EVAL_METRICS = {"RMSLE": "rmsle", "RMSE": "rmse", "MAE": "mae"}
+
+
+def regression_metrics(y_true, y_pred) -> dict:
+    """RMSE, MAE and RMSLE of a prediction (negative predictions are clipped for RMSLE)."""
+    rmse = np.sqrt(mean_squared_error(y_true, y_pred))
+    mae = mean_absolute_error(y_true, y_pred)
+    rmsle = np.sqrt(np.mean(np.square(np.log1p(np.maximum(y_pred, 0)) - np.log1p(y_true))))
+    return {"rmse": float(rmse), "mae": float(mae), "rmsle": float(rmsle)}
+
+
+def cpu_budget() -> int:
+    """CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _evaluate_fold(config, fold: dict, n_jobs: int) -> dict:
+    """Train on the rows before a fold's window and score the window (runs in a worker process).
+
+    With early stopping, the fold's early-stopping days are held out of its
+    training rows and pick its number of rounds, as the validation split does
+    for the final model.
+    """
+    process = ModelBuildingAndEvaluation(config)
+    process.load_vocabulary()
+    val_range = (pd.Timestamp(fold["val_start"]), pd.Timestamp(fold["val_end"]) + pd.Timedelta(days=1))
+    X_val, y_val = process.load_split(val_range)
+    process.feature_columns = list(X_val.columns)
+
+    train_range = (None, pd.Timestamp(fold["train_end"]) + pd.Timedelta(days=1))
+    stop_range = None
+    if "early_stopping_start" in fold:
+        stop_range = (pd.Timestamp(fold["early_stopping_start"]), val_range[0])
+    model = process.build_model(n_jobs=n_jobs)
+    if config.training_data.mode == "in_memory":
+        X_stop, y_stop = process.load_split(stop_range) if stop_range else (None, None)
+        process.fit_model(model, *process.load_split(train_range), X_stop, y_stop)
+    elif stop_range:
+        process.fit_from_cache(process.with_early_stopping(model), train_range, name=f"cv_fold{fold['fold']}",
+                               eval_range=stop_range)
+        process.keep_best_trees(model)
+    else:
+        process.fit_from_cache(model, train_range, name=f"cv_fold{fold['fold']}")
+
+    return {**fold, "rows": len(y_val), "best_iteration": process.backend.best_iteration(model),
+            **regression_metrics(y_val, model.predict(X_val))}
+
+
+def _fit_segment(config, segment: str, X, y, X_val, y_val, n_jobs: int):
+    """Fit the model of one segment, early-stopped on its validation rows (runs in a worker process)."""
+    process = ModelBuildingAndEvaluation(config)
+    model = process.fit_model(process.build_model(n_jobs=n_jobs), X, y, X_val, y_val)
+    return segment, model
 
 
 class ModelBuildingAndEvaluation:
     """Train, Evaluate Model and Track Results with MLflow."""
     def __init__(self, config):
         self.config = config
+        self.backend = get_backend(config.all_params.get("MODEL_TYPE", "XGBoost"))
         self.model = None
         self.X_train = None
         self.y_train = None
         self.X_test = None
         self.y_test = None
+        self.feature_columns = None
+        self.categories = {}
+        self.best_iteration = None
+        self.previous_model = None
+        self.warm_start_report = None
+        self.warm_start_dates = None
+        self.warm_start_sets = None
+        self.segments_train = None
+        self.segments_test = None
+        self.segment_report = None
+        self.tracker = ExperimentTracker(config.tracking)
+
+    def validation_range(self):
+        """Validation window as a half-open (start, end) date range; end None means open-ended."""
+        start = pd.Timestamp(self.config.validation_start)
+        end = self.config.validation_end
+        return start, pd.Timestamp(end) + pd.Timedelta(days=1) if end else None
+
+    def drop_columns(self):
+        """Columns of the feature files that are not model inputs (target included)."""
+        if self.config.encoding == "categorical":
+            # Category codes are model inputs, handled natively (or encoded) by the model backend
+            return ["sales", "date"]
+        return ["family", "state", "city", "type_x", "type_y", "sales", "date"]
+
+    def align_categories(self, df):
+        """Give categorical inputs the fitted vocabulary, so codes match what the model was trained on."""
+        for col, values in self.categories.items():
+            if col in df.columns:
+                df[col] = pd.Categorical(df[col].astype(str), categories=values)
+        return df
 
     def load_data(self):
-        """Load, sample, and split data into train/val sets."""
-        train_df = pd.read_csv(self.config.input_train_file)
-        test_df = pd.read_csv(self.config.input_test_file)
+        """Load the train/val splits, reading only the date partitions each one needs.
 
-        # Ensure 'date' is datetime
-        train_df["date"] = pd.to_datetime(train_df["date"])
+        With a cached training matrix the train split is not loaded here; it is
+        streamed into the cache by `train_model`. When warm-starting from the
+        saved model, only the sets of `warm_start_ranges` are loaded.
+        """
         # train_df = train_df.sample(n=50000, random_state=42).reset_index(drop=True)
+        self.load_vocabulary()
 
         # Split into training and validation
-        train_split = train_df[train_df["date"].dt.year <= 2016].reset_index(drop=True)
-        val_split = train_df[train_df["date"].dt.year == 2017].reset_index(drop=True)
+        val_start, val_end = self.validation_range()
+        self.X_test, self.y_test, self.segments_test = self.load_split((val_start, val_end), with_segments=True)
+        self.feature_columns = list(self.X_test.columns)
+
+        self.previous_model = self.load_previous_model()
+        if self.previous_model is not None:
+            self.warm_start_dates = self.warm_start_ranges()
+            self.warm_start_sets = {name: self.load_split(date_range)
+                                    for name, date_range in self.warm_start_dates.items()}
+            self.X_train, self.y_train = self.warm_start_sets["window"]
+        elif self.config.training_data.mode == "in_memory" or self.config.segmentation.enabled:
+            # Segments are sliced from the in-memory split
+            self.X_train, self.y_train, self.segments_train = self.load_split((None, val_start), with_segments=True)
+
+    def warm_start_ranges(self) -> dict:
+        """Half-open date ranges of the warm-start sets, anchored on the newest day of the feature file.
 
-        cat_columns = ["family", "state", "city", "type_x", "type_y", "sales", "date"]
+        holdout: the newest `holdout_days`, scoring promotion. window: the
+        `window_days` before them, trained on. early_stopping: the last
+        `holdout_days` of the window, taken out of it, when add_trees
+        early-stops.
+        """
+        warm_start = self.config.warm_start
+        newest = load_dataframe(self.config.input_train_file, columns=["date"])["date"].max()
+        holdout_start = newest + pd.Timedelta(days=1 - warm_start.holdout_days)
+        ranges = {"window": (holdout_start - pd.Timedelta(days=warm_start.window_days), holdout_start),
+                  "holdout": (holdout_start, newest + pd.Timedelta(days=1))}
+        if warm_start.mode == "add_trees" and self.early_stopping_rounds():
+            stop_start = holdout_start - pd.Timedelta(days=warm_start.holdout_days)
+            ranges["window"] = (ranges["window"][0], stop_start)
+            ranges["early_stopping"] = (stop_start, holdout_start)
+        return ranges
+
+    def load_previous_model(self):
+        """Saved model to warm-start from, or None (disabled, missing, or trained on other features)."""
+        if not self.config.warm_start.enabled or self.config.segmentation.enabled:
+            return None
+        if not Path(self.config.path_of_model).exists():
+            print(f"⚠️ No model at {self.config.path_of_model} to warm-start from, training from scratch")
+            return None
+
+        model = joblib.load(self.config.path_of_model)
+        if list(getattr(model, "feature_names_in_", [])) != self.feature_columns:
+            print("⚠️ Saved model was trained on different features, training from scratch")
+            return None
+        return model
+
+    def load_vocabulary(self):
+        """Category vocabulary of the feature stage (categorical encoding only)."""
+        if self.config.encoding == "categorical" and Path(self.config.vocabulary_file).exists():
+            vocabulary = load_json(Path(self.config.vocabulary_file))
+            self.categories = {col: list(values) for col, values in vocabulary.items()}
+
+    def load_split(self, date_range, with_segments: bool = False):
+        """Model inputs and target of the train rows with start <= date < end
+        (plus their segment labels, None unless segmented, if `with_segments`)."""
         target_col = "sales"   # or whatever target is
+        split = load_dataframe(self.config.input_train_file, date_range=date_range)
+        X, y = self.align_categories(split.drop(columns=self.drop_columns())), split[target_col]
+        return (X, y, self.segment_labels(split)) if with_segments else (X, y)
+
+    def segment_labels(self, df):
+        """Segment of every row of a feature frame, or None when training a single model."""
+        if not self.config.segmentation.enabled:
+            return None
+        return SegmentRouter.segment_labels(df[SEGMENT_COLUMNS[self.config.segmentation.key]])
 
-        self.X_train = train_split.drop(columns=cat_columns)
-        self.y_train = train_split[target_col]
+    def predict(self, X, segments=None):
+        """Predict with the trained model, routing rows by segment for a segmented model."""
+        if isinstance(self.model, SegmentRouter):
+            return self.model.predict(X, segments)
+        return self.model.predict(X)
 
-        self.X_test = val_split.drop(columns=cat_columns)
-        self.y_test = val_split[target_col]
-    
+    def build_model(self, n_jobs=None, params: dict = None):
+        """Unfitted MODEL_TYPE model from the params file; `params` overrides params-file keys,
+        `n_jobs` caps its threads."""
+        params = {**self.config.all_params, **(params or {})}
+        return self.backend.build(params, n_jobs=n_jobs, categorical=self.config.encoding == "categorical")
+
+    def eval_metric(self) -> str:
+        return EVAL_METRICS[str(self.config.all_params["METRIC"]).upper()]
+
+    def fit_model(self, model, X, y, X_val=None, y_val=None, **fit_params):
+        """Fit with the model backend, early-stopped on (X_val, y_val) if EARLY_STOPPING_ROUNDS is set
+        and the backend supports it."""
+        eval_set = [(X_val, y_val)] if self.early_stopping_rounds() and X_val is not None and len(y_val) else None
+        return self.backend.fit(model, X, y, eval_set=eval_set, early_stopping_rounds=self.early_stopping_rounds(),
+                                eval_metric=self.eval_metric(), **fit_params)
+
+    def early_stopping_rounds(self):
+        """Patience of early stopping on the validation split; None when disabled."""
+        return int(self.config.all_params.get("EARLY_STOPPING_ROUNDS") or 0) or None
 
     def train_model(self):
-        """Train XGBoost Model based on config parameters."""
-        self.model = XGBRegressor(
-            random_state=self.config.all_params["RANDOM_STATE"],
-            n_estimators=self.config.all_params["N_ESTIMATORS"],
-            learning_rate=self.config.all_params["LEARNING_RATE"],
-            max_depth=self.config.all_params["MAX_DEPTH"],
-            subsample=self.config.all_params["SUBSAMPLE"],
-            colsample_bytree=self.config.all_params["COLSAMPLE_BY_TREE"],
-            objective=self.config.all_params["OBJECTIVE"]
-        )
-
-        self.model.fit(self.X_train, self.y_train)
+        """Train XGBoost Model based on config parameters.
+
+        With EARLY_STOPPING_ROUNDS, boosting stops once METRIC on the validation
+        split has not improved for that many rounds (N_ESTIMATORS stays the
+        upper bound) and the saved model keeps only the trees up to the best
+        iteration (backends that cannot early-stop on it fit every round).
+        """
+        if self.config.segmentation.enabled:
+            self.model = self.train_segments()
+        elif self.previous_model is not None:
+            self.warm_start()
+        else:
+            self.model = self.build_model()
+
+            val_start, val_end = self.validation_range()
+            if self.config.training_data.mode == "in_memory":
+                self.fit_model(self.model, self.X_train, self.y_train, self.X_test, self.y_test)
+            else:
+                self.fit_from_cache(self.with_early_stopping(self.model), (None, val_start),
+                                    eval_range=(val_start, val_end))
+                self.keep_best_trees(self.model)
+
+            self.best_iteration = self.backend.best_iteration(self.model)
+            if self.best_iteration is not None:
+                print(f"✅ Early stopping: best iteration {self.best_iteration}, "
+                      f"keeping {self.best_iteration + 1} iterations")
 
         # Save trained model
         os.makedirs(Path(self.config.path_of_model).parent, exist_ok=True)
         joblib.dump(self.model, self.config.path_of_model)
 
-    def evaluate(self) -> dict:
-        """Evaluate Model and Save Metrics."""
-        y_pred = self.model.predict(self.X_test)
-        rmse = np.sqrt(mean_squared_error(self.y_test, y_pred))
-        mae = mean_absolute_error(self.y_test, y_pred)
-        rmsle = np.sqrt(np.mean(np.square(np.log1p(np.maximum(y_pred, 0)) - np.log1p(self.y_test))))
+    def export_compiled_model(self):
+        """Save the trained model as NumPy arrays for serving without XGBoost.
+
+        The compiled model must reproduce the model's predictions on the
+        validation split within float32 tolerance, otherwise nothing is saved.
+        Only XGBoost models compile; for other backends a stale compiled file
+        is removed so app.py serves model_file.
+        """
+        if not isinstance(self.backend, XGBoostBackend):
+            Path(self.config.compiled_model_file).unlink(missing_ok=True)
+            print(f"⚠️ {self.backend.name} models are not compiled, serving uses {self.config.path_of_model}")
+            return
+
+        compiled = compile_model(self.model)
+        # Checked batch_rows rows at a time, so neither model scores the whole split at once
+        step = self.config.training_data.batch_rows
+        for start in range(0, len(self.X_test), step):
+            X = self.X_test.iloc[start:start + step]
+            segments = None if self.segments_test is None else self.segments_test[start:start + step]
+            expected = self.predict(X, segments)
+            if isinstance(compiled, SegmentRouter):
+                actual = compiled.predict(X, segments)
+            else:
+                actual = compiled.predict(X)
+
+            if not np.allclose(actual, expected, rtol=1e-4, atol=1e-3):
+                worst = float(np.max(np.abs(actual - expected)))
+                raise ValueError(f"Compiled model predictions differ from the model by up to {worst}")
+
+        joblib.dump(compiled, self.config.compiled_model_file)
+        print(f"✅ Compiled model verified on {len(self.X_test)} rows, saved to: {self.config.compiled_model_file}")
+
+    def with_early_stopping(self, model: XGBRegressor) -> XGBRegressor:
+        return XGBoostBackend.with_early_stopping(model, self.early_stopping_rounds(), self.eval_metric())
 
-        metrics = {"rmse": rmse, "mae": mae, "rmsle": rmsle}
+    def keep_best_trees(self, model: XGBRegressor) -> XGBRegressor:
+        """Drop the trees fit after the best iteration of an early-stopped XGBoost model."""
+        return XGBoostBackend.keep_best_trees(model)
+
+    def train_segments(self) -> SegmentRouter:
+        """Train one model per segment in parallel processes and combine them in a router.
+
+        Each of the `workers` processes gets an equal share of the CPUs. With
+        `retrain` set, only those segments are fit again and the others are
+        reused from the saved router (if it uses the same key and features).
+        """
+        segmentation = self.config.segmentation
+        reused = {}
+        if segmentation.retrain and Path(self.config.path_of_model).exists():
+            previous = joblib.load(self.config.path_of_model)
+            if (isinstance(previous, SegmentRouter) and previous.key == segmentation.key
+                    and list(previous.feature_names_in_) == self.feature_columns):
+                retrain = {str(segment) for segment in segmentation.retrain}
+                reused = {segment: model for segment, model in previous.models.items() if segment not in retrain}
+            else:
+                print(f"⚠️ Saved model is not a {segmentation.key} router on these features, training all segments")
+
+        train_rows = pd.DataFrame({"segment": self.segments_train}).groupby("segment").indices
+        val_rows = pd.DataFrame({"segment": self.segments_test}).groupby("segment").indices
+        segments = [segment for segment in train_rows if segment not in reused]
+        empty = np.array([], dtype=np.int64)
+
+        cpus = cpu_budget()
+        workers = max(1, min(segmentation.workers or cpus, len(segments), cpus))
+        n_jobs = max(1, cpus // workers)
+        print(f"⏳ Training {len(segments)} {segmentation.key} segments on {workers} processes x {n_jobs} threads"
+              f"{f', reusing {len(reused)}' if reused else ''}")
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_fit_segment, [self.config] * len(segments), segments,
+                               [self.X_train.iloc[train_rows[segment]] for segment in segments],
+                               [self.y_train.iloc[train_rows[segment]] for segment in segments],
+                               [self.X_test.iloc[val_rows.get(segment, empty)] for segment in segments],
+                               [self.y_test.iloc[val_rows.get(segment, empty)] for segment in segments],
+                               [n_jobs] * len(segments))
+            models = {**reused, **dict(results)}
+
+        self.segment_report = {"key": segmentation.key, "trained": segments, "reused": sorted(reused)}
+        return SegmentRouter(segmentation.key, models)
+
+    def warm_start(self):
+        """Update the saved model on the newest rows and promote it only if it validates no worse.
+
+        add_trees boosts up to `new_trees` more trees on top of the saved ones
+        (early-stopped like a full fit); refresh_leaves keeps the tree
+        structure and re-fits the leaf values. Either way the cost depends on
+        the window, not the whole history. The candidate and the saved model
+        are scored on the holdout of the newest days, which neither trains
+        nor early-stops the candidate; the saved model stays in place unless
+        the candidate's METRIC is at least as good there.
+        """
+        warm_start = self.config.warm_start
+        previous = self.previous_model
+        booster = previous.get_booster()
+        X_holdout, y_holdout = self.warm_start_sets["holdout"]
+
+        if warm_start.mode == "add_trees":
+            candidate = self.build_model(params={"N_ESTIMATORS": warm_start.new_trees})
+            self.fit_model(candidate, self.X_train, self.y_train, *self.warm_start_sets.get("early_stopping", ()),
+                           xgb_model=booster)
+        else:
+            params = {**self.booster_params(previous),
+                      "process_type": "update", "updater": "refresh", "refresh_leaf": True}
+            # The refresh updater needs a plain DMatrix; the window is small enough to hold
+            window = xgb.DMatrix(self.X_train, self.y_train, enable_categorical=self.config.encoding == "categorical")
+            refreshed = xgb.train(params, window, num_boost_round=booster.num_boosted_rounds(), xgb_model=booster)
+            candidate = self.build_model()
+            candidate.load_model(bytearray(refreshed.save_raw("ubj")))
+
+        metric = str(self.config.all_params["METRIC"]).lower()
+        previous_metrics = regression_metrics(y_holdout, previous.predict(X_holdout))
+        candidate_metrics = regression_metrics(y_holdout, candidate.predict(X_holdout))
+        promoted = candidate_metrics[metric] <= previous_metrics[metric]
+
+        self.model = candidate if promoted else previous
+        if self.early_stopping_rounds():
+            self.best_iteration = self.model.get_booster().num_boosted_rounds() - 1
+        self.warm_start_report = {
+            "mode": warm_start.mode,
+            "window_rows": len(self.y_train),
+            "ranges": {name: [str(start.date()), str((end - pd.Timedelta(days=1)).date())]
+                       for name, (start, end) in self.warm_start_dates.items()},
+            "holdout_rows": len(y_holdout),
+            "trees": {"previous": booster.num_boosted_rounds(),
+                      "candidate": candidate.get_booster().num_boosted_rounds()},
+            "previous": previous_metrics,
+            "candidate": candidate_metrics,
+            "promoted": promoted,
+        }
+        print(f"{'✅ Promoted' if promoted else '⚠️ Kept previous model, not promoted'}: "
+              f"{metric} {previous_metrics[metric]:.5f} -> {candidate_metrics[metric]:.5f}")
+
+    def matrix_cache(self) -> TrainingMatrixCache:
+        training_data = self.config.training_data
+        return TrainingMatrixCache(training_data.cache_dir, training_data.batch_rows, training_data.max_bin,
+                                   external_memory=training_data.mode == "external_memory",
+                                   hash_mode=training_data.hash_mode)
+
+    def cached_rows(self, cache: TrainingMatrixCache, date_range, name: str) -> Path:
+        """Cache entry of the train rows in `date_range` (built on first use)."""
+        entry = cache.build(name, self.config.input_train_file, date_range=date_range,
+                            drop=[col for col in self.drop_columns() if col != "sales"],
+                            target="sales", categories=self.categories)
+        if self.feature_columns is not None and cache.meta(entry)["feature_names"] != self.feature_columns:
+            raise ValueError(f"Cached training matrix {entry} does not have the validation columns")
+        return entry
+
+    def booster_params(self, model: XGBRegressor) -> dict:
+        """Native `xgb.train` parameters equivalent to the estimator's."""
+        params = {key: value for key, value in model.get_xgb_params().items() if value is not None}
+        if "n_jobs" in params:
+            params["nthread"] = params.pop("n_jobs")
+        return {**params, "max_bin": self.config.training_data.max_bin}
+
+    def fit_from_cache(self, model: XGBRegressor, date_range, name: str = "train", eval_range=None):
+        """Train `model` on the cached matrix of the train rows in `date_range`.
+
+        If the model has early_stopping_rounds, the cached rows in `eval_range`
+        are the validation set.
+        """
+        cache = self.matrix_cache()
+        dtrain = cache.dmatrix(self.cached_rows(cache, date_range, name))
+        evals = []
+        if model.early_stopping_rounds and eval_range is not None:
+            evals = [(cache.dmatrix(self.cached_rows(cache, eval_range, "valid"), ref=dtrain), "valid")]
+
+        booster = xgb.train(self.booster_params(model), dtrain, num_boost_round=model.n_estimators, evals=evals,
+                            early_stopping_rounds=model.early_stopping_rounds if evals else None,
+                            verbose_eval=False)
+        # Same estimator as a fit() would give, so evaluation, saving and serving are unchanged
+        model.load_model(bytearray(booster.save_raw("ubj")))
+        return model
+
+    def cv_folds(self) -> list:
+        """Rolling-origin folds over the days before the validation window.
+
+        The last N_FOLDS windows of `horizon_days` days before validation_start
+        are scored in turn, each by a model trained on every earlier day
+        (expanding window). With early stopping, the last `horizon_days` of
+        those earlier days are the fold's early-stopping set instead of
+        training rows. Fold dates are inclusive. Lag features read sales
+        at least lag_features.horizon days back, no fewer than `horizon_days`
+        (checked by the configuration), so every fold is scored with features
+        known at its own origin, as the test period is.
+        """
+        n_folds = int(self.config.all_params["N_FOLDS"])
+        horizon = pd.Timedelta(days=self.config.cross_validation.horizon_days)
+        stopping = horizon if self.early_stopping_rounds() and self.backend.early_stopping else pd.Timedelta(0)
+        val_start = self.validation_range()[0]
+        first_date = load_dataframe(self.config.input_train_file, columns=["date"],
+                                    date_range=(None, val_start))["date"].min()
+
+        folds = []
+        for fold in range(n_folds):
+            fold_end = val_start - (n_folds - 1 - fold) * horizon
+            fold_start = fold_end - horizon
+            train_end = fold_start - stopping
+            if train_end <= first_date:
+                raise ValueError(f"Not enough history before {val_start.date()} for {n_folds} folds "
+                                 f"of {horizon.days} days")
+            folds.append({"fold": fold + 1, "train_end": str((train_end - pd.Timedelta(days=1)).date()),
+                          "val_start": str(fold_start.date()),
+                          "val_end": str((fold_end - pd.Timedelta(days=1)).date())})
+            if stopping:
+                folds[-1].update(early_stopping_start=str(train_end.date()),
+                                 early_stopping_end=str((fold_start - pd.Timedelta(days=1)).date()))
+        return folds
+
+    def cross_validate(self) -> dict:
+        """Score the model with rolling-origin CV, folds running in parallel processes.
+
+        Each of the `workers` processes gets an equal share of the CPUs as its
+        XGBoost thread count, so concurrent folds do not oversubscribe cores.
+        Returns per-fold metrics plus their mean and standard deviation.
+        """
+        folds = self.cv_folds()
+        cpus = cpu_budget()
+        workers = min(self.config.cross_validation.workers or cpus, len(folds), cpus)
+        n_jobs = max(1, cpus // workers)
+        print(f"⏳ Cross-validating {len(folds)} folds on {workers} processes x {n_jobs} threads")
+
+        # Runs before the final fit, so workers are forked before this process starts OpenMP threads
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_evaluate_fold, [self.config] * len(folds), folds, [n_jobs] * len(folds)))
+
+        scores = pd.DataFrame(results)[["rmse", "mae", "rmsle"]]
+        cv = {
+            "metric": str(self.config.all_params["METRIC"]).lower(),
+            "folds": results,
+            "mean": {name: float(value) for name, value in scores.mean().items()},
+            "std": {name: float(value) for name, value in scores.std(ddof=0).items()},
+        }
+        print(f"✅ CV {cv['metric']}: {cv['mean'][cv['metric']]:.5f} ± {cv['std'][cv['metric']]:.5f}")
+        return cv
+
+    def evaluate(self, cv: dict = None) -> dict:
+        """Evaluate Model and Save Metrics (with the cross-validation results, if given)."""
+        y_pred = self.predict(self.X_test, self.segments_test)
+        metrics = regression_metrics(self.y_test, y_pred)
+        breakdown = self.metric_breakdown(y_pred)
+        if breakdown:
+            metrics["breakdown"] = breakdown
+        if self.best_iteration is not None:
+            metrics["best_iteration"] = self.best_iteration
+        if self.warm_start_report is not None:
+            metrics["warm_start"] = self.warm_start_report
+        if self.segment_report is not None:
+            metrics["segments"] = self.segment_report
+        if cv is not None:
+            metrics["cv"] = cv
         save_json(self.config.metrics_file, metrics)
 
         return metrics
 
+    def metric_breakdown(self, y_pred) -> dict:
+        """Validation metrics per value of each `metric_breakdowns` column.
+
+        Only those columns (and the target, to check row alignment) are
+        streamed back from the validation rows, batch by batch.
+        """
+        columns = self.config.metric_breakdowns
+        if not columns:
+            return {}
+
+        segment_metrics = SegmentMetrics(columns)
+        y_true, start = self.y_test.to_numpy(), 0
+        for batch in iter_dataframe(self.config.input_train_file, columns=list(dict.fromkeys(columns + ["sales"])),
+                                    date_range=self.validation_range(),
+                                    batch_rows=self.config.training_data.batch_rows):
+            stop = start + len(batch)
+            if not np.array_equal(batch["sales"].to_numpy(), y_true[start:stop], equal_nan=True):
+                raise ValueError("Validation rows streamed for the metric breakdown are not in evaluation order")
+            segment_metrics.update(batch, y_true[start:stop], y_pred[start:stop])
+            start = stop
+        return segment_metrics.result()
+
     def log_into_mlflow(self, metrics: dict):
-        """Log Model Parameters and Metrics into MLflow."""
-        # mlflow.set_tracking_uri(self.config.mlflow_uri)
-        mlflow.set_tracking_uri("sqlite:///mlflow.db")
+        """Record Model Parameters, Metrics and the Model, and log them into MLflow in the background."""
+        if not self.config.tracking.enabled:
+            print("⚠️ Experiment tracking disabled, run not logged to MLflow")
+            return None
 
-        tracking_url_type_store = urlparse(mlflow.get_tracking_uri()).scheme
         model_params = {
             "MODEL_TYPE": self.config.all_params["MODEL_TYPE"],
             "RANDOM_STATE": self.config.all_params["RANDOM_STATE"],
@@ -92,53 +546,52 @@ class ModelBuildingAndEvaluation:
             "REG_ALPHA": self.config.all_params["REG_ALPHA"],
             "REG_LAMBDA": self.config.all_params["REG_LAMBDA"],
             "GAMMA": self.config.all_params["GAMMA"],
-            "OBJECTIVE": self.config.all_params["OBJECTIVE"]
+            "OBJECTIVE": self.config.all_params["OBJECTIVE"],
+            "METRIC": self.config.all_params["METRIC"],
+            "EARLY_STOPPING_ROUNDS": self.early_stopping_rounds(),
+            "BEST_ITERATION": metrics.get("best_iteration")
         }
 
-        # with mlflow.start_run():
-        #     mlflow.log_params(model_params)
-        #     mlflow.log_metrics(metrics)
-
-        #     if tracking_url_type_store != "file":
-        #         mlflow.sklearn.log_model(self.model, "model",
-        #                                   registered_model_name="Sales_Forecasting_and_Analytics")
-        #     else:
-        #         mlflow.sklearn.log_model(self.model, "model")
-
-        # Suppose you have X_train, y_train available in this class
-        signature = infer_signature(self.X_train, self.model.predict(self.X_train))
-
-        with mlflow.start_run():
-            mlflow.log_params(model_params)
-            mlflow.log_metrics(metrics)
-
-            if tracking_url_type_store != "file":
-                mlflow.sklearn.log_model(
-                    sk_model=self.model,
-                    name="model",
-                    registered_model_name="Sales_Forecasting_and_Analytics",
-                    signature=signature,
-                    input_example=self.X_train.iloc[:5],  # small sample
-                )
-            else:
-                mlflow.sklearn.log_model(
-                    sk_model=self.model,
-                    name="model",
-                    signature=signature,
-                    input_example=self.X_train.iloc[:5],
-                )
+        flat_metrics = {name: value for name, value in metrics.items()
+                        if not isinstance(value, dict) and name != "best_iteration"}
+        if "cv" in metrics:
+            for stat in ("mean", "std"):
+                flat_metrics.update({f"cv_{stat}_{name}": value for name, value in metrics["cv"][stat].items()})
+        # Worst group of each breakdown; the full breakdown is logged as an artifact
+        metric = str(self.config.all_params["METRIC"]).lower()
+        for column, groups in metrics.get("breakdown", {}).items():
+            flat_metrics[f"{column}_max_{metric}"] = max(group[metric] for group in groups.values())
+
+        run = self.tracker.new_run()
+        run.log_params(model_params)
+        run.log_metrics(flat_metrics)
+        if "breakdown" in metrics:
+            run.log_dict(metrics["breakdown"], "metric_breakdown.json")
+
+        if isinstance(self.model, SegmentRouter):
+            # Not an sklearn estimator; the saved joblib file is the model
+            run.log_artifact(self.config.path_of_model, artifact_path="model")
+        else:
+            # The signature only needs the schema, so a sample is predicted rather than the training set
+            # (X_train is not loaded when training from the cached matrix; the validation rows have the same schema)
+            example = self.X_train if self.X_train is not None else self.X_test
+            example = example.iloc[:self.config.tracking.signature_rows]
+            run.log_model(self.config.path_of_model, example, self.predict(example),
+                          registered_model_name=self.config.tracking.registered_model_name)
+
+        return self.tracker.submit(run)
 
     def create_submission(self, test_file, submission_file):
         """Create Submission File for Kaggle-style prediction."""
-        test_df = pd.read_csv(test_file)
+        test_df = load_dataframe(test_file)
 
         # Ensure columns match training
-        missing_cols = set(self.X_train.columns) - set(test_df.columns)
+        missing_cols = set(self.feature_columns) - set(test_df.columns)
         for col in missing_cols:
             test_df[col] = 0
-        test_features = test_df[self.X_train.columns]
+        test_features = self.align_categories(test_df[self.feature_columns].copy())
 
-        sales_predictions = self.model.predict(test_features)
+        sales_predictions = self.predict(test_features, self.segment_labels(test_df))
         sales_predictions = np.where(sales_predictions < 0, 0, sales_predictions)
 
         submission = test_df[["id"]].copy()
@@ -150,7 +603,9 @@ class ModelBuildingAndEvaluation:
     def run_pipeline(self):
         """Complete End-to-End Model Training, Evaluation, and Logging."""
         self.load_data()
+        cv = self.cross_validate() if self.config.cross_validation.enabled else None
         self.train_model()
-        metrics = self.evaluate()
+        self.export_compiled_model()
+        metrics = self.evaluate(cv)
         self.log_into_mlflow(metrics)
         return metrics
@@ -0,0 +1,213 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from xgboost import XGBRegressor
+
+
+# params.yaml keys -> XGBRegressor arguments
+MODEL_PARAMS = {
+    "RANDOM_STATE": "random_state",
+    "N_ESTIMATORS": "n_estimators",
+    "LEARNING_RATE": "learning_rate",
+    "MAX_DEPTH": "max_depth",
+    "SUBSAMPLE": "subsample",
+    "COLSAMPLE_BY_TREE": "colsample_bytree",
+    "OBJECTIVE": "objective",
+}
+
+# XGBoost eval_metric -> CatBoost eval_metric (MSLE ranks iterations like RMSLE)
+CATBOOST_METRICS = {"rmsle": "MSLE", "rmse": "RMSE", "mae": "MAE"}
+
+
+def categorical_columns(X: pd.DataFrame) -> List[str]:
+    return [col for col in X.columns if isinstance(X[col].dtype, pd.CategoricalDtype)]
+
+
+class CategoryEncoded(BaseEstimator, RegressorMixin):
+    """Wrap an estimator without pandas categorical support.
+
+    encoding "codes" passes categorical columns as their category codes
+    (missing: NaN); "labels" passes them as strings and names them in
+    CatBoost's `cat_features`. Validation sets are encoded the same way.
+    """
+
+    def __init__(self, estimator, encoding: str = "codes") -> None:
+        self.estimator = estimator
+        self.encoding = encoding
+
+    def encode(self, X: pd.DataFrame) -> pd.DataFrame:
+        columns = categorical_columns(X)
+        if not columns:
+            return X
+        X = X.copy()
+        for col in columns:
+            if self.encoding == "labels":
+                X[col] = X[col].astype(str)
+            else:
+                codes = X[col].cat.codes.to_numpy()
+                X[col] = np.where(codes >= 0, codes, np.nan).astype(np.float32)
+        return X
+
+    def fit(self, X: pd.DataFrame, y, eval_set=None, **fit_params):
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        if eval_set is not None:
+            fit_params["eval_set"] = [(self.encode(X_val), y_val) for X_val, y_val in eval_set]
+        if self.encoding == "labels":
+            fit_params["cat_features"] = categorical_columns(X)
+        self.estimator.fit(self.encode(X), y, **fit_params)
+        return self
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        return self.estimator.predict(self.encode(X[list(self.feature_names_in_)]))
+
+
+class ModelBackend(ABC):
+    """How stage 4 builds and fits one kind of model (MODEL_TYPE in params.yaml).
+
+    `build` maps the shared params.yaml keys onto the library's arguments;
+    OBJECTIVE only applies to XGBoost, the others minimise squared error.
+    `fit` early-stops on the validation set where the library supports it and
+    leaves only the iterations up to the best one. Every built model predicts
+    from the feature frame and exposes `feature_names_in_`.
+    """
+
+    name = None
+    early_stopping = False
+
+    @abstractmethod
+    def build(self, params: dict, n_jobs: Optional[int] = None, categorical: bool = False):
+        """Unfitted model from the params.yaml values in `params`."""
+
+    def fit(self, model, X, y, eval_set=None, early_stopping_rounds: Optional[int] = None,
+            eval_metric: str = "rmse", **fit_params):
+        model.fit(X, y, **fit_params)
+        return model
+
+    def best_iteration(self, model) -> Optional[int]:
+        """Best iteration of an early-stopped fit, None without early stopping."""
+        return None
+
+
+class XGBoostBackend(ModelBackend):
+    name = "XGBoost"
+    early_stopping = True
+
+    def build(self, params: dict, n_jobs: Optional[int] = None, categorical: bool = False) -> XGBRegressor:
+        return XGBRegressor(
+            **{argument: params[key] for key, argument in MODEL_PARAMS.items()},
+            tree_method="hist",
+            enable_categorical=categorical,
+            n_jobs=n_jobs
+        )
+
+    @staticmethod
+    def with_early_stopping(model: XGBRegressor, early_stopping_rounds: Optional[int],
+                            eval_metric: str) -> XGBRegressor:
+        return model.set_params(early_stopping_rounds=early_stopping_rounds, eval_metric=eval_metric)
+
+    @staticmethod
+    def keep_best_trees(model: XGBRegressor) -> XGBRegressor:
+        """Drop the trees fit after the best iteration of an early-stopped model."""
+        if model.early_stopping_rounds:
+            best = model.get_booster()[:int(model.best_iteration) + 1]
+            model.load_model(bytearray(best.save_raw("ubj")))
+        return model
+
+    def fit(self, model, X, y, eval_set=None, early_stopping_rounds=None, eval_metric="rmse", **fit_params):
+        rounds = early_stopping_rounds if eval_set else None
+        self.with_early_stopping(model, rounds, eval_metric)
+        model.fit(X, y, eval_set=eval_set if rounds else None, verbose=False, **fit_params)
+        return self.keep_best_trees(model)
+
+    def best_iteration(self, model) -> Optional[int]:
+        # Trees after the best one are already dropped
+        if not model.early_stopping_rounds:
+            return None
+        return model.get_booster().num_boosted_rounds() - 1
+
+
+class CatBoostBackend(ModelBackend):
+    name = "CatBoost"
+    early_stopping = True
+
+    def build(self, params: dict, n_jobs: Optional[int] = None, categorical: bool = False) -> CategoryEncoded:
+        try:
+            from catboost import CatBoostRegressor
+        except ImportError as e:
+            raise ImportError("MODEL_TYPE 'CatBoost' needs the catboost package (pip install catboost)") from e
+
+        # Always wrapped: CatBoost takes string categories and has no feature_names_in_
+        return CategoryEncoded(CatBoostRegressor(
+            iterations=params["N_ESTIMATORS"],
+            learning_rate=params["LEARNING_RATE"],
+            depth=min(int(params["MAX_DEPTH"]), 16),
+            subsample=params["SUBSAMPLE"],
+            bootstrap_type="Bernoulli",
+            rsm=params["COLSAMPLE_BY_TREE"],
+            l2_leaf_reg=params.get("REG_LAMBDA", 3),
+            random_seed=params["RANDOM_STATE"],
+            loss_function="RMSE",
+            thread_count=n_jobs or -1,
+            allow_writing_files=False,
+            verbose=False
+        ), encoding="labels")
+
+    def fit(self, model, X, y, eval_set=None, early_stopping_rounds=None, eval_metric="rmse", **fit_params):
+        if eval_set and early_stopping_rounds:
+            model.estimator.set_params(eval_metric=CATBOOST_METRICS[eval_metric])
+            fit_params.update(eval_set=eval_set, early_stopping_rounds=early_stopping_rounds, use_best_model=True)
+        model.fit(X, y, **fit_params)
+        return model
+
+    def best_iteration(self, model) -> Optional[int]:
+        return model.estimator.get_best_iteration()
+
+
+class HistGradientBoostingBackend(ModelBackend):
+    name = "HistGradientBoosting"
+
+    def build(self, params: dict, n_jobs: Optional[int] = None,
+              categorical: bool = False) -> HistGradientBoostingRegressor:
+        # Threads come from OpenMP (no n_jobs); its early stopping only uses an internal split.
+        # SUBSAMPLE and COLSAMPLE_BY_TREE do not apply: max_features samples columns per split, not per tree
+        return HistGradientBoostingRegressor(
+            max_iter=params["N_ESTIMATORS"],
+            learning_rate=params["LEARNING_RATE"],
+            max_depth=params["MAX_DEPTH"],
+            l2_regularization=params.get("REG_LAMBDA", 0.0),
+            categorical_features="from_dtype",
+            early_stopping=False,
+            random_state=params["RANDOM_STATE"]
+        )
+
+
+class RandomForestBackend(ModelBackend):
+    name = "RandomForest"
+
+    def build(self, params: dict, n_jobs: Optional[int] = None, categorical: bool = False):
+        model = RandomForestRegressor(
+            n_estimators=params["N_ESTIMATORS"],
+            max_depth=params["MAX_DEPTH"],
+            # Per split, as random forests sample features; XGBoost's colsample_bytree is per tree
+            max_features=params["COLSAMPLE_BY_TREE"],
+            max_samples=params["SUBSAMPLE"] if params["SUBSAMPLE"] < 1 else None,
+            random_state=params["RANDOM_STATE"],
+            n_jobs=n_jobs or -1
+        )
+        return CategoryEncoded(model, encoding="codes") if categorical else model
+
+
+# MODEL_TYPE -> backend
+MODEL_BACKENDS: Dict[str, ModelBackend] = {
+    backend.name: backend
+    for backend in (XGBoostBackend(), CatBoostBackend(), HistGradientBoostingBackend(), RandomForestBackend())
+}
+
+
+def get_backend(model_type: str) -> ModelBackend:
+    if model_type not in MODEL_BACKENDS:
+        raise ValueError(f"Unsupported MODEL_TYPE '{model_type}'. Expected one of {list(MODEL_BACKENDS)}")
+    return MODEL_BACKENDS[model_type]
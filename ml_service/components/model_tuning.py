@@ -0,0 +1,186 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from ml_service.utils.main_utils import save_json, save_yaml
+from ml_service.components.modelBuilding_and_evaluation import (ModelBuildingAndEvaluation, MODEL_PARAMS,
+                                                                EVAL_METRICS, cpu_budget)
+
+
+class CarriedEarlyStopping(xgb.callback.TrainingCallback):
+    """Early stopping on the validation metric (lower is better) that resumes from an earlier best.
+
+    Tracks the best score and booster iteration over every round the booster
+    has had, and stops `patience` rounds after that best (never when patience
+    is None). NaN scores never count as an improvement.
+    """
+
+    def __init__(self, patience: Optional[int], best_score: Optional[float] = None,
+                 best_iteration: Optional[int] = None) -> None:
+        super().__init__()
+        self.patience = patience
+        self.best_score = math.nan if best_score is None else best_score
+        self.best_iteration = best_iteration
+
+    def after_iteration(self, model, epoch, evals_log) -> bool:
+        score = float(list(evals_log["valid"].values())[0][-1])
+        iteration = model.num_boosted_rounds() - 1
+        if (self.best_iteration is None or score < self.best_score
+                or (math.isnan(self.best_score) and not math.isnan(score))):
+            self.best_score, self.best_iteration = score, iteration
+        return bool(self.patience) and iteration - self.best_iteration >= self.patience
+
+
+class ModelTuning:
+    """Successive-halving hyperparameter search for the XGBoost model.
+
+    N_TRIALS candidates are sampled from SEARCH_SPACE and trained for
+    MIN_BOOST_ROUNDS rounds. After each rung only the best 1/HALVING_FACTOR
+    go on, with HALVING_FACTOR times the rounds (up to N_ESTIMATORS); a
+    survivor continues its existing booster instead of starting over, and its
+    best score and iteration carry over from the earlier rungs. Every trial
+    early-stops on the tuning window, and a trial that stopped keeps its best
+    score without further training.
+
+    Trials are ranked on the `tuning_days` before validation_start and train
+    on the days before those, so the validation split stays a holdout for
+    stage 4. All trials read one quantized train/tuning matrix pair built from
+    the stage 4 matrix cache and run concurrently on threads with an equal
+    share of the CPUs each. Row/column subsampling draws from XGBoost's process-wide
+    random generator, so with more than one worker a search is not exactly
+    reproducible.
+    """
+
+    def __init__(self, config, model_config) -> None:
+        self.config = config
+        self.model_config = model_config
+        self.params = model_config.all_params
+        self.process = ModelBuildingAndEvaluation(model_config)
+        if self.process.backend.name != "XGBoost":
+            raise ValueError(f"Model tuning supports MODEL_TYPE 'XGBoost' only, not '{self.process.backend.name}'")
+        self.metric = EVAL_METRICS[str(self.params["METRIC"]).upper()]
+
+    def sample_candidates(self) -> List[Dict]:
+        """Draw N_TRIALS parameter sets from SEARCH_SPACE (seeded with RANDOM_STATE)."""
+        space = self.params["SEARCH_SPACE"]
+        unknown = set(space) - set(MODEL_PARAMS)
+        if unknown:
+            raise ValueError(f"SEARCH_SPACE keys {sorted(unknown)} are not model params {list(MODEL_PARAMS)}")
+
+        rng = np.random.default_rng(self.params["RANDOM_STATE"])
+        candidates = []
+        for _ in range(int(self.params["N_TRIALS"])):
+            candidate = {}
+            for key, spec in space.items():
+                if isinstance(spec, list):
+                    candidate[key] = spec[rng.integers(len(spec))]
+                elif spec.get("int", False):
+                    candidate[key] = int(rng.integers(spec["low"], spec["high"] + 1))
+                elif spec.get("log", False):
+                    candidate[key] = float(np.exp(rng.uniform(np.log(spec["low"]), np.log(spec["high"]))))
+                else:
+                    candidate[key] = float(rng.uniform(spec["low"], spec["high"]))
+            candidates.append(candidate)
+        return candidates
+
+    def rung_rounds(self) -> List[int]:
+        """Boosting rounds of each rung: MIN_BOOST_ROUNDS * HALVING_FACTOR**k, capped at N_ESTIMATORS."""
+        rounds, factor = int(self.params["MIN_BOOST_ROUNDS"]), int(self.params["HALVING_FACTOR"])
+        max_rounds, n_trials = int(self.params["N_ESTIMATORS"]), int(self.params["N_TRIALS"])
+        rungs = [min(rounds, max_rounds)]
+        while rungs[-1] < max_rounds and n_trials > 1:
+            rungs.append(min(rungs[-1] * factor, max_rounds))
+            n_trials = math.ceil(n_trials / factor)
+        return rungs
+
+    def tuning_range(self):
+        """The `tuning_days` before validation_start, as a half-open (start, end) date range."""
+        val_start = self.process.validation_range()[0]
+        return val_start - pd.Timedelta(days=self.config.tuning_days), val_start
+
+    def load_matrices(self):
+        """Quantized matrices of the rows before the tuning window and of the window, from the matrix cache."""
+        self.process.load_vocabulary()
+        cache = self.process.matrix_cache()
+        tuning_start, tuning_end = self.tuning_range()
+
+        train_entry = self.process.cached_rows(cache, (None, tuning_start), name="tuning_train")
+        if not cache.meta(train_entry)["rows"]:
+            raise ValueError(f"No training rows before the tuning window starting {tuning_start.date()}")
+        self.process.feature_columns = cache.meta(train_entry)["feature_names"]
+        valid_entry = self.process.cached_rows(cache, (tuning_start, tuning_end), name="tuning_valid")
+
+        dtrain = cache.dmatrix(train_entry)
+        return dtrain, cache.dmatrix(valid_entry, ref=dtrain)
+
+    def train_trial(self, trial: Dict, rounds: int, dtrain, dvalid, n_jobs: int) -> Dict:
+        """Continue a trial's booster up to `rounds` rounds (unless it stopped early)."""
+        if trial["stopped"]:
+            return trial
+
+        model = self.process.build_model(n_jobs=n_jobs, params=trial["params"])
+        params = {**self.process.booster_params(model), "eval_metric": self.metric}
+        done = trial["booster"].num_boosted_rounds() if trial["booster"] is not None else 0
+        # xgb.train's early stopping would restart with every rung; this one continues from the trial's best
+        stopping = CarriedEarlyStopping(self.process.early_stopping_rounds(), trial["score"], trial["best_iteration"])
+        booster = xgb.train(params, dtrain, num_boost_round=rounds - done, evals=[(dvalid, "valid")],
+                            callbacks=[stopping], xgb_model=trial["booster"], verbose_eval=False)
+        trial.update(booster=booster, score=stopping.best_score, best_iteration=stopping.best_iteration,
+                     stopped=booster.num_boosted_rounds() < rounds)
+        return trial
+
+    def search(self, dtrain, dvalid):
+        """Run the halving rungs; returns the best trial and the per-rung log."""
+        trials = [{"trial": i, "params": params, "booster": None, "score": None,
+                   "best_iteration": None, "stopped": False}
+                  for i, params in enumerate(self.sample_candidates())]
+        factor = int(self.params["HALVING_FACTOR"])
+        log = []
+
+        for rung, rounds in enumerate(self.rung_rounds()):
+            cpus = cpu_budget()
+            workers = min(self.config.workers or cpus, len(trials), cpus)
+            n_jobs = max(1, cpus // workers)
+            print(f"⏳ Rung {rung}: {len(trials)} trials x {rounds} rounds on {workers} threads x {n_jobs}")
+
+            # Training releases the GIL, so threads share the quantized matrices without copies
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                trials = list(pool.map(lambda trial: self.train_trial(trial, rounds, dtrain, dvalid, n_jobs),
+                                       trials))
+
+            # RMSLE is NaN when a trial predicts below -1; rank those last
+            trials.sort(key=lambda trial: math.inf if math.isnan(trial["score"]) else trial["score"])
+            log += [{"rung": rung, "rounds": rounds, "trial": trial["trial"], "params": trial["params"],
+                     "score": trial["score"], "best_iteration": trial["best_iteration"],
+                     "stopped_early": trial["stopped"]} for trial in trials]
+            trials = trials[:max(1, math.ceil(len(trials) / factor))]
+
+        return trials[0], log
+
+    def run(self) -> Dict:
+        """Search, then write the tuned params file and the trial log."""
+        dtrain, dvalid = self.load_matrices()
+        best, log = self.search(dtrain, dvalid)
+
+        tuned = self.params.to_dict()
+        tuned.update(best["params"])
+        tuned["N_ESTIMATORS"] = best["best_iteration"] + 1
+
+        Path(self.config.root_dir).mkdir(parents=True, exist_ok=True)
+        save_yaml(Path(self.config.tuned_params_file), tuned)
+        tuning_start, tuning_end = self.tuning_range()
+        save_json(Path(self.config.trials_file), {
+            "metric": self.metric,
+            "tuning_window": [str(tuning_start.date()), str((tuning_end - pd.Timedelta(days=1)).date())],
+            "best": {"trial": best["trial"], "params": best["params"], "score": best["score"],
+                     "n_estimators": tuned["N_ESTIMATORS"]},
+            "trials": log,
+        })
+
+        print(f"✅ Best {self.metric} {best['score']:.5f} (trial {best['trial']}): {best['params']}, "
+              f"N_ESTIMATORS={tuned['N_ESTIMATORS']}")
+        print(f"✅ Tuned params saved to: {self.config.tuned_params_file}")
+        return tuned
@@ -0,0 +1,63 @@
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+
+class SegmentMetrics:
+    """RMSE, MAE and RMSLE per value of each breakdown column, from mergeable sums.
+
+    `update` folds in a chunk of rows with one grouped reduction per column,
+    keeping only per-group sums (rows, squared, absolute and squared-log
+    error). Sums of different chunks, or of accumulators built in other
+    processes, add up with `merge`, so a validation set can be scored
+    chunk by chunk without holding it.
+    """
+
+    def __init__(self, columns: List[str]) -> None:
+        self.columns = list(columns)
+        self.sums: Dict[str, Optional[pd.DataFrame]] = {column: None for column in self.columns}
+
+    def update(self, keys: pd.DataFrame, y_true, y_pred) -> "SegmentMetrics":
+        """Add a chunk: `keys` holds the breakdown columns of its rows."""
+        y_true = np.asarray(y_true, dtype=np.float64)
+        y_pred = np.asarray(y_pred, dtype=np.float64)
+        error = y_pred - y_true
+        # Same clipping as regression_metrics
+        log_error = np.log1p(np.maximum(y_pred, 0)) - np.log1p(y_true)
+        errors = pd.DataFrame({"rows": np.ones(len(y_true)), "squared_error": np.square(error),
+                               "absolute_error": np.abs(error), "squared_log_error": np.square(log_error)})
+
+        for column in self.columns:
+            sums = errors.groupby(np.asarray(keys[column]), sort=False).sum()
+            self._add(column, sums)
+        return self
+
+    def merge(self, other: "SegmentMetrics") -> "SegmentMetrics":
+        for column, sums in other.sums.items():
+            if sums is not None:
+                self._add(column, sums)
+        return self
+
+    def _add(self, column: str, sums: pd.DataFrame) -> None:
+        current = self.sums.get(column)
+        self.sums[column] = sums if current is None else current.add(sums, fill_value=0)
+
+    @staticmethod
+    def _label(group) -> str:
+        return str(group.date()) if isinstance(group, pd.Timestamp) else str(group)
+
+    def result(self) -> Dict[str, Dict[str, dict]]:
+        """{column: {group: {rows, rmse, mae, rmsle}}}, groups in sorted order."""
+        breakdown = {}
+        for column, sums in self.sums.items():
+            if sums is None:
+                continue
+            sums = sums.sort_index()
+            rows = sums["rows"]
+            metrics = pd.DataFrame({"rows": rows.astype(np.int64),
+                                    "rmse": np.sqrt(sums["squared_error"] / rows),
+                                    "mae": sums["absolute_error"] / rows,
+                                    "rmsle": np.sqrt(sums["squared_log_error"] / rows)})
+            breakdown[column] = {self._label(group): values
+                                 for group, values in metrics.to_dict(orient="index").items()}
+        return breakdown
@@ -0,0 +1,53 @@
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+# Segment key (SEGMENT_KEYS) -> feature-file column holding the segment of a row
+SEGMENT_COLUMNS = {"store_type": "type_x", "cluster": "cluster", "family": "family"}
+
+
+class SegmentRouter:
+    """One model per segment (store type, cluster or family) behind a single predict.
+
+    Rows are grouped by segment and each group goes to its model in one
+    batch, so a prediction costs one `predict` call per segment present.
+    Exposes `feature_names_in_` like the single model it replaces.
+    """
+
+    def __init__(self, key: str, models: Dict[str, object]) -> None:
+        if key not in SEGMENT_COLUMNS:
+            raise ValueError(f"Unsupported segment key '{key}'. Expected one of {list(SEGMENT_COLUMNS)}")
+        self.key = key
+        self.column = SEGMENT_COLUMNS[key]
+        self.models = dict(models)
+
+    @property
+    def feature_names_in_(self) -> np.ndarray:
+        return next(iter(self.models.values())).feature_names_in_
+
+    @staticmethod
+    def segment_labels(values) -> np.ndarray:
+        """Segment values as the string labels models are stored under."""
+        return np.asarray(pd.Series(values).astype(str))
+
+    def predict(self, X, segments) -> np.ndarray:
+        """Predict each row with the model of its segment; `segments` is aligned with the rows of `X`.
+
+        `X` is a DataFrame, or a 2-D array in feature order when every model accepts one.
+        """
+        labels = self.segment_labels(segments)
+        if len(labels) != len(X):
+            raise ValueError(f"Got {len(labels)} segment values for {len(X)} rows")
+
+        codes, uniques = pd.factorize(labels)
+        unknown = sorted(set(uniques) - set(self.models))
+        if unknown:
+            raise ValueError(f"No model for {self.key} segment(s) {unknown}")
+
+        predictions = np.empty(len(X), dtype=np.float32)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        for code, segment in enumerate(uniques):
+            rows = order[bounds[code]:bounds[code + 1]]
+            predictions[rows] = self.models[segment].predict(X.iloc[rows] if isinstance(X, pd.DataFrame) else X[rows])
+        return predictions
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from ml_service.utils.main_utils import iter_dataframe, dataframe_parts_dir, DateRange
+from ml_service.utils.stage_cache import file_signature
+
+
+class _ArrayBatches(xgb.DataIter):
+    """Feed row slices of the cached float32 matrix to XGBoost."""
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, batch_rows: int, feature_names: List[str],
+                 feature_types: List[str], cache_prefix: Optional[str] = None) -> None:
+        self.X = X
+        self.y = y
+        self.batch_rows = batch_rows
+        self.feature_names = feature_names
+        self.feature_types = feature_types
+        self.start = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> bool:
+        if self.start >= len(self.X):
+            return False
+        stop = self.start + self.batch_rows
+        input_data(data=np.asarray(self.X[self.start:stop]), label=np.asarray(self.y[self.start:stop]),
+                   feature_names=self.feature_names, feature_types=self.feature_types)
+        self.start = stop
+        return True
+
+    def reset(self) -> None:
+        self.start = 0
+
+
+class TrainingMatrixCache:
+    """On-disk cache of model-ready training matrices, keyed by the feature artifact.
+
+    `build` streams the feature artifact batch by batch (never holding the
+    frame) into a float32 feature matrix and label vector under
+    `cache_dir/<name>-<key>/`. The key hashes the artifact's file signatures
+    (including appended parts), the date range, dropped columns and category
+    vocabulary, so any change to the features produces a new entry and stale
+    entries of the same name are removed.
+
+    `dmatrix` memory-maps an entry and builds a quantized `QuantileDMatrix`
+    from it, or an `ExtMemQuantileDMatrix` that pages the quantized batches
+    from disk when `external_memory` is set. Training runs and sweeps on
+    unchanged features skip reading and converting the pandas frame.
+    """
+
+    VERSION = 1
+
+    def __init__(self, cache_dir: Path, batch_rows: int = 500_000, max_bin: int = 256,
+                 external_memory: bool = False, hash_mode: str = "mtime") -> None:
+        self.cache_dir = Path(cache_dir)
+        self.batch_rows = batch_rows
+        self.max_bin = max_bin
+        self.external_memory = external_memory
+        self.hash_mode = hash_mode
+
+    def key(self, path: Path, date_range: Optional[DateRange], drop: Sequence[str], target: str,
+            categories: Dict[str, List[str]]) -> str:
+        """Hash of everything that determines the cached matrix."""
+        payload = {
+            "version": self.VERSION,
+            "files": [file_signature(p, self.hash_mode) for p in (Path(path), dataframe_parts_dir(path))],
+            "date_range": [str(bound) if bound is not None else None for bound in date_range or (None, None)],
+            "drop": sorted(drop),
+            "target": target,
+            "categories": categories,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+
+    def build(self, name: str, path: Path, date_range: Optional[DateRange] = None, drop: Sequence[str] = (),
+              target: str = "sales", categories: Optional[Dict[str, List[str]]] = None) -> Path:
+        """Write the matrix for the rows of `path` in `date_range` (if not cached) and return its entry.
+
+        Features are every column except `drop` and `target`, in file order.
+        Columns in `categories` are stored as codes into that vocabulary
+        (unknown values become missing) and typed as categorical for XGBoost.
+        """
+        categories = categories or {}
+        entry = self.cache_dir / f"{name}-{self.key(path, date_range, drop, target, categories)}"
+        if (entry / "meta.json").exists():
+            print(f"✅ Using cached training matrix: {entry}")
+            return entry
+
+        staging = entry.with_name(entry.name + ".tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+
+        rows = 0
+        feature_names = None
+        with open(staging / "X.f32", "wb") as X_file, open(staging / "y.f32", "wb") as y_file:
+            for batch in iter_dataframe(path, date_range=date_range, batch_rows=self.batch_rows):
+                if feature_names is None:
+                    feature_names = [col for col in batch.columns if col not in drop and col != target]
+                X = np.empty((len(batch), len(feature_names)), dtype=np.float32)
+                for i, col in enumerate(feature_names):
+                    X[:, i] = self._column_values(batch[col], categories.get(col))
+                X.tofile(X_file)
+                batch[target].to_numpy(dtype=np.float32, na_value=np.nan).tofile(y_file)
+                rows += len(batch)
+
+        if feature_names is None:
+            shutil.rmtree(staging)
+            raise ValueError(f"No rows in {path} for date range {date_range}")
+
+        with open(staging / "meta.json", "w") as f:
+            json.dump({
+                "rows": rows,
+                "feature_names": feature_names,
+                "feature_types": ["c" if col in categories else "q" for col in feature_names],
+                "categories": {col: categories[col] for col in feature_names if col in categories},
+            }, f, indent=4)
+
+        for stale in self.cache_dir.glob(f"{name}-*"):
+            if stale != staging:
+                shutil.rmtree(stale, ignore_errors=True)
+        staging.rename(entry)
+        print(f"✅ Cached training matrix ({rows} rows x {len(feature_names)} features): {entry}")
+        return entry
+
+    @staticmethod
+    def _column_values(column: pd.Series, vocabulary: Optional[List[str]]) -> np.ndarray:
+        if vocabulary is None:
+            return column.to_numpy(dtype=np.float32, na_value=np.nan)
+        codes = pd.Categorical(column.astype(str), categories=vocabulary).codes
+        return np.where(codes >= 0, codes, np.nan).astype(np.float32)
+
+    @staticmethod
+    def meta(entry: Path) -> dict:
+        with open(Path(entry) / "meta.json") as f:
+            return json.load(f)
+
+    def arrays(self, entry: Path):
+        """Memory-mapped (X, y) of a cache entry."""
+        meta = self.meta(entry)
+        shape = (meta["rows"], len(meta["feature_names"]))
+        X = np.memmap(Path(entry) / "X.f32", dtype=np.float32, mode="r", shape=shape)
+        y = np.memmap(Path(entry) / "y.f32", dtype=np.float32, mode="r", shape=(meta["rows"],))
+        return X, y
+
+    def frame(self, entry: Path):
+        """(X, y) of a cache entry as pandas, categorical columns restored from their codes."""
+        meta = self.meta(entry)
+        X, y = self.arrays(entry)
+        X = pd.DataFrame(np.asarray(X), columns=meta["feature_names"])
+        for col, vocabulary in meta["categories"].items():
+            codes = X[col].fillna(-1).to_numpy(dtype=np.int64)
+            X[col] = pd.Categorical.from_codes(codes, categories=vocabulary)
+        return X, pd.Series(np.asarray(y), name="sales")
+
+    def dmatrix(self, entry: Path, ref: Optional[xgb.DMatrix] = None) -> xgb.DMatrix:
+        """Quantized DMatrix over a cache entry; pass the training matrix as `ref` for validation data."""
+        meta = self.meta(entry)
+        X, y = self.arrays(entry)
+        if self.external_memory:
+            batches = _ArrayBatches(X, y, self.batch_rows, meta["feature_names"], meta["feature_types"],
+                                    cache_prefix=str(Path(entry) / "extmem"))
+            return xgb.ExtMemQuantileDMatrix(batches, max_bin=self.max_bin, ref=ref, enable_categorical=True)
+
+        batches = _ArrayBatches(X, y, self.batch_rows, meta["feature_names"], meta["feature_types"])
+        return xgb.QuantileDMatrix(batches, max_bin=self.max_bin, ref=ref, enable_categorical=True)
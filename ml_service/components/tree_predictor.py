@@ -0,0 +1,210 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+import joblib
+from ml_service.components.segment_router import SegmentRouter
+
+# Objectives whose prediction is the raw margin, or exp(margin)
+IDENTITY_OBJECTIVES = {"reg:squarederror", "reg:squaredlogerror", "reg:absoluteerror", "reg:pseudohubererror"}
+LOG_LINK_OBJECTIVES = {"reg:gamma", "reg:tweedie", "count:poisson"}
+
+
+class CompiledTreeEnsemble:
+    """XGBoost regression ensemble flattened into NumPy arrays, evaluated without XGBoost.
+
+    All nodes of all trees live in contiguous arrays (feature, float32
+    threshold, left/right child, default direction, leaf value). Leaves point
+    to themselves, so a batch is evaluated by stepping every (row, tree) pair
+    one level down per iteration, `max_depth` times, with no per-tree Python
+    loop. Rows are stepped in chunks of at most MAX_CHUNK_CELLS (row, tree)
+    pairs, which bounds the working arrays. Categorical splits use a per-node
+    membership table over category codes. Loading a saved ensemble needs only
+    NumPy and pandas.
+    """
+
+    # (row, tree) pairs evaluated at once; each takes a few dozen bytes of working arrays
+    MAX_CHUNK_CELLS = 4_000_000
+
+    def __init__(self, feature_names: List[str], feature: np.ndarray, threshold: np.ndarray,
+                 left: np.ndarray, right: np.ndarray, default_left: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, max_depth: int, base_margin: float, link: str,
+                 category_table: Optional[np.ndarray] = None, category_row: Optional[np.ndarray] = None,
+                 categories: Optional[Dict[str, List[str]]] = None) -> None:
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.base_margin = base_margin
+        self.link = link
+        self.category_table = category_table  # [categorical split, code] -> code goes right
+        self.category_row = category_row      # node -> row of category_table, -1 for numeric splits
+        self.categories = categories or {}     # training categories of categorical features
+
+    @classmethod
+    def from_booster(cls, booster) -> "CompiledTreeEnsemble":
+        """Flatten a trained `xgboost.Booster` (single-target regression, gbtree)."""
+        model = json.loads(booster.save_raw("json"))["learner"]
+        objective = model["objective"]["name"]
+        if objective in IDENTITY_OBJECTIVES:
+            link = "identity"
+        elif objective in LOG_LINK_OBJECTIVES:
+            link = "log"
+        else:
+            raise ValueError(f"Unsupported objective '{objective}' for the compiled predictor")
+        if model["gradient_booster"]["name"] != "gbtree" or int(model["learner_model_param"]["num_target"]) > 1:
+            raise ValueError("Only single-target gbtree models can be compiled")
+
+        # Stored as "[8.99E1]" (one value per target) or, in older models, a bare number
+        base_score = float(model["learner_model_param"]["base_score"].strip("[]").split(",")[0])
+        base_margin = np.log(base_score) if link == "log" else base_score
+
+        trees = model["gradient_booster"]["model"]["trees"]
+        sizes = np.array([len(tree["left_children"]) for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        nodes = np.arange(sizes.sum(), dtype=np.int64)
+
+        def stack(key, dtype):
+            return np.concatenate([np.asarray(tree[key], dtype=dtype) for tree in trees])
+
+        left, right = stack("left_children", np.int64), stack("right_children", np.int64)
+        tree_offset = np.repeat(offsets, sizes)
+        leaf = left == -1
+        left = np.where(leaf, nodes, left + tree_offset)
+        right = np.where(leaf, nodes, right + tree_offset)
+        feature = np.where(leaf, 0, stack("split_indices", np.int64))
+        split_conditions = stack("split_conditions", np.float32)
+        threshold = np.where(leaf, np.float32(np.inf), split_conditions).astype(np.float32)
+        value = np.where(leaf, split_conditions, 0.0).astype(np.float64)
+
+        split_type = stack("split_type", np.int64)
+        category_table = category_row = None
+        if (split_type == 1).any():
+            category_row = np.full(len(nodes), -1, dtype=np.int64)
+            members = []
+            for tree, offset in zip(trees, offsets):
+                for node, start, size in zip(tree["categories_nodes"], tree["categories_segments"],
+                                             tree["categories_sizes"]):
+                    category_row[offset + node] = len(members)
+                    members.append(tree["categories"][start:start + size])
+            width = max((max(codes) for codes in members if codes), default=0) + 1
+            category_table = np.zeros((len(members), width), dtype=bool)
+            for row, codes in enumerate(members):
+                category_table[row, codes] = True
+
+        return cls(
+            feature_names=model["feature_names"] or [f"f{i}" for i in range(int(
+                model["learner_model_param"]["num_feature"]))],
+            feature=feature, threshold=threshold, left=left, right=right,
+            default_left=stack("default_left", bool), value=value, roots=offsets,
+            max_depth=cls._depth(left, right, offsets), base_margin=base_margin, link=link,
+            category_table=category_table, category_row=category_row,
+            categories=cls._stored_categories(model),
+        )
+
+    @classmethod
+    def from_model(cls, model) -> "CompiledTreeEnsemble":
+        """Flatten a fitted XGBRegressor (or anything with `get_booster`)."""
+        return cls.from_booster(model.get_booster())
+
+    @staticmethod
+    def _depth(left: np.ndarray, right: np.ndarray, roots: np.ndarray) -> int:
+        """Longest root-to-leaf path, in steps."""
+        nodes, depth = roots, 0
+        while True:
+            internal = nodes[left[nodes] != nodes]
+            if len(internal) == 0:
+                return depth
+            nodes = np.concatenate([left[internal], right[internal]])
+            depth += 1
+
+    @staticmethod
+    def _stored_categories(model: dict) -> Dict[str, List[str]]:
+        """Category names XGBoost recorded at training time (string categories only)."""
+        encodings = model["gradient_booster"]["model"].get("cats", {}).get("enc", [])
+        categories = {}
+        for name, encoding in zip(model["feature_names"] or [], encodings):
+            offsets, values = encoding.get("offsets", []), encoding.get("values", [])
+            if len(offsets) > 1:
+                data = bytes(values)
+                categories[name] = [data[start:stop].decode() for start, stop in zip(offsets[:-1], offsets[1:])]
+        return categories
+
+    def _matrix(self, X) -> np.ndarray:
+        """Input rows as a float32 matrix in feature order; categoricals become codes (missing: NaN)."""
+        if not isinstance(X, pd.DataFrame):
+            return np.asarray(X, dtype=np.float32).reshape(-1, len(self.feature_names_in_))
+
+        names = list(self.feature_names_in_)
+        dtypes = X.dtypes
+        categorical = [name for name in names if isinstance(dtypes[name], pd.CategoricalDtype)]
+        if not categorical:
+            return X[names].to_numpy(dtype=np.float32, na_value=np.nan)
+
+        # One conversion for all numeric columns, then the categoricals as codes
+        matrix = np.empty((len(X), len(names)), dtype=np.float32)
+        numeric = [i for i, name in enumerate(names) if name not in categorical]
+        matrix[:, numeric] = X[[names[i] for i in numeric]].to_numpy(dtype=np.float32, na_value=np.nan)
+        for name in categorical:
+            column = X[name]
+            codes = column.cat.codes.to_numpy()
+            stored = self.categories.get(name)
+            if stored is not None and list(column.cat.categories) != stored:
+                codes = pd.Categorical(column.astype(str), categories=stored).codes
+            matrix[:, names.index(name)] = np.where(codes >= 0, codes, np.nan)
+        return matrix
+
+    def predict(self, X) -> np.ndarray:
+        """Predict a batch (DataFrame with the training columns, or a 2-D array in feature order)."""
+        matrix = self._matrix(X)
+        predictions = np.empty(len(matrix), dtype=np.float32)
+        chunk_rows = max(1, self.MAX_CHUNK_CELLS // len(self.roots))
+        for start in range(0, len(matrix), chunk_rows):
+            predictions[start:start + chunk_rows] = self._predict_matrix(matrix[start:start + chunk_rows])
+        return predictions
+
+    def _predict_matrix(self, matrix: np.ndarray) -> np.ndarray:
+        """Predictions of the rows of a float32 matrix, all trees at once."""
+        rows = np.arange(len(matrix))[:, None]
+        node = np.broadcast_to(self.roots, (len(matrix), len(self.roots)))
+
+        for _ in range(self.max_depth):
+            x = matrix[rows, self.feature[node]]
+            go_left = x < self.threshold[node]
+            if self.category_row is not None:
+                table_row = self.category_row[node]
+                categorical = table_row >= 0
+                if categorical.any():
+                    codes = np.where(np.isnan(x), 0, x).astype(np.int64)
+                    inside = (codes >= 0) & (codes < self.category_table.shape[1])
+                    member = np.zeros_like(categorical)
+                    hit = categorical & inside
+                    member[hit] = self.category_table[table_row[hit], codes[hit]]
+                    go_left = np.where(categorical, ~member, go_left)
+            go_left = np.where(np.isnan(x), self.default_left[node], go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        margin = self.base_margin + self.value[node].sum(axis=1)
+        return np.exp(margin) if self.link == "log" else margin
+
+    def save(self, path: Path) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path: Path) -> "CompiledTreeEnsemble":
+        return joblib.load(path)
+
+
+def compile_model(model):
+    """Compiled counterpart of a trained model; a router gets its per-segment models compiled."""
+    if isinstance(model, SegmentRouter):
+        return SegmentRouter(model.key, {segment: CompiledTreeEnsemble.from_model(segment_model)
+                                         for segment, segment_model in model.models.items()})
+    return CompiledTreeEnsemble.from_model(model)
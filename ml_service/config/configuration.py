@@ -1,9 +1,23 @@
+import pandas as pd
 from ml_service.constants import *
 from ml_service.utils.main_utils import read_yaml, create_directories
-from ml_service.entity.config_entity import (DataAcquisitionConfig, 
+from ml_service.entity.config_entity import (ArtifactFormatConfig,
+                                             StageCacheConfig,
+                                             IncrementalUpdateConfig,
+                                             TrainingDataConfig,
+                                             CrossValidationConfig,
+                                             WarmStartConfig,
+                                             SegmentationConfig,
+                                             ExperimentTrackingConfig,
+                                             DataAcquisitionConfig, 
                                              DataPreprocessingConfig, 
                                              FeatureEngineeringAndDataTransformationConfig, 
-                                             ModelBuildingAndEvaluationConfig)
+                                             ModelBuildingAndEvaluationConfig,
+                                             MicroBatchingConfig,
+                                             ServingConfig,
+                                             ModelTuningConfig,
+                                             BackendBenchmarkConfig,
+                                             PipelineBenchmarkConfig)
 
 
 class ConfigurationManager:
@@ -17,6 +31,168 @@ class ConfigurationManager:
         root_dir = Path(self.config.modelBuildingAndEvaluation.root_dir)
         create_directories([root_dir])
 
+        self.artifact_format = self.get_artifact_format_config()
+
+    def get_artifact_format_config(self) -> ArtifactFormatConfig:
+        """Get the file format used to exchange data between stages.
+
+        Returns:
+            ArtifactFormatConfig: Format, compression codec and CSV export flag.
+        """
+        config = self.config.get("artifact_format", {})
+        artifact_format = config.get("format", "csv")
+        if artifact_format not in ARTIFACT_SUFFIXES:
+            raise ValueError(f"Unsupported artifact format '{artifact_format}'. "
+                             f"Expected one of {list(ARTIFACT_SUFFIXES)}")
+
+        return ArtifactFormatConfig(
+            format=artifact_format,
+            compression=config.get("compression", None),
+            export_csv=config.get("export_csv", False),
+            partitioned=config.get("partitioned", False)
+        )
+
+    def get_stage_cache_config(self) -> StageCacheConfig:
+        """Get the configuration for fingerprint-based stage skipping.
+
+        Returns:
+            StageCacheConfig: Where fingerprints are stored and how files are hashed.
+        """
+        config = self.config.get("stage_cache", {})
+        hash_mode = config.get("hash_mode", "mtime")
+        if hash_mode not in ("mtime", "content"):
+            raise ValueError(f"Unsupported stage cache hash_mode '{hash_mode}'. Expected 'mtime' or 'content'")
+
+        return StageCacheConfig(
+            root_dir=Path(config.get("root_dir", Path(self.config.artifacts_root) / "stage_cache")),
+            enabled=config.get("enabled", False),
+            hash_mode=hash_mode
+        )
+
+    def get_incremental_update_config(self) -> IncrementalUpdateConfig:
+        """Get the configuration for daily incremental updates.
+
+        Returns:
+            IncrementalUpdateConfig: Where new days arrive and where stage progress is recorded.
+        """
+        config = self.config.get("incremental_update", {})
+
+        return IncrementalUpdateConfig(
+            enabled=config.get("enabled", False),
+            updates_dir=Path(config.get("updates_dir", Path(self.config.data_acquisition.root_dir) / "updates")),
+            preprocessing_state_file=Path(config.get(
+                "preprocessing_state_file", Path(self.config.data_preprocessing.root_dir) / "update_state.json")),
+            features_state_file=Path(config.get(
+                "features_state_file", Path(self.config.features_dataTransformation.root_dir) / "update_state.json"))
+        )
+
+    def get_training_data_config(self) -> TrainingDataConfig:
+        """Get the configuration for how training data reaches the model.
+
+        Returns:
+            TrainingDataConfig: Training data mode and the matrix cache settings.
+        """
+        config = self.config.modelBuildingAndEvaluation.get("training_data", {})
+        mode = config.get("mode", "in_memory")
+        if mode not in TRAINING_DATA_MODES:
+            raise ValueError(f"Unsupported training data mode '{mode}'. Expected one of {TRAINING_DATA_MODES}")
+
+        return TrainingDataConfig(
+            mode=mode,
+            cache_dir=Path(config.get("cache_dir", Path(self.config.modelBuildingAndEvaluation.root_dir) / "dmatrix_cache")),
+            batch_rows=int(config.get("batch_rows", 500_000)),
+            max_bin=int(config.get("max_bin", 256)),
+            hash_mode=self.get_stage_cache_config().hash_mode
+        )
+
+    def get_cross_validation_config(self) -> CrossValidationConfig:
+        """Get the configuration for rolling-origin cross-validation (fold count is N_FOLDS in params).
+
+        Returns:
+            CrossValidationConfig: Whether to run it, fold window length and worker processes.
+        """
+        config = self.config.modelBuildingAndEvaluation.get("cross_validation", {})
+        horizon_days = int(config.get("horizon_days", 16))
+        lag_features = self.config.features_dataTransformation.get("lag_features", {})
+        if config.get("enabled", False) and lag_features.get("enabled", False):
+            # Fold rows read sales lag_features.horizon days back: at most that many days stay before the origin
+            lag_horizon = int(lag_features.get("horizon", 16))
+            if horizon_days > lag_horizon:
+                raise ValueError(f"cross_validation.horizon_days ({horizon_days}) exceeds lag_features.horizon "
+                                 f"({lag_horizon}); the lag features of a fold's last days would read its own sales")
+
+        return CrossValidationConfig(
+            enabled=config.get("enabled", False),
+            horizon_days=horizon_days,
+            workers=int(config.get("workers", 0) or 0)
+        )
+
+    def get_warm_start_config(self) -> WarmStartConfig:
+        """Get the configuration for warm-start retraining of the saved model.
+
+        Returns:
+            WarmStartConfig: Whether to warm-start, how, and on how many recent days.
+        """
+        config = self.config.modelBuildingAndEvaluation.get("warm_start", {})
+        mode = config.get("mode", "add_trees")
+        if mode not in ("add_trees", "refresh_leaves"):
+            raise ValueError(f"Unsupported warm start mode '{mode}'. Expected 'add_trees' or 'refresh_leaves'")
+        window_days, holdout_days = int(config.get("window_days", 56)), int(config.get("holdout_days", 16))
+        if not 0 < holdout_days < window_days:
+            raise ValueError(f"warm_start.holdout_days must be between 1 and window_days ({window_days}), "
+                             f"got {holdout_days}")
+
+        return WarmStartConfig(
+            enabled=config.get("enabled", False),
+            mode=mode,
+            new_trees=int(config.get("new_trees", 50)),
+            window_days=window_days,
+            holdout_days=holdout_days
+        )
+
+    def get_segmentation_config(self) -> SegmentationConfig:
+        """Get the configuration for per-segment models.
+
+        Returns:
+            SegmentationConfig: Segment key, worker processes and segments to retrain.
+        """
+        config = self.config.modelBuildingAndEvaluation.get("segmentation", {})
+        key = config.get("key", "store_type")
+        if key not in SEGMENT_KEYS:
+            raise ValueError(f"Unsupported segment key '{key}'. Expected one of {SEGMENT_KEYS}")
+
+        return SegmentationConfig(
+            enabled=config.get("enabled", False),
+            key=key,
+            workers=int(config.get("workers", 0) or 0),
+            retrain=[str(segment) for segment in config.get("retrain") or []]
+        )
+
+    def get_experiment_tracking_config(self) -> ExperimentTrackingConfig:
+        """Get the configuration for logging runs to MLflow.
+
+        Returns:
+            ExperimentTrackingConfig: Local run buffer, tracking server and signature sample size.
+        """
+        config = self.config.get("experimentTracking", {})
+        dagshub_repo = str(config.get("dagshub_repo") or "")
+        if dagshub_repo and dagshub_repo.count("/") != 1:
+            raise ValueError(f"experimentTracking.dagshub_repo must be 'owner/name', got '{dagshub_repo}'")
+
+        return ExperimentTrackingConfig(
+            enabled=bool(config.get("enabled", True)) and bool(self.params.get("LOG_EXPERIMENTS", True)),
+            buffer_dir=Path(config.get("buffer_dir", "artifacts/mlflow_buffer")),
+            tracking_uri=str(config.get("tracking_uri") or self.params.get("TRACKING_SERVER") or "sqlite:///mlflow.db"),
+            dagshub_repo=dagshub_repo,
+            experiment_name=str(config.get("experiment_name") or ""),
+            registered_model_name=str(config.get("registered_model_name", "Sales_Forecasting_and_Analytics")),
+            signature_rows=int(config.get("signature_rows", 1000))
+        )
+
+    def _artifact_path(self, path) -> Path:
+        """Append the configured artifact suffix to a file name given without extension."""
+        return Path(path).with_suffix(ARTIFACT_SUFFIXES[self.artifact_format.format])
+
     def get_data_acquisition_config(self) -> DataAcquisitionConfig:
         """Get the configuration for data acquisition.
 
@@ -31,7 +207,10 @@ class ConfigurationManager:
             source=config.source,
             dataset_name=config.dataset_name,
             local_dir=Path(config.local_dir),
-            data_files=dict(config.data_files)  
+            data_files=dict(config.data_files),
+            schema={name: dict(dtypes) for name, dtypes in config.get("schema", {}).items()},
+            date_format=config.get("date_format", "%Y-%m-%d"),
+            load_workers=int(config.get("load_workers", 1))
         )
 
 
@@ -46,21 +225,36 @@ class ConfigurationManager:
 
         return DataPreprocessingConfig(
             root_dir=Path(config.root_dir),
-            train_file=Path(config.root_dir) / config.train_file,
-            test_file=Path(config.root_dir) / config.test_file
+            train_file=self._artifact_path(Path(config.root_dir) / config.train_file),
+            test_file=self._artifact_path(Path(config.root_dir) / config.test_file),
+            artifact_format=self.artifact_format,
+            chunk_size=int(config.get("chunk_size", 0) or 0)
         )
     
 
     def get_feature_engineering_and_data_transformation_config(self) -> FeatureEngineeringAndDataTransformationConfig:
         """Get the configuration for feature engineering and data transformation."""
         config = self.config.features_dataTransformation
+        # holidays_events.csv is read like every other raw file
+        raw_config = self.config.data_acquisition
         feature_config = FeatureEngineeringAndDataTransformationConfig(
             root_dir=Path(config.root_dir),
-            input_train_file=config.input_train_file,
-            input_test_file=config.input_test_file,
-            train_file=config.train_final,
-            test_file=config.test_final,
-            scaler_file=config.scaler_file
+            input_train_file=self._artifact_path(config.input_train_file),
+            input_test_file=self._artifact_path(config.input_test_file),
+            train_file=self._artifact_path(Path(config.root_dir) / config.train_final),
+            test_file=self._artifact_path(Path(config.root_dir) / config.test_final),
+            scaler_file=config.scaler_file,
+            artifact_format=self.artifact_format,
+            holidays_file=Path(config.holidays_file),
+            holidays_dtype=dict(raw_config.get("schema", {}).get("holidays_events", {})),
+            date_format=raw_config.get("date_format", "%Y-%m-%d"),
+            calendar_file=Path(config.calendar_file),
+            profile_memory=config.get("profile_memory", False),
+            memory_report_file=Path(config.get("memory_report_file", Path(config.root_dir) / "memory_report.json")),
+            encoding=config.get("encoding", "onehot"),
+            vocabulary_file=Path(config.get("vocabulary_file", Path(config.root_dir) / "vocabulary.json")),
+            lag_features=config.get("lag_features", {"enabled": False}),
+            lag_state_file=Path(config.get("lag_state_file", Path(config.root_dir) / "lag_state.joblib"))
         )
         create_directories([feature_config.root_dir])
         return feature_config
@@ -69,12 +263,127 @@ class ConfigurationManager:
     def get_modelBuilding_and_evaluation_config(self) -> ModelBuildingAndEvaluationConfig:
         """Construct the EvaluationConfig object based on modelBuildingAndEvaluation settings."""
         model_cfg = self.config.modelBuildingAndEvaluation
+        validation_start = pd.Timestamp(str(model_cfg.get("validation_start", "2017-01-01")))
+        if model_cfg.get("validation_end") and pd.Timestamp(str(model_cfg.validation_end)) < validation_start:
+            raise ValueError(f"validation_end {model_cfg.validation_end} is before validation_start "
+                             f"{validation_start.date()}")
+        model_type = self.params.get("MODEL_TYPE", "XGBoost")
+        if model_type not in MODEL_TYPES:
+            raise ValueError(f"Unsupported MODEL_TYPE '{model_type}'. Expected one of {MODEL_TYPES}")
+        training_data, warm_start = self.get_training_data_config(), self.get_warm_start_config()
+        if model_type != "XGBoost" and (training_data.mode != "in_memory" or warm_start.enabled):
+            raise ValueError(f"MODEL_TYPE '{model_type}' needs training_data.mode in_memory and warm_start "
+                             "disabled; the matrix cache and warm start are XGBoost-only")
 
         return ModelBuildingAndEvaluationConfig(
             path_of_model=Path(model_cfg.model_file),
-            input_train_file=Path(model_cfg.input_train_file),
-            input_test_file=Path(model_cfg.input_test_file),
+            input_train_file=self._artifact_path(model_cfg.input_train_file),
+            input_test_file=self._artifact_path(model_cfg.input_test_file),
             metrics_file=Path(model_cfg.evaluation_metrics),
             all_params=self.params,
-            mlflow_uri=self.params.get("TRACKING_SERVER", "")
-        )
\ No newline at end of file
+            mlflow_uri=self.params.get("TRACKING_SERVER", ""),
+            encoding=self.config.features_dataTransformation.get("encoding", "onehot"),
+            validation_start=str(model_cfg.get("validation_start", "2017-01-01")),
+            validation_end=str(model_cfg.validation_end) if model_cfg.get("validation_end") else None,
+            vocabulary_file=Path(self.config.features_dataTransformation.get(
+                "vocabulary_file", Path(self.config.features_dataTransformation.root_dir) / "vocabulary.json")),
+            training_data=training_data,
+            cross_validation=self.get_cross_validation_config(),
+            warm_start=warm_start,
+            segmentation=self.get_segmentation_config(),
+            compiled_model_file=Path(model_cfg.get("compiled_model_file",
+                                                   Path(model_cfg.root_dir) / "model_compiled.joblib")),
+            metric_breakdowns=[str(column) for column in model_cfg.get("metric_breakdowns") or []],
+            tracking=self.get_experiment_tracking_config()
+        )
+
+    def get_serving_config(self) -> ServingConfig:
+        """Get the configuration for the prediction API.
+
+        Returns:
+            ServingConfig: Batch endpoint limits and /predict micro-batching settings.
+        """
+        config = self.config.get("serving", {})
+        max_batch_rows = int(config.get("max_batch_rows", 50000))
+        max_payload_mb = float(config.get("max_payload_mb", 32))
+        if max_batch_rows < 1 or max_payload_mb <= 0:
+            raise ValueError("serving.max_batch_rows and serving.max_payload_mb must be positive")
+
+        batching = config.get("micro_batching", {})
+        micro_batching = MicroBatchingConfig(
+            enabled=bool(batching.get("enabled", False)),
+            max_batch_size=int(batching.get("max_batch_size", 256)),
+            max_wait_ms=float(batching.get("max_wait_ms", 2.0))
+        )
+        if micro_batching.max_batch_size < 1 or micro_batching.max_wait_ms < 0:
+            raise ValueError("serving.micro_batching needs max_batch_size >= 1 and max_wait_ms >= 0")
+
+        return ServingConfig(max_batch_rows=max_batch_rows, max_payload_mb=max_payload_mb,
+                             micro_batching=micro_batching)
+
+    def get_model_tuning_config(self) -> ModelTuningConfig:
+        """Get the configuration for the hyperparameter search stage.
+
+        Returns:
+            ModelTuningConfig: Where the tuned params and trial log go, and how many trials run at once.
+        """
+        config = self.config.get("modelTuning", {})
+        root_dir = Path(config.get("root_dir", Path(self.config.artifacts_root) / "model_tuning"))
+
+        return ModelTuningConfig(
+            enabled=config.get("enabled", False),
+            root_dir=root_dir,
+            tuned_params_file=Path(config.get("tuned_params_file", "params_tuned.yaml")),
+            trials_file=Path(config.get("trials_file", root_dir / "trials.json")),
+            workers=int(config.get("workers", 0) or 0),
+            tuning_days=int(config.get("tuning_days", 48))
+        )
+
+    def get_backend_benchmark_config(self) -> BackendBenchmarkConfig:
+        """Get the configuration for the model backend benchmark.
+
+        Returns:
+            BackendBenchmarkConfig: Backends to compare, where the report goes and how many predict calls are timed.
+        """
+        config = self.config.get("backendBenchmark", {})
+        root_dir = Path(config.get("root_dir", Path(self.config.artifacts_root) / "backend_benchmark"))
+        backends = [str(backend) for backend in config.get("backends") or MODEL_TYPES]
+        unknown = [backend for backend in backends if backend not in MODEL_TYPES]
+        if unknown:
+            raise ValueError(f"Unsupported benchmark backends {unknown}. Expected any of {MODEL_TYPES}")
+
+        return BackendBenchmarkConfig(
+            enabled=config.get("enabled", False),
+            root_dir=root_dir,
+            report_file=Path(config.get("report_file", root_dir / "benchmark.json")),
+            backends=backends,
+            batch_repeats=int(config.get("batch_repeats", 3)),
+            single_row_repeats=int(config.get("single_row_repeats", 200))
+        )
+
+    def get_pipeline_benchmark_config(self) -> PipelineBenchmarkConfig:
+        """Get the configuration for the end-to-end pipeline benchmark.
+
+        Returns:
+            PipelineBenchmarkConfig: Synthetic data scales, report and baseline files and the regression threshold.
+        """
+        config = self.config.get("pipelineBenchmark", {})
+        root_dir = Path(config.get("root_dir", Path(self.config.artifacts_root) / "pipeline_benchmark"))
+        scales = {}
+        for name, scale in (config.get("scales") or {"small": {"stores": 10, "families": 8, "days": 400}}).items():
+            missing = {"stores", "families", "days"} - set(scale)
+            if missing:
+                raise ValueError(f"Benchmark scale '{name}' is missing {sorted(missing)}")
+            scales[str(name)] = {key: int(scale[key]) for key in ("stores", "families", "days")}
+
+        return PipelineBenchmarkConfig(
+            root_dir=root_dir,
+            report_file=Path(config.get("report_file", root_dir / "report.json")),
+            baseline_file=Path(config.get("baseline_file", "config/pipeline_benchmark_baseline.json")),
+            seed=int(config.get("seed", 42)),
+            end_date=str(config.get("end_date", "2017-08-15")),
+            test_days=int(config.get("test_days", 16)),
+            scales=scales,
+            tolerance=float(config.get("tolerance", 0.2)),
+            min_seconds=float(config.get("min_seconds", 2.0))
+        )
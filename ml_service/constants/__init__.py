@@ -2,4 +2,27 @@ from pathlib import Path
 
 
 CONFIG_FILE_PATH = Path("config/config.yaml")
-PARAMS_FILE_PATH = Path("params.yaml")
\ No newline at end of file
+PARAMS_FILE_PATH = Path("params.yaml")
+
+# File suffix used for each supported inter-stage artifact format
+ARTIFACT_SUFFIXES = {
+    "parquet": ".parquet",
+    "feather": ".feather",
+    "csv": ".csv",
+}
+
+# Rows appended to an artifact live next to it in "<stem>.parts/"
+PARTS_SUFFIX = ".parts"
+
+# Hive partition keys of date-partitioned artifacts: date_year=YYYY/date_month=MM
+PARTITION_COLUMNS = ["date_year", "date_month"]
+
+# How stage 4 reads training data: the pandas frame, or a cached float32
+# matrix quantized in memory or paged from disk (external memory)
+TRAINING_DATA_MODES = ["in_memory", "cached", "external_memory"]
+
+# Keys a segmented model can be split by (store type, store cluster, product family)
+SEGMENT_KEYS = ["store_type", "cluster", "family"]
+
+# MODEL_TYPE values of params.yaml (model backends of stage 4)
+MODEL_TYPES = ["XGBoost", "CatBoost", "HistGradientBoosting", "RandomForest"]
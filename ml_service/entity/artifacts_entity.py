@@ -0,0 +1,12 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+@dataclass(frozen=True)
+class StageCacheSpec:
+    """Everything a pipeline stage depends on and produces, used to fingerprint a run."""
+    inputs: List[Path]
+    outputs: List[Path]
+    settings: Dict[str, Any] = field(default_factory=dict)
+    code: List[str] = field(default_factory=list)
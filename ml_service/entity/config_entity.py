@@ -1,6 +1,81 @@
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
+
+@dataclass(frozen=True)
+class ArtifactFormatConfig:
+    """Config for the file format used between pipeline stages."""
+    format: str
+    compression: str
+    export_csv: bool
+    partitioned: bool
+
+
+@dataclass(frozen=True)
+class StageCacheConfig:
+    """Config for skipping pipeline stages whose inputs are unchanged."""
+    root_dir: Path
+    enabled: bool
+    hash_mode: str
+
+
+@dataclass(frozen=True)
+class IncrementalUpdateConfig:
+    """Config for appending new days to the preprocessing and feature artifacts."""
+    enabled: bool
+    updates_dir: Path
+    preprocessing_state_file: Path
+    features_state_file: Path
+
+
+@dataclass(frozen=True)
+class TrainingDataConfig:
+    """Config for how the model reads its training data (in memory or from a cached matrix)."""
+    mode: str
+    cache_dir: Path
+    batch_rows: int
+    max_bin: int
+    hash_mode: str
+
+
+@dataclass(frozen=True)
+class CrossValidationConfig:
+    """Config for rolling-origin cross-validation before the final fit."""
+    enabled: bool
+    horizon_days: int
+    workers: int
+
+
+@dataclass(frozen=True)
+class WarmStartConfig:
+    """Config for updating the saved model on the newest data instead of retraining."""
+    enabled: bool
+    mode: str
+    new_trees: int
+    window_days: int
+    holdout_days: int
+
+
+@dataclass(frozen=True)
+class SegmentationConfig:
+    """Config for training one model per segment behind a routing predictor."""
+    enabled: bool
+    key: str
+    workers: int
+    retrain: List[str]
+
+
+@dataclass(frozen=True)
+class ExperimentTrackingConfig:
+    """Config for buffering runs locally and logging them to MLflow in the background."""
+    enabled: bool
+    buffer_dir: Path
+    tracking_uri: str
+    dagshub_repo: str
+    experiment_name: str
+    registered_model_name: str
+    signature_rows: int
+
 
 @dataclass(frozen=True)
 class DataAcquisitionConfig:
@@ -10,6 +85,9 @@ class DataAcquisitionConfig:
     dataset_name: str    
     local_dir: Path       
     data_files: Dict[str, str]  
+    schema: Dict[str, Dict[str, str]]
+    date_format: str
+    load_workers: int
 
 
 
@@ -19,15 +97,28 @@ class DataPreprocessingConfig:
     root_dir: Path
     train_file: Path
     test_file: Path
+    artifact_format: ArtifactFormatConfig
+    chunk_size: int
 
 @dataclass(frozen=True)
 class FeatureEngineeringAndDataTransformationConfig:
     root_dir: Path
-    input_train_file: str
-    input_test_file: str
-    train_file: str
-    test_file: str
+    input_train_file: Path
+    input_test_file: Path
+    train_file: Path
+    test_file: Path
     scaler_file: str
+    artifact_format: ArtifactFormatConfig
+    holidays_file: Path
+    holidays_dtype: dict
+    date_format: str
+    calendar_file: Path
+    profile_memory: bool
+    memory_report_file: Path
+    encoding: str
+    vocabulary_file: Path
+    lag_features: dict
+    lag_state_file: Path
 
 @dataclass(frozen=True)
 class ModelTrainingConfig:
@@ -43,4 +134,63 @@ class ModelBuildingAndEvaluationConfig:
     input_test_file: Path
     metrics_file: Path
     all_params: dict
-    mlflow_uri: str
\ No newline at end of file
+    mlflow_uri: str
+    encoding: str
+    validation_start: str
+    validation_end: Optional[str]
+    vocabulary_file: Path
+    training_data: TrainingDataConfig
+    cross_validation: CrossValidationConfig
+    warm_start: WarmStartConfig
+    segmentation: SegmentationConfig
+    compiled_model_file: Path
+    metric_breakdowns: List[str]
+    tracking: ExperimentTrackingConfig
+
+@dataclass(frozen=True)
+class MicroBatchingConfig:
+    """Config for grouping concurrent /predict requests into one model call."""
+    enabled: bool
+    max_batch_size: int
+    max_wait_ms: float
+
+@dataclass(frozen=True)
+class ServingConfig:
+    """Config for the prediction API (app.py)."""
+    max_batch_rows: int
+    max_payload_mb: float
+    micro_batching: MicroBatchingConfig
+
+@dataclass(frozen=True)
+class ModelTuningConfig:
+    """Config for the hyperparameter search stage (search settings live in params.yaml)."""
+    enabled: bool
+    root_dir: Path
+    tuned_params_file: Path
+    trials_file: Path
+    workers: int
+    tuning_days: int
+
+@dataclass(frozen=True)
+class BackendBenchmarkConfig:
+    """Config for the model backend benchmark (backends are MODEL_TYPE values)."""
+    enabled: bool
+    root_dir: Path
+    report_file: Path
+    backends: List[str]
+    batch_repeats: int
+    single_row_repeats: int
+
+
+@dataclass(frozen=True)
+class PipelineBenchmarkConfig:
+    """Config for the end-to-end pipeline benchmark on synthetic data."""
+    root_dir: Path
+    report_file: Path
+    baseline_file: Path
+    seed: int
+    end_date: str
+    test_days: int
+    scales: Dict[str, Dict[str, int]]
+    tolerance: float
+    min_seconds: float
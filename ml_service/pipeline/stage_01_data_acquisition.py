@@ -18,7 +18,10 @@ class DataAcquisitionTrainingPipeline:
             data_dir=data_acquisition_config.local_dir,
             source=data_acquisition_config.source,
             data_files=data_acquisition_config.data_files,
-            dataset_name=data_acquisition_config.dataset_name
+            dataset_name=data_acquisition_config.dataset_name,
+            schema=data_acquisition_config.schema,
+            date_format=data_acquisition_config.date_format,
+            load_workers=data_acquisition_config.load_workers
         )
 
         loader.download()
@@ -3,13 +3,53 @@ from ml_service.config.configuration import ConfigurationManager
 from ml_service.constants import *
 from ml_service.components.data_ingestion import DataLoader
 from ml_service.components.data_processing import DataProcessor
+from ml_service.entity.artifacts_entity import StageCacheSpec
 from ml_service.logging.logger import logging
+from ml_service.utils.main_utils import load_json
+from ml_service.utils.stage_cache import StageCache
 
 class DataPreprocessingTrainingPipeline:
     """Pipeline for merging, cleaning, and saving preprocessed train/test files."""
     def __init__(self):
         pass
 
+    def cache_spec(self, include_updates: bool = True) -> StageCacheSpec:
+        """Raw files, preprocessing settings and code this stage depends on.
+
+        Args:
+            include_updates (bool): also depend on the incremental updates directory
+        """
+        config_manager = ConfigurationManager(CONFIG_FILE_PATH, PARAMS_FILE_PATH)
+        data_acquisition_config = config_manager.get_data_acquisition_config()
+        data_preprocessing_config = config_manager.get_data_preprocessing_config()
+        incremental_config = config_manager.get_incremental_update_config()
+
+        inputs = [data_acquisition_config.local_dir / filename
+                  for name, filename in data_acquisition_config.data_files.items()
+                  if name != "sample_submission"]
+        if include_updates and incremental_config.enabled:
+            inputs.append(incremental_config.updates_dir)
+
+        return StageCacheSpec(
+            inputs=inputs,
+            outputs=[data_preprocessing_config.train_file, data_preprocessing_config.test_file],
+            settings={
+                "data_files": data_acquisition_config.data_files,
+                "schema": data_acquisition_config.schema,
+                "date_format": data_acquisition_config.date_format,
+                "data_preprocessing": config_manager.config.data_preprocessing.to_dict(),
+                "artifact_format": config_manager.artifact_format,
+            },
+            code=[
+                "ml_service.components.data_ingestion",
+                "ml_service.components.data_processing",
+                "ml_service.config.configuration",
+                "ml_service.entity.config_entity",
+                "ml_service.pipeline.stage_02_data_preprocessing",
+                "ml_service.utils.main_utils",
+            ],
+        )
+
     def main(self):
         # Load configuration details
         config_manager = ConfigurationManager(CONFIG_FILE_PATH, PARAMS_FILE_PATH)
@@ -18,14 +58,54 @@ class DataPreprocessingTrainingPipeline:
 
         data_dir = Path(data_acquisition_config.local_dir)
         files = data_acquisition_config.data_files
+        schema = data_acquisition_config.schema
+        date_format = data_acquisition_config.date_format
+        load_workers = data_acquisition_config.load_workers
+
+        artifact_format = data_preprocessing_config.artifact_format
+        incremental_config = config_manager.get_incremental_update_config()
+        processor = DataProcessor(data_dir, files, schema, date_format, load_workers)
+
+        if incremental_config.enabled:
+            # Same raw files, settings and code as the last full run: only merge the new days
+            fingerprint = StageCache(config_manager.get_stage_cache_config()) \
+                .fingerprint(self.cache_spec(include_updates=False))
+            state_file = incremental_config.preprocessing_state_file
+            if state_file.exists() and load_json(state_file).get("fingerprint") == fingerprint:
+                processor.update(incremental_config.updates_dir, data_preprocessing_config.train_file,
+                                 state_file, artifact_format.compression, artifact_format.export_csv)
+                return
+
+        if data_preprocessing_config.chunk_size > 0:
+            # Streaming mode: keep only the dimension tables in memory
+            processor \
+                .load(exclude=["train", "test"]) \
+                .interpolate_oil() \
+                .merge_in_chunks(data_preprocessing_config.train_file,
+                                 data_preprocessing_config.test_file,
+                                 chunk_size=data_preprocessing_config.chunk_size,
+                                 compression=artifact_format.compression,
+                                 export_csv=artifact_format.export_csv,
+                                 partitioned=artifact_format.partitioned)
+        else:
+            processor \
+                .load() \
+                .interpolate_oil() \
+                .merge_train_test() \
+                .merge_holidays_and_oil() \
+                .drop_irrelevant_columns() \
+                .save(data_preprocessing_config.train_file,
+                      data_preprocessing_config.test_file,
+                      compression=artifact_format.compression,
+                      export_csv=artifact_format.export_csv,
+                      partitioned=artifact_format.partitioned)
 
-        DataProcessor(data_dir, files) \
-            .load() \
-            .interpolate_oil() \
-            .merge_train_test() \
-            .merge_holidays_and_oil() \
-            .drop_irrelevant_columns() \
-            .save(data_preprocessing_config.train_file, data_preprocessing_config.test_file)
+        if incremental_config.enabled:
+            # Pick up any update files newer than the raw data
+            processor \
+                .write_update_state(state_file, data_preprocessing_config.train_file, fingerprint) \
+                .update(incremental_config.updates_dir, data_preprocessing_config.train_file,
+                        state_file, artifact_format.compression, artifact_format.export_csv)
 
 if __name__ == "__main__":
     STAGE_NAME = "Data Preprocessing Stage"
@@ -2,6 +2,9 @@ from ml_service.config.configuration import ConfigurationManager
 from ml_service.logging.logger import logging
 from ml_service.constants import *
 from ml_service.components.feature_engineering import FeatureEngineeringAndDataTransformation
+from ml_service.entity.artifacts_entity import StageCacheSpec
+from ml_service.utils.main_utils import dataframe_parts_dir, load_json
+from ml_service.utils.stage_cache import StageCache
 from pathlib import Path
 
 class FeatureEngineeringTrainingPipeline:
@@ -9,6 +12,49 @@ class FeatureEngineeringTrainingPipeline:
     def __init__(self):
         pass
 
+    def cache_spec(self, include_appended: bool = True) -> StageCacheSpec:
+        """Merged files, feature settings and code this stage depends on.
+
+        Args:
+            include_appended (bool): also depend on rows appended to the merged train file
+        """
+        config_manager = ConfigurationManager(CONFIG_FILE_PATH, PARAMS_FILE_PATH)
+        feature_config = config_manager.get_feature_engineering_and_data_transformation_config()
+
+        inputs = [feature_config.input_train_file, feature_config.input_test_file, feature_config.holidays_file]
+        if include_appended:
+            inputs.append(dataframe_parts_dir(feature_config.input_train_file))
+
+        outputs = [feature_config.train_file, feature_config.test_file,
+                   Path(feature_config.scaler_file), feature_config.calendar_file]
+        if feature_config.encoding == "categorical":
+            outputs.append(feature_config.vocabulary_file)
+        if feature_config.lag_features.get("enabled", False):
+            outputs.append(feature_config.lag_state_file)
+        if feature_config.profile_memory:
+            outputs.append(feature_config.memory_report_file)
+
+        return StageCacheSpec(
+            inputs=inputs,
+            outputs=outputs,
+            settings={
+                "features_dataTransformation": config_manager.config.features_dataTransformation.to_dict(),
+                "holidays_dtype": feature_config.holidays_dtype,
+                "date_format": feature_config.date_format,
+                "artifact_format": config_manager.artifact_format,
+            },
+            code=[
+                "ml_service.components.calendar_features",
+                "ml_service.components.data_ingestion",
+                "ml_service.components.feature_engineering",
+                "ml_service.components.lag_features",
+                "ml_service.config.configuration",
+                "ml_service.entity.config_entity",
+                "ml_service.pipeline.stage_03_featureEngineering_and_dataTransformation",
+                "ml_service.utils.main_utils",
+            ],
+        )
+
     def main(self):
         config_manager = ConfigurationManager(CONFIG_FILE_PATH, PARAMS_FILE_PATH)
         feature_config = config_manager.get_feature_engineering_and_data_transformation_config()
@@ -18,8 +64,37 @@ class FeatureEngineeringTrainingPipeline:
             test_file=Path(feature_config.input_test_file),
             output_dir=feature_config.root_dir,
             scale_file=Path(feature_config.scaler_file),
+            train_output_file=feature_config.train_file,
+            test_output_file=feature_config.test_file,
+            compression=feature_config.artifact_format.compression,
+            export_csv=feature_config.artifact_format.export_csv,
+            partitioned=feature_config.artifact_format.partitioned,
+            holidays_file=feature_config.holidays_file,
+            holidays_dtype=feature_config.holidays_dtype,
+            date_format=feature_config.date_format,
+            calendar_file=feature_config.calendar_file,
+            profile_memory=feature_config.profile_memory,
+            memory_report_file=feature_config.memory_report_file,
+            encoding=feature_config.encoding,
+            vocabulary_file=feature_config.vocabulary_file,
+            lag_features=feature_config.lag_features,
+            lag_state_file=feature_config.lag_state_file,
         )
-        fe.run()
+
+        incremental_config = config_manager.get_incremental_update_config()
+        if incremental_config.enabled:
+            # Same full-run inputs, settings and code: only transform the appended rows
+            fingerprint = StageCache(config_manager.get_stage_cache_config()) \
+                .fingerprint(self.cache_spec(include_appended=False))
+            state_file = incremental_config.features_state_file
+            if state_file.exists() and load_json(state_file).get("fingerprint") == fingerprint:
+                fe.update(state_file)
+                return
+
+        columns = fe.run()
+
+        if incremental_config.enabled:
+            fe.write_update_state(state_file, fingerprint, columns)
 
 if __name__ == "__main__":
     STAGE_NAME = "Feature Engineering & Data Transformation"
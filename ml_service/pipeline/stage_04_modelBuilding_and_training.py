@@ -2,14 +2,11 @@ from ml_service.config.configuration import ConfigurationManager
 from ml_service.components.modelBuilding_and_evaluation import ModelBuildingAndEvaluation
 from ml_service.logging.logger import logging
 from ml_service.constants import CONFIG_FILE_PATH, PARAMS_FILE_PATH
+from ml_service.entity.artifacts_entity import StageCacheSpec
+from ml_service.utils.main_utils import dataframe_parts_dir
+from pathlib import Path
 
-import dagshub
-dagshub.init(repo_owner='roshankahaneDSAI', repo_name='Sales_Forecasting_and_Analytics', mlflow=True)
-
-import mlflow
-with mlflow.start_run():
-  mlflow.log_param('parameter name', 'value')
-  mlflow.log_metric('metric name', 1)
+SUBMISSION_FILE = "submission_XgBoost_model1.csv"
 
 
 class ModelBuildingAndEvaluationTrainingPipeline:
@@ -17,6 +14,39 @@ class ModelBuildingAndEvaluationTrainingPipeline:
     def __init__(self):
         pass
 
+    def cache_spec(self) -> StageCacheSpec:
+        """Feature files, model params and code this stage depends on."""
+        config_manager = ConfigurationManager(CONFIG_FILE_PATH, PARAMS_FILE_PATH)
+        model_and_eval_config = config_manager.get_modelBuilding_and_evaluation_config()
+        outputs = [model_and_eval_config.path_of_model, model_and_eval_config.metrics_file, Path(SUBMISSION_FILE)]
+        if config_manager.params.get("MODEL_TYPE", "XGBoost") == "XGBoost":
+            # Only XGBoost models are compiled for serving
+            outputs.append(model_and_eval_config.compiled_model_file)
+
+        return StageCacheSpec(
+            inputs=[model_and_eval_config.input_train_file, model_and_eval_config.input_test_file,
+                    dataframe_parts_dir(model_and_eval_config.input_train_file)],
+            outputs=outputs,
+            settings={
+                "modelBuildingAndEvaluation": config_manager.config.modelBuildingAndEvaluation.to_dict(),
+                "params": config_manager.params.to_dict(),
+                "experimentTracking": config_manager.config.get("experimentTracking", {}),
+            },
+            code=[
+                "ml_service.components.modelBuilding_and_evaluation",
+                "ml_service.components.experiment_tracker",
+                "ml_service.components.model_backends",
+                "ml_service.components.segment_metrics",
+                "ml_service.components.segment_router",
+                "ml_service.components.training_matrix",
+                "ml_service.components.tree_predictor",
+                "ml_service.config.configuration",
+                "ml_service.entity.config_entity",
+                "ml_service.pipeline.stage_04_modelBuilding_and_training",
+                "ml_service.utils.main_utils",
+            ],
+        )
+
     def main(self):
         config_manager = ConfigurationManager(CONFIG_FILE_PATH, PARAMS_FILE_PATH)
         model_and_eval_config = config_manager.get_modelBuilding_and_evaluation_config()
@@ -28,8 +58,9 @@ class ModelBuildingAndEvaluationTrainingPipeline:
         logging.info(f"Evaluation Done! Metrics saved to {model_and_eval_config.metrics_file}")
 
 
-        process.create_submission(model_and_eval_config.input_test_file,
-                                "submission_XgBoost_model1.csv")
+        process.create_submission(model_and_eval_config.input_test_file, SUBMISSION_FILE)
+        # The run has been logging to MLflow in the background since training finished
+        process.tracker.wait()
 
 
 if __name__ == "__main__":
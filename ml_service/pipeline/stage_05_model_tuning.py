@@ -0,0 +1,58 @@
+from ml_service.config.configuration import ConfigurationManager
+from ml_service.components.model_tuning import ModelTuning
+from ml_service.logging.logger import logging
+from ml_service.constants import CONFIG_FILE_PATH, PARAMS_FILE_PATH
+from ml_service.entity.artifacts_entity import StageCacheSpec
+from ml_service.utils.main_utils import dataframe_parts_dir
+
+
+class ModelTuningTrainingPipeline:
+    """Pipeline for the hyperparameter search."""
+    def __init__(self):
+        pass
+
+    def cache_spec(self) -> StageCacheSpec:
+        """Feature files, search settings and code this stage depends on."""
+        config_manager = ConfigurationManager(CONFIG_FILE_PATH, PARAMS_FILE_PATH)
+        model_and_eval_config = config_manager.get_modelBuilding_and_evaluation_config()
+        tuning_config = config_manager.get_model_tuning_config()
+
+        return StageCacheSpec(
+            inputs=[model_and_eval_config.input_train_file,
+                    dataframe_parts_dir(model_and_eval_config.input_train_file)],
+            outputs=[tuning_config.tuned_params_file, tuning_config.trials_file],
+            settings={
+                "modelTuning": config_manager.config.get("modelTuning", {}),
+                "modelBuildingAndEvaluation": config_manager.config.modelBuildingAndEvaluation.to_dict(),
+                "params": config_manager.params.to_dict(),
+            },
+            code=[
+                "ml_service.components.model_tuning",
+                "ml_service.components.modelBuilding_and_evaluation",
+                "ml_service.components.model_backends",
+                "ml_service.components.training_matrix",
+                "ml_service.config.configuration",
+                "ml_service.entity.config_entity",
+                "ml_service.pipeline.stage_05_model_tuning",
+                "ml_service.utils.main_utils",
+            ],
+        )
+
+    def main(self):
+        config_manager = ConfigurationManager(CONFIG_FILE_PATH, PARAMS_FILE_PATH)
+        tuning = ModelTuning(config_manager.get_model_tuning_config(),
+                             config_manager.get_modelBuilding_and_evaluation_config())
+        tuning.run()
+
+
+if __name__ == "__main__":
+    STAGE_NAME = "Model Tuning Stage"
+    try:
+        logging.info("*******************************")
+        logging.info(f">>>>>>> stage {STAGE_NAME} started <<<<<<")
+        pipeline = ModelTuningTrainingPipeline()
+        pipeline.main()
+        logging.info(f">>>>>>> stage {STAGE_NAME} completed <<<<<<")
+    except Exception as e:
+        logging.exception(e)
+        raise e
@@ -1,13 +1,19 @@
 import os
+import shutil
 from box.exceptions import BoxValueError
 import yaml
 import json
 import joblib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from ensure import ensure_annotations
 from box import ConfigBox
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, List, Optional, Tuple
 from ml_service.logging.logger import logging
+from ml_service.constants import ARTIFACT_SUFFIXES, PARTS_SUFFIX, PARTITION_COLUMNS
 
 
 
@@ -37,6 +43,19 @@ def read_yaml(path_to_yaml: Path) -> ConfigBox:
     
 
 
+def save_yaml(path: Path, data: dict):
+    """save a dict as yaml, keeping key order
+
+    Args:
+        path (Path): path to yaml file
+        data (dict): data to be saved in yaml file
+    """
+    with open(path, "w") as f:
+        yaml.safe_dump(data, f, sort_keys=False)
+
+    logging.info(f"yaml file saved at: {path}")
+
+
 @ensure_annotations
 def create_directories(path_to_directories: list, verbose=True):
     """create list of directories
@@ -110,3 +129,427 @@ def load_bin(path: Path) -> Any:
     logging.info(f"binary file loaded from: {path}")
     return data
 
+
+DateRange = Tuple[Optional[Any], Optional[Any]]
+
+
+def _date_partitioning() -> ds.Partitioning:
+    # Zero-padded strings keep the directory order chronological
+    return ds.partitioning(pa.schema([(col, pa.string()) for col in PARTITION_COLUMNS]), flavor="hive")
+
+
+def _dataset_format(path: Path) -> ds.FileFormat:
+    return ds.ParquetFileFormat() if path.suffix == ARTIFACT_SUFFIXES["parquet"] else ds.IpcFileFormat()
+
+
+def _with_partition_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the year/month partition keys, formatted once per distinct date."""
+    codes, dates = pd.factorize(df["date"])
+    return df.assign(**{
+        PARTITION_COLUMNS[0]: dates.strftime("%Y").to_numpy(dtype=object)[codes],
+        PARTITION_COLUMNS[1]: dates.strftime("%m").to_numpy(dtype=object)[codes],
+    })
+
+
+def _write_date_partitions(table: pa.Table, path: Path, compression: Optional[str], basename: str = "part"):
+    """Write a table (with partition key columns) below `path` as date_year=YYYY/date_month=MM/ files."""
+    file_format = _dataset_format(path)
+    ds.write_dataset(
+        table, path, format=file_format, partitioning=_date_partitioning(),
+        file_options=file_format.make_write_options(compression=compression),
+        basename_template=f"{basename}-{{i}}{path.suffix}",
+        existing_data_behavior="overwrite_or_ignore", preserve_order=True,
+    )
+
+
+def _clear_artifact(path: Path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def save_dataframe(df: pd.DataFrame, path: Path, compression: Optional[str] = None, export_csv: bool = False,
+                   partitioned: bool = False):
+    """save a DataFrame as a pipeline artifact
+
+    The format is taken from the file suffix (.parquet, .feather or .csv).
+    Parquet and Feather keep dtypes (datetime, category, small ints) intact.
+
+    Args:
+        df (pd.DataFrame): data to be saved
+        path (Path): destination file
+        compression (str, optional): codec for parquet/feather. Defaults to None.
+        export_csv (bool, optional): also write a .csv copy next to the artifact. Defaults to False.
+        partitioned (bool, optional): write parquet/feather data with a 'date' column as a
+            directory partitioned by year/month, so date-range loads skip other months. Defaults to False.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A full rewrite replaces anything appended to the previous version
+    shutil.rmtree(dataframe_parts_dir(path), ignore_errors=True)
+    _clear_artifact(path)
+
+    if partitioned and path.suffix != ARTIFACT_SUFFIXES["csv"] and "date" in df.columns:
+        table = pa.Table.from_pandas(_with_partition_columns(df), preserve_index=False)
+        _write_date_partitions(table, path, compression)
+    elif path.suffix == ARTIFACT_SUFFIXES["parquet"]:
+        df.to_parquet(path, index=False, compression=compression)
+    elif path.suffix == ARTIFACT_SUFFIXES["feather"]:
+        df.reset_index(drop=True).to_feather(path, compression=compression)
+    elif path.suffix == ARTIFACT_SUFFIXES["csv"]:
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported artifact format: {path}")
+
+    if export_csv and path.suffix != ARTIFACT_SUFFIXES["csv"]:
+        df.to_csv(path.with_suffix(ARTIFACT_SUFFIXES["csv"]), index=False)
+
+    logging.info(f"dataframe {df.shape} saved at: {path}")
+
+
+def dataframe_parts_dir(path: Path) -> Path:
+    """directory holding the rows appended to an artifact, e.g. train_final.parts/"""
+    path = Path(path)
+    return path.with_name(f"{path.stem}{PARTS_SUFFIX}")
+
+
+def dataframe_parts(path: Path) -> List[Path]:
+    """part files appended to an artifact, in append order"""
+    parts_dir = dataframe_parts_dir(path)
+    if not parts_dir.is_dir():
+        return []
+    return sorted(parts_dir.glob(f"part-*{Path(path).suffix}"))
+
+
+def append_dataframe(df: pd.DataFrame, path: Path, compression: Optional[str] = None,
+                     export_csv: bool = False) -> Path:
+    """append rows to an artifact without rewriting it
+
+    The rows go to a new part file in the artifact's `.parts` directory, so the
+    cost depends only on `len(df)`. `load_dataframe` reads the parts after the
+    main file; `save_dataframe` on the artifact discards them.
+
+    Args:
+        df (pd.DataFrame): rows to append
+        path (Path): artifact file written by `save_dataframe`
+        compression (str, optional): codec for parquet/feather. Defaults to None.
+        export_csv (bool, optional): also append the rows to the .csv copy. Defaults to False.
+
+    Returns:
+        Path: the part file written
+    """
+    path = Path(path)
+    parts_dir = dataframe_parts_dir(path)
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    part = parts_dir / f"part-{len(dataframe_parts(path)):05d}{path.suffix}"
+    save_dataframe(df, part, compression)
+
+    if export_csv and path.suffix != ARTIFACT_SUFFIXES["csv"]:
+        df.to_csv(path.with_suffix(ARTIFACT_SUFFIXES["csv"]), mode="a", header=False, index=False)
+
+    return part
+
+
+def _date_filter(date_range: DateRange, partitioned: bool) -> Optional[ds.Expression]:
+    """Row filter start <= date < end, plus the matching year/month partition filter."""
+    start, end = (pd.Timestamp(value) if value is not None else None for value in date_range)
+    year, month = ds.field(PARTITION_COLUMNS[0]), ds.field(PARTITION_COLUMNS[1])
+    expression = None
+
+    def both(left, right):
+        return right if left is None else left & right
+
+    if start is not None:
+        expression = both(expression, ds.field("date") >= pa.scalar(start.to_pydatetime()))
+        if partitioned:
+            y, m = start.strftime("%Y"), start.strftime("%m")
+            expression = both(expression, (year > y) | ((year == y) & (month >= m)))
+    if end is not None:
+        expression = both(expression, ds.field("date") < pa.scalar(end.to_pydatetime()))
+        if partitioned:
+            last = end - pd.Timedelta(1, "ns")
+            y, m = last.strftime("%Y"), last.strftime("%m")
+            expression = both(expression, (year < y) | ((year == y) & (month <= m)))
+    return expression
+
+
+def _filter_dates(df: pd.DataFrame, date_range: DateRange, columns: Optional[List[str]]) -> pd.DataFrame:
+    """In-memory date filter for formats without pushdown (CSV)."""
+    dates = pd.to_datetime(df["date"])
+    start, end = date_range
+    keep = pd.Series(True, index=df.index)
+    if start is not None:
+        keep &= dates >= pd.Timestamp(start)
+    if end is not None:
+        keep &= dates < pd.Timestamp(end)
+    return df.loc[keep.to_numpy(), columns or df.columns].reset_index(drop=True)
+
+
+def _csv_usecols(columns: Optional[List[str]], date_range: Optional[DateRange]) -> Optional[List[str]]:
+    if columns is None or date_range is None:
+        return columns
+    return list(dict.fromkeys(columns + ["date"]))
+
+
+def _open_dataset(path: Path, columns: Optional[List[str]], date_range: Optional[DateRange]):
+    """Dataset over a file or partitioned directory, with the projected columns and pushdown filter."""
+    partitioned = path.is_dir()
+    # Partition pruning skips whole months; parquet row-group statistics skip the rest
+    dataset = ds.dataset(path, format=_dataset_format(path),
+                         partitioning=_date_partitioning() if partitioned else None)
+    names = columns or [name for name in dataset.schema.names if name not in PARTITION_COLUMNS]
+    expression = _date_filter(date_range, partitioned) if date_range is not None else None
+    return dataset, names, expression
+
+
+def _read_dataframe(path: Path, columns: Optional[List[str]] = None,
+                    date_range: Optional[DateRange] = None) -> pd.DataFrame:
+    if path.suffix == ARTIFACT_SUFFIXES["csv"]:
+        df = pd.read_csv(path, usecols=_csv_usecols(columns, date_range), low_memory=False)
+        return df if date_range is None else _filter_dates(df, date_range, columns)
+    if path.suffix not in ARTIFACT_SUFFIXES.values():
+        raise ValueError(f"Unsupported artifact format: {path}")
+
+    if not path.is_dir() and date_range is None:
+        if path.suffix == ARTIFACT_SUFFIXES["parquet"]:
+            return pd.read_parquet(path, columns=columns)
+        return pd.read_feather(path, columns=columns)
+
+    dataset, names, expression = _open_dataset(path, columns, date_range)
+    return dataset.to_table(columns=names, filter=expression).to_pandas()
+
+
+def _concat_parts(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate part frames, keeping categorical columns categorical."""
+    if len(frames) == 1:
+        return frames[0]
+    for col in frames[0].select_dtypes("category").columns:
+        if all(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames):
+            categories = frames[0][col].cat.categories
+            for frame in frames[1:]:
+                categories = categories.union(frame[col].cat.categories)
+            for frame in frames:
+                frame[col] = frame[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_dataframe(path: Path, columns: Optional[List[str]] = None,
+                   date_range: Optional[DateRange] = None) -> pd.DataFrame:
+    """load a DataFrame artifact written by `save_dataframe` (plus any appended parts)
+
+    Args:
+        path (Path): artifact file or partitioned directory, format is taken from the suffix
+        columns (list, optional): only read these columns. Defaults to None (all).
+        date_range (tuple, optional): (start, end) to only read rows with start <= date < end;
+            either bound may be None. Defaults to None (all rows).
+
+    Returns:
+        pd.DataFrame: loaded data, with 'date' parsed as datetime
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"File not found at {path}")
+
+    df = load_dataframe_files([path] + dataframe_parts(path), columns, date_range)
+    logging.info(f"dataframe {df.shape} loaded from: {path}")
+    return df
+
+
+def load_dataframe_files(paths: List[Path], columns: Optional[List[str]] = None,
+                         date_range: Optional[DateRange] = None) -> pd.DataFrame:
+    """load and stack artifact files, e.g. a subset of the parts of an artifact
+
+    Args:
+        paths (list): files to read, in order
+        columns (list, optional): only read these columns. Defaults to None (all).
+        date_range (tuple, optional): (start, end) to only read rows with start <= date < end.
+            Defaults to None (all rows).
+
+    Returns:
+        pd.DataFrame: loaded data, with 'date' parsed as datetime
+    """
+    df = _concat_parts([_read_dataframe(Path(file), columns, date_range) for file in paths])
+
+    # CSV carries no type information
+    if "date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["date"]):
+        df["date"] = pd.to_datetime(df["date"])
+
+    # Chunked writes record categories in arrival order; sort them so a file
+    # reads back the same however it was written
+    for col in df.select_dtypes("category").columns:
+        categories = df[col].cat.categories
+        if not df[col].cat.ordered and not categories.is_monotonic_increasing:
+            df[col] = df[col].cat.reorder_categories(categories.sort_values())
+
+    return df
+
+
+def iter_dataframe(path: Path, columns: Optional[List[str]] = None, date_range: Optional[DateRange] = None,
+                   batch_rows: int = 500_000) -> Iterator[pd.DataFrame]:
+    """stream an artifact (plus any appended parts) in batches of at most `batch_rows` rows
+
+    Same projection and date pushdown as `load_dataframe`, without holding the
+    whole table. Categorical columns carry only their batch's categories.
+
+    Args:
+        path (Path): artifact file or partitioned directory
+        columns (list, optional): only read these columns. Defaults to None (all).
+        date_range (tuple, optional): (start, end) to only read rows with start <= date < end.
+        batch_rows (int, optional): maximum rows per batch. Defaults to 500_000.
+
+    Yields:
+        pd.DataFrame: consecutive batches, in file order
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"File not found at {path}")
+
+    for file in [path] + dataframe_parts(path):
+        if file.suffix == ARTIFACT_SUFFIXES["csv"]:
+            for chunk in pd.read_csv(file, usecols=_csv_usecols(columns, date_range),
+                                     chunksize=batch_rows, low_memory=False):
+                yield chunk if date_range is None else _filter_dates(chunk, date_range, columns)
+            continue
+
+        dataset, names, expression = _open_dataset(file, columns, date_range)
+        for batch in dataset.to_batches(columns=names, filter=expression, batch_size=batch_rows):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+
+class ChunkedDataFrameWriter:
+    """Append DataFrame chunks to a single artifact file.
+
+    Parquet chunks become row groups and Feather chunks record batches, so the
+    result reads back with `load_dataframe` like a file written in one go. The
+    schema is fixed by the first chunk; later chunks are cast to it, and an
+    integer column that picks up missing values in a later chunk (a left
+    merge upcasts it to float) is stored as nulls of the integer type. With
+    `partitioned`, each chunk is split into the year/month directories instead.
+
+    Usage:
+        with ChunkedDataFrameWriter(path, compression="zstd") as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, path: Path, compression: Optional[str] = None, export_csv: bool = False,
+                 partitioned: bool = False):
+        self.path = Path(path)
+        self.compression = compression
+        self.export_csv = export_csv and self.path.suffix != ARTIFACT_SUFFIXES["csv"]
+        self.partitioned = partitioned and self.path.suffix != ARTIFACT_SUFFIXES["csv"]
+        self.rows = 0
+        self._chunks = 0
+        self._schema = None
+        self._writer = None
+        self._categories = {}
+
+        if self.path.suffix not in ARTIFACT_SUFFIXES.values():
+            raise ValueError(f"Unsupported artifact format: {self.path}")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.rmtree(dataframe_parts_dir(self.path), ignore_errors=True)
+        _clear_artifact(self.path)
+
+    def write(self, df: pd.DataFrame):
+        """append one chunk to the artifact"""
+        if self.path.suffix == ARTIFACT_SUFFIXES["csv"]:
+            self._write_csv(df, self.path)
+        else:
+            self._write_arrow(df)
+        if self.export_csv:
+            self._write_csv(df, self.path.with_suffix(ARTIFACT_SUFFIXES["csv"]))
+        self.rows += len(df)
+
+    def close(self):
+        """flush and close the underlying file"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        logging.info(f"{self.rows} rows saved at: {self.path}")
+
+    def __enter__(self) -> "ChunkedDataFrameWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_csv(self, df: pd.DataFrame, path: Path):
+        first = self.rows == 0
+        df.to_csv(path, mode="w" if first else "a", header=first, index=False)
+
+    def _extend_categories(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Give categorical columns a vocabulary that only ever grows.
+
+        Each chunk's dictionary then extends the previous one, which Feather
+        can store as a dictionary delta.
+        """
+        updates = {}
+        for col in df.select_dtypes("category").columns:
+            seen = self._categories.get(col)
+            categories = df[col].cat.categories
+            if seen is None:
+                seen = categories
+            else:
+                seen = seen.append(categories.difference(seen))
+            self._categories[col] = seen
+            if not categories.equals(seen):
+                updates[col] = df[col].cat.set_categories(seen)
+        return df.assign(**updates) if updates else df
+
+    def _open_writer(self):
+        if self.path.suffix == ARTIFACT_SUFFIXES["parquet"]:
+            return pq.ParquetWriter(self.path, self._schema, compression=self.compression)
+        options = pa.ipc.IpcWriteOptions(compression=self.compression, emit_dictionary_deltas=True)
+        return pa.ipc.new_file(str(self.path), self._schema, options=options)
+
+    def _conform_integers(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Cast float chunk columns back to the schema's integer type, keeping NaN as null."""
+        updates = {}
+        for field in self._schema:
+            if pa.types.is_integer(field.type) and field.name in df and pd.api.types.is_float_dtype(df[field.name]):
+                dtype = f"{'U' if pa.types.is_unsigned_integer(field.type) else ''}Int{field.type.bit_width}"
+                try:
+                    updates[field.name] = df[field.name].astype(dtype)
+                except (TypeError, ValueError) as e:
+                    raise ValueError(f"Column '{field.name}' of chunk {self._chunks} does not fit the "
+                                     f"{field.type} type set by the first chunk of {self.path}: {e}") from e
+        return df.assign(**updates) if updates else df
+
+    def _write_arrow(self, df: pd.DataFrame):
+        if self._schema is not None:
+            df = self._conform_integers(df)
+            # Chunks concatenated from differently-encoded parts lose the category dtype
+            lost = {
+                field.name: df[field.name].astype("category") for field in self._schema
+                if pa.types.is_dictionary(field.type) and field.name in df
+                and not isinstance(df[field.name].dtype, pd.CategoricalDtype)
+            }
+            if lost:
+                df = df.assign(**lost)
+        df = self._extend_categories(df)
+        if self.partitioned:
+            df = _with_partition_columns(df)
+
+        if self._schema is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            for i, field in enumerate(schema):
+                # An all-missing object column in the first chunk infers as null
+                if pa.types.is_null(field.type):
+                    schema = schema.set(i, field.with_type(pa.string()))
+                # Leave room for the vocabulary to grow past the first chunk's
+                elif pa.types.is_dictionary(field.type):
+                    schema = schema.set(i, field.with_type(pa.dictionary(pa.int32(), field.type.value_type)))
+            self._schema = schema
+
+            if not self.partitioned:
+                self._writer = self._open_writer()
+
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        if self.partitioned:
+            # Chunk-numbered file names keep the chunks in order within each month
+            _write_date_partitions(table, self.path, self.compression, basename=f"chunk-{self._chunks:05d}")
+        else:
+            self._writer.write_table(table)
+        self._chunks += 1
@@ -0,0 +1,125 @@
+import hashlib
+import importlib.util
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from ml_service.entity.artifacts_entity import StageCacheSpec
+from ml_service.entity.config_entity import StageCacheConfig
+from ml_service.logging.logger import logging
+
+
+def file_signature(path: Path, hash_mode: str = "mtime") -> List[Dict]:
+    """Describe a file (or every file under a directory) for fingerprinting.
+
+    Args:
+        path (Path): file or directory
+        hash_mode (str): 'mtime' uses modification time and size, 'content' hashes the bytes
+
+    Returns:
+        list: one entry per file, sorted by path; a missing path yields a single 'missing' entry
+    """
+    path = Path(path)
+    if not path.exists():
+        return [{"path": str(path), "missing": True}]
+
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    signatures = []
+    for file in files:
+        stat = file.stat()
+        entry = {"path": str(file), "size": stat.st_size}
+        if hash_mode == "content":
+            entry["sha256"] = _sha256(file)
+        else:
+            entry["mtime_ns"] = stat.st_mtime_ns
+        signatures.append(entry)
+    return signatures
+
+
+def _sha256(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _module_source_hash(module_name: str) -> str:
+    """Hash a module's source without importing it."""
+    spec = importlib.util.find_spec(module_name)
+    if spec is None or spec.origin is None:
+        raise ValueError(f"Cannot locate source of module '{module_name}'")
+    return _sha256(Path(spec.origin))
+
+
+class StageCache:
+    """Skip pipeline stages whose inputs are unchanged since their last successful run.
+
+    A stage's fingerprint covers its input files, the config/params values it
+    reads and the source of the modules that implement it. The fingerprint of
+    each successful run is stored as JSON under `root_dir`.
+    """
+
+    def __init__(self, config: StageCacheConfig) -> None:
+        self.config = config
+
+    def fingerprint(self, spec: StageCacheSpec) -> str:
+        """Compute the fingerprint of a stage from its spec."""
+        payload = {
+            "inputs": [file_signature(path, self.config.hash_mode) for path in spec.inputs],
+            "settings": spec.settings,
+            "code": {name: _module_source_hash(name) for name in sorted(spec.code)},
+        }
+        blob = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(blob).hexdigest()
+
+    def is_fresh(self, stage_name: str, spec: StageCacheSpec, fingerprint: Optional[str] = None) -> bool:
+        """True if the stage ran before with the same fingerprint and its outputs still exist."""
+        record_file = self._record_file(stage_name)
+        if not self.config.enabled or not record_file.exists():
+            return False
+        if not all(Path(path).exists() for path in spec.outputs):
+            return False
+
+        with open(record_file) as f:
+            record = json.load(f)
+        return record.get("fingerprint") == (fingerprint or self.fingerprint(spec))
+
+    def record(self, stage_name: str, spec: StageCacheSpec, fingerprint: Optional[str] = None) -> None:
+        """Store the fingerprint of a successful stage run."""
+        if not self.config.enabled:
+            return
+        record_file = self._record_file(stage_name)
+        record_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(record_file, "w") as f:
+            json.dump({
+                "stage": stage_name,
+                "fingerprint": fingerprint or self.fingerprint(spec),
+                "completed_at": datetime.now().isoformat(timespec="seconds"),
+                "outputs": [str(path) for path in spec.outputs],
+            }, f, indent=4)
+
+    def run(self, stage_name: str, stage_fn: Callable[[], None], spec: StageCacheSpec) -> bool:
+        """Run `stage_fn` unless the stage is fresh.
+
+        Returns:
+            bool: True if the stage ran, False if it was skipped
+        """
+        if not self.config.enabled:
+            stage_fn()
+            return True
+
+        # Fingerprint before running so the record reflects the inputs actually used
+        fingerprint = self.fingerprint(spec)
+        if self.is_fresh(stage_name, spec, fingerprint):
+            logging.info(f"stage {stage_name} is up to date, skipping")
+            return False
+        stage_fn()
+        self.record(stage_name, spec, fingerprint)
+        return True
+
+    def _record_file(self, stage_name: str) -> Path:
+        slug = re.sub(r"[^a-z0-9]+", "_", stage_name.lower()).strip("_")
+        return Path(self.config.root_dir) / f"{slug}.json"
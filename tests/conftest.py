@@ -0,0 +1,69 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from ml_service.benchmark.synthetic_data import SyntheticSalesData
+from ml_service.components.lag_features import LagFeatureGenerator
+from ml_service.config.configuration import ConfigurationManager
+from ml_service.constants import CONFIG_FILE_PATH, PARAMS_FILE_PATH
+from ml_service.utils.main_utils import read_yaml, save_yaml, save_dataframe
+
+PROJECT_DIR = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture(scope="session")
+def data_acquisition():
+    """The data_acquisition section of the project config (file names, schema, date format)."""
+    return read_yaml(PROJECT_DIR / CONFIG_FILE_PATH).data_acquisition
+
+
+@pytest.fixture(scope="session")
+def raw_dir(tmp_path_factory):
+    """Small Kaggle-schema raw files spanning a New Year, when every store is closed."""
+    out_dir = tmp_path_factory.mktemp("raw")
+    SyntheticSalesData(stores=3, families=33, days=60, end_date="2017-01-20", test_days=16, seed=7).write(out_dir)
+    return out_dir
+
+
+@pytest.fixture
+def config_manager(tmp_path, monkeypatch):
+    """ConfigurationManager over the project config and params with some settings replaced, run in tmp_path.
+
+    Keyword arguments name config sections whose keys are replaced; `params` replaces params keys.
+    """
+    monkeypatch.chdir(tmp_path)
+
+    def make(params=None, **sections):
+        config = read_yaml(PROJECT_DIR / CONFIG_FILE_PATH).to_dict()
+        for section, settings in sections.items():
+            config[section] = {**config[section], **settings}
+        save_yaml(tmp_path / "config.yaml", config)
+        save_yaml(tmp_path / "params.yaml", {**read_yaml(PROJECT_DIR / PARAMS_FILE_PATH).to_dict(), **(params or {})})
+        return ConfigurationManager(tmp_path / "config.yaml", tmp_path / "params.yaml")
+    return make
+
+
+def feature_frame(start="2016-01-01", end="2017-03-31", seed=0, lags=None):
+    """Feature-stage style rows (onehot layout) of 4 stores x 3 families with a learnable signal."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, end, freq="D")
+    stores, families = [1, 2, 3, 4], ["BEVERAGES", "DAIRY", "PRODUCE"]
+    index = pd.MultiIndex.from_product([dates, stores, families], names=["date", "store_nbr", "family"])
+    df = index.to_frame(index=False)
+    level = df["store_nbr"].to_numpy() * 10 + df["family"].map({"BEVERAGES": 50, "DAIRY": 20, "PRODUCE": 5})
+    weekday = df["date"].dt.dayofweek.to_numpy()
+    df["onpromotion"] = rng.poisson(2, len(df)).astype(np.int16)
+    df["sales"] = level * (1 + 0.2 * (weekday >= 5)) + 3 * df["onpromotion"] + rng.normal(0, 2, len(df))
+    df["day_of_week"] = weekday.astype(np.int8)
+    for col, value in {"state": "Pichincha", "city": "Quito", "type_x": "D", "type_y": "Regular Day"}.items():
+        df[col] = pd.Categorical([value] * len(df))
+    df["family"] = df["family"].astype("category")
+    return (lags or LagFeatureGenerator()).transform(df)
+
+
+@pytest.fixture
+def features_file(tmp_path):
+    """A feature file (parquet) of `feature_frame` rows."""
+    path = tmp_path / "features" / "train_final.parquet"
+    save_dataframe(feature_frame(), path)
+    return path
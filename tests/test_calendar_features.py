@@ -0,0 +1,15 @@
+import pandas as pd
+from ml_service.components.calendar_features import CalendarFeatures
+
+
+def test_from_file_reads_with_the_configured_schema_and_date_format(tmp_path, raw_dir, data_acquisition):
+    holidays = pd.read_csv(raw_dir / "holidays_events.csv", parse_dates=["date"])
+    holidays_file = tmp_path / "holidays_events.csv"
+    holidays.to_csv(holidays_file, index=False, date_format="%d/%m/%Y")
+
+    calendar = CalendarFeatures.from_file(holidays_file, data_acquisition.schema.holidays_events, "%d/%m/%Y")
+    expected = CalendarFeatures(holidays)
+
+    dates = pd.date_range("2016-12-20", "2017-01-10")
+    pd.testing.assert_frame_equal(calendar.table(dates), expected.table(dates))
+    assert calendar.table(pd.DatetimeIndex(["2017-01-01"]))["is_holiday"].iloc[0] == 1
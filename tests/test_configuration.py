@@ -0,0 +1,21 @@
+import pytest
+
+
+def test_project_config_loads(config_manager):
+    manager = config_manager()
+    assert manager.get_feature_engineering_and_data_transformation_config().lag_features["enabled"]
+    assert manager.get_modelBuilding_and_evaluation_config().validation_start == "2017-01-01"
+
+
+def test_validation_window_must_not_end_before_it_starts(config_manager):
+    manager = config_manager(modelBuildingAndEvaluation={"validation_start": "2017-03-01",
+                                                         "validation_end": "2017-02-01"})
+    with pytest.raises(ValueError, match="before validation_start"):
+        manager.get_modelBuilding_and_evaluation_config()
+
+
+def test_cv_windows_longer_than_the_lag_horizon_are_rejected(config_manager):
+    cross_validation = {"enabled": True, "horizon_days": 28, "workers": 0}
+    manager = config_manager(modelBuildingAndEvaluation={"cross_validation": cross_validation})
+    with pytest.raises(ValueError, match="exceeds lag_features.horizon"):
+        manager.get_cross_validation_config()
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from ml_service.components.lag_features import LagFeatureGenerator
+from ml_service.components.modelBuilding_and_evaluation import (ModelBuildingAndEvaluation, _evaluate_fold,
+                                                                 regression_metrics)
+from tests.conftest import feature_frame
+
+
+def test_fold_features_only_use_sales_before_the_fold_origin(config_manager, features_file):
+    config = config_manager(
+        modelBuildingAndEvaluation={"input_train_file": str(features_file.with_suffix(""))},
+        artifact_format={"partitioned": False},
+    ).get_modelBuilding_and_evaluation_config()
+    folds = ModelBuildingAndEvaluation(config).cv_folds()
+    assert len(folds) == int(config.all_params["N_FOLDS"])
+
+    df = feature_frame()
+    lags = LagFeatureGenerator()
+    for fold in folds:
+        origin = pd.Timestamp(fold["val_start"])
+        rows = (df["date"] >= origin) & (df["date"] <= pd.Timestamp(fold["val_end"]))
+        # Sales from the origin on are unknown when the fold is forecast
+        changed = lags.transform(df.assign(sales=df["sales"].where(df["date"] < origin, -1.0)))
+        pd.testing.assert_frame_equal(changed.loc[rows, lags.columns], df.loc[rows, lags.columns])
+        assert df.loc[rows, lags.columns].notna().all().all()
+
+
+@pytest.mark.parametrize("mode", ["in_memory", "cached"])
+def test_folds_early_stop_on_the_days_before_their_window(config_manager, features_file, tmp_path, mode):
+    config = config_manager(
+        params={"N_ESTIMATORS": 300, "EARLY_STOPPING_ROUNDS": 5},
+        modelBuildingAndEvaluation={"input_train_file": str(features_file.with_suffix("")),
+                                    "training_data": {"mode": mode, "cache_dir": str(tmp_path / "cache"),
+                                                      "batch_rows": 1000, "max_bin": 256}},
+        artifact_format={"partitioned": False},
+    ).get_modelBuilding_and_evaluation_config()
+    process = ModelBuildingAndEvaluation(config)
+    fold = process.cv_folds()[-1]
+
+    # Early-stopping days sit between the training rows and the fold's window
+    horizon = pd.Timedelta(days=config.cross_validation.horizon_days)
+    assert pd.Timestamp(fold["early_stopping_start"]) == pd.Timestamp(fold["val_start"]) - horizon
+    assert pd.Timestamp(fold["train_end"]) + pd.Timedelta(days=1) == pd.Timestamp(fold["early_stopping_start"])
+    assert pd.Timestamp(fold["early_stopping_end"]) + pd.Timedelta(days=1) == pd.Timestamp(fold["val_start"])
+
+    result = _evaluate_fold(config, fold, n_jobs=1)
+    assert result["best_iteration"] is not None and result["best_iteration"] < 300
+
+    # Same as fitting the training rows early-stopped on those days
+    stop_range = (pd.Timestamp(fold["early_stopping_start"]), pd.Timestamp(fold["val_start"]))
+    X_val, y_val = process.load_split((pd.Timestamp(fold["val_start"]),
+                                       pd.Timestamp(fold["val_end"]) + pd.Timedelta(days=1)))
+    model = process.fit_model(process.build_model(n_jobs=1), *process.load_split((None, stop_range[0])),
+                              *process.load_split(stop_range))
+    assert result["best_iteration"] == process.backend.best_iteration(model)
+    if mode == "in_memory":
+        assert result["rmse"] == pytest.approx(regression_metrics(y_val, model.predict(X_val))["rmse"])
+
+
+def test_folds_without_early_stopping_train_up_to_their_window(config_manager, features_file):
+    config = config_manager(
+        params={"EARLY_STOPPING_ROUNDS": 0},
+        modelBuildingAndEvaluation={"input_train_file": str(features_file.with_suffix(""))},
+        artifact_format={"partitioned": False},
+    ).get_modelBuilding_and_evaluation_config()
+    for fold in ModelBuildingAndEvaluation(config).cv_folds():
+        assert "early_stopping_start" not in fold
+        assert pd.Timestamp(fold["train_end"]) + pd.Timedelta(days=1) == pd.Timestamp(fold["val_start"])
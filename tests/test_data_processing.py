@@ -0,0 +1,78 @@
+import shutil
+import pandas as pd
+import pytest
+from ml_service.components.data_processing import DataProcessor
+from ml_service.utils.main_utils import load_dataframe
+
+# A weekday with an oil price, a few days before the weekend holidays (Dec 24, Dec 31, Jan 1)
+SPLIT = pd.Timestamp("2016-12-20")
+
+
+def split_raw_files(raw_dir, target_dir, updates_dir, oil_in):
+    """Raw files up to SPLIT in `target_dir` and the later days as an update in `updates_dir`."""
+    target_dir.mkdir()
+    updates_dir.mkdir()
+    for name in ["test", "stores", "holidays_events", "sample_submission"]:
+        shutil.copy(raw_dir / f"{name}.csv", target_dir / f"{name}.csv")
+    for name in ["train", "transactions", "oil"]:
+        df = pd.read_csv(raw_dir / f"{name}.csv", parse_dates=["date"])
+        old, new = df[df["date"] <= SPLIT], df[df["date"] > SPLIT]
+        old = df if name == "oil" and oil_in == "raw" else old
+        old.to_csv(target_dir / f"{name}.csv", index=False)
+        if name != "oil" or oil_in == "update":
+            new.to_csv(updates_dir / f"{name}.csv", index=False)
+
+
+def full_merge(data_dir, data_acquisition, train_file):
+    processor = DataProcessor(data_dir, data_acquisition.data_files, data_acquisition.schema,
+                              data_acquisition.date_format)
+    processor.load().interpolate_oil().merge_train_test().merge_holidays_and_oil() \
+        .drop_irrelevant_columns().save(train_file, train_file.with_name("test.parquet"))
+    return processor
+
+
+@pytest.mark.parametrize("oil_in", ["raw", "update", "none"])
+def test_incremental_update_matches_a_full_rebuild(tmp_path, raw_dir, data_acquisition, oil_in):
+    split_raw_files(raw_dir, tmp_path / "raw", tmp_path / "updates", oil_in)
+    train_file = tmp_path / "incremental" / "train.parquet"
+    full_merge(tmp_path / "raw", data_acquisition, train_file) \
+        .write_update_state(tmp_path / "state.json", train_file, "fingerprint") \
+        .update(tmp_path / "updates", train_file, tmp_path / "state.json")
+
+    # The full rebuild reads the same raw files with the update appended
+    rebuild_dir = tmp_path / "rebuild"
+    shutil.copytree(tmp_path / "raw", rebuild_dir)
+    for update in (tmp_path / "updates").iterdir():
+        appended = pd.concat([pd.read_csv(rebuild_dir / update.name), pd.read_csv(update)])
+        appended.to_csv(rebuild_dir / update.name, index=False)
+    full_merge(rebuild_dir, data_acquisition, tmp_path / "rebuild.parquet")
+
+    result = load_dataframe(train_file)
+    expected = load_dataframe(tmp_path / "rebuild.parquet")
+    new_days = expected["date"] > SPLIT
+    # Holidays are joined on the oil dates, so without prices for the new days neither path has any
+    if oil_in != "none":
+        assert (expected.loc[new_days, "type_y"].notna()).any(), "the update should span holidays"
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=False, check_categorical=False)
+
+
+def test_full_merge_joins_holidays_on_oil_dates(tmp_path, raw_dir, data_acquisition):
+    shutil.copytree(raw_dir, tmp_path / "raw")
+    # A second event on Dec 26 (a weekday with a price) next to Navidad+1
+    holidays = pd.read_csv(tmp_path / "raw" / "holidays_events.csv")
+    event = holidays[holidays["date"] == "2016-12-26"].assign(type="Event", description="Extra event")
+    pd.concat([holidays, event]).to_csv(tmp_path / "raw" / "holidays_events.csv", index=False)
+    full_merge(tmp_path / "raw", data_acquisition, tmp_path / "train.parquet")
+
+    result = load_dataframe(tmp_path / "train.parquet")
+    train = pd.read_csv(raw_dir / "train.csv", parse_dates=["date"])
+    rows = result["date"].value_counts()
+    expected = train["date"].value_counts()
+    # Every event of a priced day gets its own copy of the day's rows
+    assert rows[pd.Timestamp("2016-12-26")] == 2 * expected[pd.Timestamp("2016-12-26")]
+    others = rows.index != pd.Timestamp("2016-12-26")
+    assert (rows[others] == expected[rows.index[others]]).all()
+    # Weekend holidays (no oil price) do not reach the rows
+    assert result.loc[result["date"] == "2016-12-24", "type_y"].isna().all()
+    assert result.loc[result["date"] == "2016-12-26", "type_y"].notna().all()
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+from ml_service.components.calendar_features import CalendarFeatures
+from ml_service.components.feature_plan import FeaturePlan, CAT_COLUMNS
+from ml_service.components.lag_features import LagFeatureGenerator
+from tests.conftest import feature_frame
+
+TRAIN_END = pd.Timestamp("2016-12-31")
+SCALE_MARKERS = ["sales_lag_", "sales_roll", "sales_expanding", "onpromotion_trend", "month_sales_interaction",
+                 "dcoilwtico", "transactions"]
+STORES = {1: ("Quito", "Pichincha", "D", 13), 2: ("Quito", "Pichincha", "A", 8),
+          3: ("Guayaquil", "Guayas", "D", 1), 4: ("Cuenca", "Azuay", "B", 6)}
+
+
+def add_inputs(df, calendar, seed=0):
+    """Store attributes, oil and transactions of feature-stage rows, then the calendar features."""
+    rng = np.random.default_rng(seed)
+    df = df.drop(columns="day_of_week")
+    for i, col in enumerate(["city", "state", "type_x"]):
+        df[col] = pd.Categorical(df["store_nbr"].map({store: values[i] for store, values in STORES.items()}))
+    df["cluster"] = df["store_nbr"].map({store: values[3] for store, values in STORES.items()})
+    df["transactions"] = rng.integers(500, 3000, len(df))
+    df["dcoilwtico"] = rng.uniform(30, 60, len(df))
+    df["id"] = np.arange(len(df))
+    df = calendar.transform(df)
+    df["onpromotion_trend"] = df["onpromotion"].astype(np.int32) * df["day_of_year"]
+    return df
+
+
+@pytest.fixture(scope="module")
+def stage(raw_dir):
+    """Training rows, scaler, lag state and offline test rows as the feature stage builds them."""
+    calendar = CalendarFeatures(pd.read_csv(raw_dir / "holidays_events.csv", parse_dates=["date"]))
+    lags = LagFeatureGenerator()
+    train = add_inputs(feature_frame(end=TRAIN_END), calendar)
+    lags.update_state(train)
+
+    # Test rows: the horizon after the training data, featurized together with it
+    test = add_inputs(feature_frame(start=TRAIN_END + pd.Timedelta(days=1),
+                                    end=TRAIN_END + pd.Timedelta(days=lags.horizon), seed=1), calendar, seed=1)
+    test["sales"] = np.nan
+    combined = LagFeatureGenerator().transform(pd.concat([train, test], ignore_index=True))
+
+    encoded = pd.concat([combined, pd.get_dummies(combined[CAT_COLUMNS], drop_first=True, dtype=np.int8)], axis=1)
+    scale_columns = [col for col in encoded.columns if any(marker in col for marker in SCALE_MARKERS)]
+    scaler = MinMaxScaler().fit(encoded[scale_columns].iloc[:len(train)])
+    encoded[scale_columns] = scaler.transform(encoded[scale_columns])
+    feature_names = [col for col in encoded.columns if col not in CAT_COLUMNS + ["sales", "date"]]
+    return {"calendar": calendar, "lags": lags, "scaler": scaler, "feature_names": feature_names,
+            "test": test, "test_features": encoded.iloc[len(train):].reset_index(drop=True)}
+
+
+def request_inputs(test: pd.DataFrame) -> dict:
+    """Prediction inputs ({field: list of values}) of test rows, dates as strings."""
+    fields = ["date", "family", "state", "city", "type_x", "type_y", "onpromotion", "dcoilwtico",
+              "transactions", "store_nbr", "cluster"]
+    inputs = {field: test[field].astype(object).tolist() for field in fields}
+    inputs["date"] = [str(date.date()) for date in test["date"]]
+    return inputs
+
+
+def old_align_features(inputs: dict, stage: dict, vocabulary=None) -> pd.DataFrame:
+    """app.py's pandas path before FeaturePlan: process_features followed by align_features."""
+    df = pd.DataFrame(inputs)
+    df["date"] = pd.to_datetime(df["date"])
+    df = stage["calendar"].transform(df)
+    df["onpromotion_trend"] = df["onpromotion"].astype(np.int32) * df["day_of_year"]
+    df["month_sales_interaction"] = 0
+    if vocabulary is not None:
+        for col in CAT_COLUMNS:
+            df[col] = pd.Categorical(df[col], categories=vocabulary[col])
+    else:
+        df = pd.get_dummies(df, columns=CAT_COLUMNS, dtype=int)
+    df = df.reindex(columns=stage["feature_names"], fill_value=0)
+    scale_columns = [col for col in df.columns if any(marker in col for marker in SCALE_MARKERS)]
+    df[scale_columns] = stage["scaler"].transform(df[scale_columns])
+    return df
+
+
+def test_input_columns_match_the_old_alignment(stage):
+    plan = FeaturePlan(stage["feature_names"], stage["calendar"], stage["scaler"], lag_state=stage["lags"])
+    inputs = request_inputs(stage["test"])
+    X = pd.DataFrame(plan.transform(inputs), columns=plan.feature_names)
+    old = old_align_features(inputs, stage)
+
+    sourced = [col for col in plan.feature_names if col not in stage["lags"].columns + ["id"]]
+    assert len(sourced) > 25 and any(col.startswith("state_") for col in sourced)
+    np.testing.assert_allclose(X[sourced].to_numpy(), old[sourced].to_numpy(dtype=np.float64), rtol=1e-6, atol=1e-6)
+
+
+def test_sales_features_match_the_offline_test_rows(stage):
+    plan = FeaturePlan(stage["feature_names"], stage["calendar"], stage["scaler"], lag_state=stage["lags"])
+    X = pd.DataFrame(plan.transform(request_inputs(stage["test"])), columns=plan.feature_names)
+    lag_columns = stage["lags"].columns
+
+    expected = stage["test_features"][lag_columns].to_numpy(dtype=np.float64)
+    assert not np.isnan(expected).any()
+    np.testing.assert_allclose(X[lag_columns].to_numpy(), expected, rtol=1e-5, atol=1e-6)
+    # The old alignment served the scaled 0 of every sales feature instead
+    old = old_align_features(request_inputs(stage["test"]), stage)
+    assert not np.allclose(old[lag_columns].to_numpy(dtype=np.float64), expected)
+
+
+def test_unknown_values_are_missing(stage):
+    plan = FeaturePlan(stage["feature_names"], stage["calendar"], stage["scaler"], lag_state=stage["lags"])
+    test = stage["test"].iloc[:3].copy()
+    # Past the stored horizon, an unseen store, and a date in the horizon
+    test["date"] = [TRAIN_END + pd.Timedelta(days=30), TRAIN_END + pd.Timedelta(days=1),
+                    TRAIN_END + pd.Timedelta(days=16)]
+    test["store_nbr"] = [1, 9, 4]
+    X = pd.DataFrame(plan.transform(request_inputs(test)), columns=plan.feature_names)
+
+    lag_columns = stage["lags"].columns
+    assert X.loc[:1, lag_columns].isna().all().all()
+    assert X.loc[2, lag_columns].notna().all()
+    # No source at all: unknown rather than a made-up 0
+    assert X["id"].isna().all()
+
+    # Without a lag state every sales feature is missing
+    X = pd.DataFrame(FeaturePlan(stage["feature_names"], stage["calendar"], stage["scaler"])
+                     .transform(request_inputs(test)), columns=plan.feature_names)
+    assert X[lag_columns].isna().all().all()
+
+
+# The old alignment builds categoricals from values outside the vocabulary
+@pytest.mark.filterwarnings("ignore:Constructing a Categorical")
+def test_category_codes_match_the_old_alignment(stage):
+    vocabulary = {col: [str(value) for value in stage["test"][col].astype("category").cat.categories]
+                  for col in CAT_COLUMNS}
+    feature_names = [col for col in stage["feature_names"] if not col.startswith(tuple(CAT_COLUMNS))] + CAT_COLUMNS
+    plan = FeaturePlan(feature_names, stage["calendar"], stage["scaler"], vocabulary, stage["lags"])
+    inputs = request_inputs(stage["test"])
+    inputs["family"][0] = "UNSEEN"
+    X = plan.frame(plan.transform(inputs))
+
+    old = old_align_features(inputs, {**stage, "feature_names": feature_names}, vocabulary)
+    for col in CAT_COLUMNS:
+        np.testing.assert_array_equal(X[col].cat.codes.to_numpy(), old[col].cat.codes.to_numpy())
+        assert list(X[col].cat.categories) == vocabulary[col]
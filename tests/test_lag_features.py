@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ml_service.components.lag_features import LagFeatureGenerator
+
+HORIZON = 16
+LAGS = [16, 21, 28]
+WINDOWS = [7, 28]
+
+
+def panel(n_days=200, test_days=HORIZON, seed=0, level=50.0):
+    """Three store/family series with a few missing days; the last `test_days` days have no sales."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2016-06-01", periods=n_days + test_days, freq="D")
+    dates = dates[~dates.isin(pd.to_datetime(["2016-12-25"]))]
+    keys = [(1, "BEVERAGES"), (1, "DAIRY"), (2, "BEVERAGES")]
+    df = pd.DataFrame([(date, store, family) for date in dates for store, family in keys],
+                      columns=["date", "store_nbr", "family"])
+    df["family"] = df["family"].astype("category")
+    df["sales"] = level + rng.gamma(2.0, 10.0, len(df))
+    df.loc[df["date"] > dates[n_days - 1], "sales"] = np.nan
+    return df
+
+
+def generator(**kwargs):
+    return LagFeatureGenerator(lags=LAGS, rolling_windows=WINDOWS, horizon=HORIZON, **kwargs)
+
+
+def reference(df):
+    """Same features with pandas, per series on a daily calendar shifted by the horizon."""
+    out = []
+    for _, group in df.groupby(["store_nbr", "family"], observed=True):
+        daily = group.set_index("date")["sales"].asfreq("D")
+        known = daily.shift(HORIZON)
+        features = pd.DataFrame({f"sales_lag_{lag}": daily.shift(lag) for lag in LAGS})
+        for window in WINDOWS:
+            features[f"sales_roll_mean_{window}"] = known.rolling(window, min_periods=1).mean()
+            features[f"sales_roll_std_{window}"] = known.rolling(window, min_periods=2).std()
+        features["sales_expanding_mean"] = known.expanding(min_periods=1).mean()
+        out.append(group[["date"]].join(features, on="date").drop(columns="date"))
+    return pd.concat(out).loc[df.index]
+
+
+def test_features_match_a_pandas_reference():
+    df = panel()
+    result = generator().transform(df.copy())
+    expected = reference(df)
+    for col in expected.columns:
+        np.testing.assert_allclose(result[col], expected[col], rtol=1e-5, atol=1e-4, err_msg=col)
+
+
+def test_validation_and_test_rows_get_lags_as_densely_as_train_rows():
+    df = panel()
+    lags = generator()
+    result = lags.transform(df.copy())
+
+    first_complete = df["date"].min() + pd.Timedelta(days=lags.lookback)
+    validation_start = pd.Timestamp("2016-11-15")
+    is_test = df["sales"].isna()
+    splits = {
+        "train": (df["date"] >= first_complete) & (df["date"] < validation_start),
+        "validation": (df["date"] >= validation_start) & ~is_test,
+        "test": is_test,
+    }
+    density = {name: result.loc[rows, lags.columns].notna().mean() for name, rows in splits.items()}
+    # Christmas is missing from the data, so a few lags of every split read an empty day
+    assert density["train"].min() > 0.95
+    for name in ["validation", "test"]:
+        pd.testing.assert_series_equal(density[name], density["train"], atol=0.02, check_names=False)
+    # The test period is within the horizon of the last known sales: nothing reads an unknown day
+    assert result.loc[is_test, lags.columns].notna().all().all()
+
+
+def test_features_never_read_sales_within_the_horizon():
+    df = panel()
+    origin = pd.Timestamp("2016-10-01")
+    changed = df.copy()
+    changed.loc[changed["date"] > origin, "sales"] *= 10
+
+    before = generator().transform(df.copy())
+    after = generator().transform(changed)
+    visible = df["date"] <= origin + pd.Timedelta(days=HORIZON)
+    pd.testing.assert_frame_equal(after.loc[visible], before.loc[visible].assign(sales=changed["sales"]))
+    assert not np.allclose(after.loc[~visible, "sales_lag_16"], before.loc[~visible, "sales_lag_16"])
+
+
+def test_rolling_std_is_exact_for_a_large_level():
+    # sum(x^2) - n * mean^2 from prefix sums loses every digit of a unit spread at this level
+    df = panel(level=1e7)
+    result = generator().transform(df.copy())
+    expected = reference(df)
+    for window in WINDOWS:
+        col = f"sales_roll_std_{window}"
+        np.testing.assert_allclose(result[col], expected[col], rtol=1e-4, err_msg=col)
+
+
+def test_stored_state_gives_the_same_features_for_new_days():
+    df = panel()
+    split = pd.Timestamp("2016-11-01")
+    full = generator().transform(df.copy())
+
+    lags = generator()
+    old = df[df["date"] < split]
+    lags.update_state(lags.transform(old.copy()))
+    new = lags.transform(df[df["date"] >= split].copy(), from_state=True)
+    pd.testing.assert_frame_equal(new, full[df["date"] >= split])
+
+
+def test_lags_shorter_than_the_horizon_are_rejected():
+    with pytest.raises(ValueError, match="shorter than the 16-day horizon"):
+        LagFeatureGenerator(lags=[1, 16], horizon=16)
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ml_service.components.data_processing import DataProcessor
+from ml_service.utils.main_utils import ChunkedDataFrameWriter, load_dataframe
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_chunked_writer_keeps_missing_values_of_integer_columns(tmp_path, suffix):
+    first = pd.DataFrame({"store_nbr": np.array([1, 2], dtype=np.int8),
+                          "transactions": np.array([10, 20], dtype=np.int16)})
+    # A left merge upcasts the int16 column to float when a row finds no match
+    later = pd.DataFrame({"store_nbr": np.array([3, 4], dtype=np.int8), "transactions": [30.0, np.nan]})
+
+    with ChunkedDataFrameWriter(tmp_path / f"chunked{suffix}") as writer:
+        writer.write(first)
+        writer.write(later)
+
+    result = load_dataframe(tmp_path / f"chunked{suffix}")
+    assert result["transactions"].tolist()[:3] == [10, 20, 30]
+    assert result["transactions"].isna().tolist() == [False, False, False, True]
+
+
+def test_chunked_writer_rejects_values_the_schema_cannot_hold(tmp_path):
+    with pytest.raises(ValueError, match="transactions"):
+        with ChunkedDataFrameWriter(tmp_path / "chunked.parquet") as writer:
+            writer.write(pd.DataFrame({"transactions": np.array([10], dtype=np.int16)}))
+            writer.write(pd.DataFrame({"transactions": [2.5]}))
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_chunked_merge_matches_in_memory_merge(tmp_path, raw_dir, data_acquisition, suffix):
+    def processor():
+        return DataProcessor(raw_dir, data_acquisition.data_files, data_acquisition.schema,
+                             data_acquisition.date_format)
+
+    processor().load().interpolate_oil().merge_train_test().merge_holidays_and_oil() \
+        .drop_irrelevant_columns().save(tmp_path / f"train{suffix}", tmp_path / f"test{suffix}")
+    processor().load(exclude=["train", "test"]).interpolate_oil() \
+        .merge_in_chunks(tmp_path / f"train_chunked{suffix}", tmp_path / f"test_chunked{suffix}", chunk_size=1000)
+
+    expected = load_dataframe(tmp_path / f"train{suffix}")
+    result = load_dataframe(tmp_path / f"train_chunked{suffix}")
+    # Closed days (New Year) have no transactions, well after the first chunk
+    first_missing = np.flatnonzero(expected["transactions"].isna().to_numpy())
+    assert len(first_missing) and first_missing[0] >= 1000
+    assert not result["transactions"].iloc[:1000].isna().any()
+    pd.testing.assert_frame_equal(result, expected, check_categorical=False)
@@ -0,0 +1,166 @@
+import asyncio
+import threading
+import time
+import numpy as np
+import pytest
+from ml_service.components.micro_batcher import MicroBatcher
+
+
+class RecordingModel:
+    """Predicts 10 * x for every row and records the batches it was called with."""
+
+    def __init__(self, fail_on=None) -> None:
+        self.batches = []
+        self.fail_on = fail_on
+
+    def __call__(self, inputs):
+        self.batches.append(list(inputs["x"]))
+        if self.fail_on in inputs["x"]:
+            raise ValueError("bad row")
+        return np.asarray(inputs["x"], dtype=np.float32) * 10
+
+
+async def submit_all(batcher, values):
+    return await asyncio.gather(*(batcher.submit({"x": value}) for value in values), return_exceptions=True)
+
+
+def test_every_caller_gets_its_own_prediction_in_order():
+    model = RecordingModel()
+
+    async def run():
+        batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=50)
+        batcher.start()
+        results = await submit_all(batcher, range(10))
+        await batcher.stop()
+        return results, batcher.metrics()
+
+    results, metrics = asyncio.run(run())
+    assert results == [10.0 * value for value in range(10)]
+    # Full batches go out at once, oldest rows first, and never exceed the limit
+    assert model.batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert metrics["batches"] == 3 and metrics["rows"] == 10
+    assert metrics["batch_size_histogram"] == {"2": 1, "4": 2}
+
+
+def test_a_lone_row_waits_at_most_max_wait():
+    model = RecordingModel()
+
+    async def run():
+        batcher = MicroBatcher(model, max_batch_size=64, max_wait_ms=20)
+        batcher.start()
+        started = time.perf_counter()
+        result = await batcher.submit({"x": 3})
+        elapsed = time.perf_counter() - started
+        await batcher.stop()
+        return result, elapsed
+
+    result, elapsed = asyncio.run(run())
+    assert result == 30.0 and model.batches == [[3]]
+    assert 0.015 <= elapsed < 1.0
+
+
+def test_rows_arriving_during_a_predict_form_the_next_batch():
+    release = threading.Event()
+    batches = []
+
+    def predict(inputs):
+        batches.append(list(inputs["x"]))
+        release.wait(5)
+        return np.asarray(inputs["x"], dtype=np.float32)
+
+    async def run():
+        batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=1)
+        batcher.start()
+        first = asyncio.ensure_future(batcher.submit({"x": 0}))
+        while not batches:
+            await asyncio.sleep(0.001)
+        later = [asyncio.ensure_future(batcher.submit({"x": value})) for value in (1, 2, 3)]
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(first, *later)
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(run()) == [0.0, 1.0, 2.0, 3.0]
+    assert batches == [[0], [1, 2, 3]]
+
+
+def test_a_failed_batch_fails_only_its_callers():
+    model = RecordingModel(fail_on=1)
+
+    async def run():
+        batcher = MicroBatcher(model, max_batch_size=2, max_wait_ms=50)
+        batcher.start()
+        results = await submit_all(batcher, range(4))
+        await batcher.stop()
+        return results, batcher.metrics()
+
+    results, metrics = asyncio.run(run())
+    assert [type(result) for result in results[:2]] == [ValueError, ValueError]
+    assert results[2:] == [20.0, 30.0]
+    assert metrics["failed_batches"] == 1 and metrics["batches"] == 2
+
+
+def test_stop_cancels_queued_and_in_flight_rows():
+    release = threading.Event()
+    started = threading.Event()
+
+    def predict(inputs):
+        started.set()
+        release.wait(5)
+        return np.asarray(inputs["x"], dtype=np.float32)
+
+    async def run():
+        batcher = MicroBatcher(predict, max_batch_size=2, max_wait_ms=1)
+        batcher.start()
+        calls = [asyncio.ensure_future(batcher.submit({"x": value})) for value in range(5)]
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        # One batch is being scored, the other rows are queued
+        assert len(batcher.in_flight) == 2 and len(batcher.pending) == 3
+        await batcher.stop()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        release.set()
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert not batcher.pending
+    assert batcher.task.done()
+
+
+def test_a_cancelled_caller_does_not_break_its_batch():
+    model = RecordingModel()
+
+    async def run():
+        batcher = MicroBatcher(model, max_batch_size=3, max_wait_ms=20)
+        batcher.start()
+        calls = [asyncio.ensure_future(batcher.submit({"x": value})) for value in range(3)]
+        await asyncio.sleep(0)
+        calls[1].cancel()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert results[0] == 0.0 and results[2] == 20.0
+    assert isinstance(results[1], asyncio.CancelledError)
+    assert model.batches == [[0, 1, 2]]
+
+
+@pytest.mark.parametrize("max_batch_size", [1, 3])
+def test_batch_sizes_never_exceed_the_limit(max_batch_size):
+    model = RecordingModel()
+
+    async def run():
+        batcher = MicroBatcher(model, max_batch_size=max_batch_size, max_wait_ms=2)
+        batcher.start()
+        results = []
+        for wave in range(4):
+            results += await submit_all(batcher, range(wave * 5, wave * 5 + 5))
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(run()) == [10.0 * value for value in range(20)]
+    assert max(len(batch) for batch in model.batches) <= max_batch_size
+    assert [value for batch in model.batches for value in batch] == list(range(20))
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from ml_service.components.model_tuning import ModelTuning
+
+SEARCH = {
+    "N_TRIALS": 9, "MIN_BOOST_ROUNDS": 4, "HALVING_FACTOR": 3, "N_ESTIMATORS": 36,
+    "EARLY_STOPPING_ROUNDS": 5, "METRIC": "RMSE",
+    "SEARCH_SPACE": {"LEARNING_RATE": {"low": 0.3, "high": 0.9}, "MAX_DEPTH": {"low": 3, "high": 6, "int": True}},
+}
+
+
+def make_tuning(config_manager, features_file=None, **params):
+    sections = {"modelTuning": {"workers": 1}}
+    if features_file is not None:
+        sections["modelBuildingAndEvaluation"] = {"input_train_file": str(features_file.with_suffix("")),
+                                                  "training_data": {"mode": "cached"}}
+        sections["artifact_format"] = {"partitioned": False}
+    manager = config_manager(params={**SEARCH, **params}, **sections)
+    return ModelTuning(manager.get_model_tuning_config(), manager.get_modelBuilding_and_evaluation_config())
+
+
+def diverging_matrices(seed=0):
+    """Validation labels opposite to the training signal, so validation RMSE is best after a few rounds."""
+    rng = np.random.default_rng(seed)
+    X, X_val = rng.normal(size=(2000, 5)), rng.normal(size=(500, 5))
+    y = X[:, 0] + 0.1 * rng.normal(size=2000)
+    y_val = 0.3 * X_val[:, 0] - X_val[:, 0] ** 2
+    return xgb.DMatrix(X, label=y), xgb.DMatrix(X_val, label=y_val)
+
+
+def test_rungs_multiply_rounds_and_cut_trials(config_manager):
+    tuning = make_tuning(config_manager, EARLY_STOPPING_ROUNDS=0)
+    assert tuning.rung_rounds() == [4, 12, 36]
+
+    dtrain, dvalid = diverging_matrices()
+    best, log = tuning.search(dtrain, dvalid)
+    per_rung = pd.DataFrame(log).groupby("rung").agg(trials=("trial", "size"), rounds=("rounds", "first"))
+    assert per_rung["trials"].tolist() == [9, 3, 1]
+    assert per_rung["rounds"].tolist() == [4, 12, 36]
+
+    # Survivors of a rung are its best trials
+    for rung in (0, 1):
+        ranked = [entry["trial"] for entry in log if entry["rung"] == rung]
+        survivors = {entry["trial"] for entry in log if entry["rung"] == rung + 1}
+        assert survivors == set(ranked[:len(survivors)])
+    assert best["booster"].num_boosted_rounds() == 36
+
+
+def test_best_score_carries_across_rungs(config_manager):
+    tuning = make_tuning(config_manager)
+    dtrain, dvalid = diverging_matrices()
+    _, log = tuning.search(dtrain, dvalid)
+
+    # A trial's score never gets worse from one rung to the next
+    scores = pd.DataFrame(log).pivot(index="trial", columns="rung", values="score")
+    for a, b in zip(scores.columns[:-1], scores.columns[1:]):
+        both = scores[[a, b]].dropna()
+        assert (both[b] <= both[a] + 1e-9).all()
+
+    # ... and is the best over every round of its booster, not only the last rung's
+    y_val = dvalid.get_label()
+    for trial in _trained_through_every_rung(tuning, dtrain, dvalid):
+        booster = trial["booster"]
+        rmse = [np.sqrt(np.mean((booster.predict(dvalid, iteration_range=(0, k)) - y_val) ** 2))
+                for k in range(1, booster.num_boosted_rounds() + 1)]
+        assert trial["best_iteration"] == int(np.argmin(rmse))
+        assert np.isclose(trial["score"], min(rmse), rtol=1e-4)
+        # Stopped once the best is `patience` rounds behind, in whichever rung that happened
+        assert len(rmse) - 1 - trial["best_iteration"] <= 5 or not trial["stopped"]
+
+
+def _trained_through_every_rung(tuning, dtrain, dvalid):
+    """Every trial continued through all rungs, without halving."""
+    trials = [{"trial": i, "params": params, "booster": None, "score": None,
+               "best_iteration": None, "stopped": False}
+              for i, params in enumerate(tuning.sample_candidates())]
+    for rounds in tuning.rung_rounds():
+        trials = [tuning.train_trial(trial, rounds, dtrain, dvalid, n_jobs=1) for trial in trials]
+    return trials
+
+
+def test_trials_are_ranked_before_the_validation_split(config_manager, features_file):
+    tuning = make_tuning(config_manager, features_file)
+    tuning_start, tuning_end = tuning.tuning_range()
+    assert tuning_end == pd.Timestamp(tuning.model_config.validation_start)
+    assert tuning_end - tuning_start == pd.Timedelta(days=tuning.config.tuning_days)
+
+    dtrain, dvalid = tuning.load_matrices()
+    dates = pd.read_parquet(features_file, columns=["date"])["date"]
+    assert dtrain.num_row() == (dates < tuning_start).sum()
+    assert dvalid.num_row() == ((dates >= tuning_start) & (dates < tuning_end)).sum()
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from ml_service.components.modelBuilding_and_evaluation import regression_metrics
+from ml_service.components.segment_metrics import SegmentMetrics
+from tests.conftest import feature_frame
+
+COLUMNS = ["store_nbr", "family", "date"]
+
+
+@pytest.fixture(scope="module")
+def scored_rows():
+    df = feature_frame(end="2016-03-31")
+    rng = np.random.default_rng(1)
+    # Some negative predictions, clipped for RMSLE as in regression_metrics
+    y_pred = df["sales"].to_numpy() + rng.normal(0, 20, len(df))
+    return df, y_pred
+
+
+def assert_same_result(result, expected):
+    assert result.keys() == expected.keys()
+    for column in expected:
+        assert list(result[column]) == list(expected[column])
+        for group, metrics in expected[column].items():
+            assert result[column][group]["rows"] == metrics["rows"]
+            for name in ("rmse", "mae", "rmsle"):
+                assert result[column][group][name] == pytest.approx(metrics[name], rel=1e-9)
+
+
+def test_matches_regression_metrics_per_group(scored_rows):
+    df, y_pred = scored_rows
+    result = SegmentMetrics(COLUMNS).update(df, df["sales"], y_pred).result()
+
+    for column in COLUMNS:
+        for group, rows in df.groupby(column, observed=True).groups.items():
+            label = str(group.date()) if column == "date" else str(group)
+            positions = df.index.get_indexer(rows)
+            expected = regression_metrics(df["sales"].to_numpy()[positions], y_pred[positions])
+            assert result[column][label]["rows"] == len(positions)
+            for name, value in expected.items():
+                assert result[column][label][name] == pytest.approx(value, rel=1e-9)
+
+
+@pytest.mark.parametrize("chunks", [2, 7, 50])
+def test_merged_chunks_equal_one_pass(scored_rows, chunks):
+    df, y_pred = scored_rows
+    expected = SegmentMetrics(COLUMNS).update(df, df["sales"], y_pred).result()
+
+    # Shuffled rows split into chunks scored by separate accumulators, as in worker processes
+    order = np.random.default_rng(chunks).permutation(len(df))
+    parts = [SegmentMetrics(COLUMNS).update(df.iloc[rows], df["sales"].iloc[rows], y_pred[rows])
+             for rows in np.array_split(order, chunks)]
+    merged = SegmentMetrics(COLUMNS)
+    for part in parts:
+        merged.merge(part)
+    assert_same_result(merged.result(), expected)
+
+    # Chunks of consecutive days: most groups of `date` appear in one chunk only
+    streamed = SegmentMetrics(COLUMNS)
+    for rows in np.array_split(np.arange(len(df)), chunks):
+        streamed.update(df.iloc[rows], df["sales"].iloc[rows], y_pred[rows])
+    assert_same_result(streamed.result(), expected)
+
+
+def test_empty_accumulator_merges_as_identity(scored_rows):
+    df, y_pred = scored_rows
+    filled = SegmentMetrics(COLUMNS).update(df, df["sales"], y_pred)
+    assert SegmentMetrics(COLUMNS).result() == {}
+    assert_same_result(SegmentMetrics(COLUMNS).merge(filled).result(), filled.result())
+    assert_same_result(filled.merge(SegmentMetrics(COLUMNS)).result(),
+                       SegmentMetrics(COLUMNS).update(df, df["sales"], y_pred).result())
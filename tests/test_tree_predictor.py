@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from xgboost import XGBRegressor
+from ml_service.components.segment_router import SegmentRouter
+from ml_service.components.tree_predictor import CompiledTreeEnsemble, compile_model
+from tests.conftest import feature_frame
+
+
+def numeric_frame(seed=0, rows=3000):
+    """Numeric features with missing values, so default directions are exercised."""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(rows, 6)), columns=[f"x{i}" for i in range(6)]).astype(np.float32)
+    y = 3 * X["x0"] - X["x1"] ** 2 + np.where(X["x2"] > 0, 2.0, -1.0) + rng.normal(0, 0.1, rows)
+    X = X.mask(rng.random(X.shape) < 0.1)
+    # Non-negative for the log-link objectives
+    return X, (y + 10).clip(lower=0).astype(np.float32)
+
+
+def fit(X, y, **params):
+    return XGBRegressor(n_estimators=40, max_depth=6, learning_rate=0.3, random_state=0,
+                        **params).fit(X, y)
+
+
+@pytest.mark.parametrize("objective", ["reg:squarederror", "reg:tweedie", "reg:absoluteerror"])
+def test_numeric_model_matches_xgboost(objective):
+    X, y = numeric_frame()
+    model = fit(X, y, objective=objective)
+    compiled = CompiledTreeEnsemble.from_model(model)
+
+    expected = model.predict(X)
+    np.testing.assert_allclose(compiled.predict(X), expected, rtol=1e-5, atol=1e-4)
+    # Arrays in feature order take the same path as app.py's float32 matrix
+    np.testing.assert_allclose(compiled.predict(X.to_numpy()), expected, rtol=1e-5, atol=1e-4)
+
+
+def test_categorical_model_matches_xgboost():
+    df = feature_frame(end="2016-06-30")
+    X = df.drop(columns=["sales", "date"])
+    model = fit(X, df["sales"], enable_categorical=True, tree_method="hist", max_cat_to_onehot=1)
+    compiled = CompiledTreeEnsemble.from_model(model)
+    np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=1e-5, atol=1e-3)
+
+    # Categories in another order (or subset) map back to the training codes
+    shuffled = X.copy()
+    shuffled["family"] = shuffled["family"].cat.reorder_categories(shuffled["family"].cat.categories[::-1])
+    np.testing.assert_allclose(compiled.predict(shuffled), model.predict(X), rtol=1e-5, atol=1e-3)
+
+
+@pytest.mark.parametrize("chunk_cells", [1, 40 * 7, 40 * 1000])
+def test_chunked_predictions_equal_one_pass(monkeypatch, chunk_cells):
+    df = feature_frame(end="2016-06-30")
+    X = df.drop(columns=["sales", "date"])
+    compiled = CompiledTreeEnsemble.from_model(fit(X, df["sales"], enable_categorical=True, tree_method="hist",
+                                                   max_cat_to_onehot=1))
+    expected = compiled.predict(X)
+
+    # 1 row at a time, 7-row chunks with a shorter last chunk, and chunks longer than the input
+    monkeypatch.setattr(CompiledTreeEnsemble, "MAX_CHUNK_CELLS", chunk_cells)
+    np.testing.assert_array_equal(compiled.predict(X), expected)
+    assert compiled.predict(X.iloc[:0]).shape == (0,)
+
+
+def test_compiled_router_matches_its_models():
+    X, y = numeric_frame()
+    segments = np.where(X["x3"].fillna(0) > 0, "A", "B")
+    router = SegmentRouter("store_type", {segment: fit(X[segments == segment], y[segments == segment])
+                                          for segment in ("A", "B")})
+    compiled = compile_model(router)
+    assert all(isinstance(model, CompiledTreeEnsemble) for model in compiled.models.values())
+    np.testing.assert_allclose(compiled.predict(X, segments), router.predict(X, segments), rtol=1e-5, atol=1e-4)
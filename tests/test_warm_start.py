@@ -0,0 +1,58 @@
+import joblib
+import pandas as pd
+import pytest
+from ml_service.components.modelBuilding_and_evaluation import ModelBuildingAndEvaluation, regression_metrics
+from tests.conftest import feature_frame
+
+
+@pytest.fixture
+def warm_start_process(config_manager, features_file):
+    """Stage 4 over `features_file` with a saved model to warm-start from."""
+    def make(mode="add_trees", early_stopping_rounds=5):
+        config = config_manager(
+            params={"N_ESTIMATORS": 20, "EARLY_STOPPING_ROUNDS": early_stopping_rounds},
+            modelBuildingAndEvaluation={"input_train_file": str(features_file.with_suffix("")),
+                                        "warm_start": {"enabled": True, "mode": mode, "new_trees": 10,
+                                                       "window_days": 56, "holdout_days": 16}},
+            artifact_format={"partitioned": False},
+        ).get_modelBuilding_and_evaluation_config()
+        process = ModelBuildingAndEvaluation(config)
+        X, y = process.load_split((None, pd.Timestamp(config.validation_start)))
+        model = process.fit_model(process.build_model(params={"EARLY_STOPPING_ROUNDS": 0}), X, y)
+        joblib.dump(model, config.path_of_model)
+        process.load_data()
+        return process
+    return make
+
+
+def test_window_ends_at_the_newest_days(warm_start_process):
+    process = warm_start_process()
+    newest = feature_frame()["date"].max()
+    ranges = process.warm_start_ranges()
+
+    # Holdout, early-stopping days and window are consecutive and disjoint, newest first
+    assert ranges["holdout"] == (newest - pd.Timedelta(days=15), newest + pd.Timedelta(days=1))
+    assert ranges["early_stopping"] == (newest - pd.Timedelta(days=31), ranges["holdout"][0])
+    assert ranges["window"] == (newest - pd.Timedelta(days=71), ranges["early_stopping"][0])
+    # Days after validation_start are trained on once they arrive
+    assert ranges["window"][1] > pd.Timestamp(process.config.validation_start)
+
+
+def test_refresh_without_early_stopping_trains_up_to_the_holdout(warm_start_process):
+    ranges = warm_start_process(mode="refresh_leaves").warm_start_ranges()
+    assert set(ranges) == {"window", "holdout"}
+    assert ranges["window"][1] == ranges["holdout"][0]
+    assert ranges["window"][1] - ranges["window"][0] == pd.Timedelta(days=56)
+
+
+def test_promotion_is_scored_on_the_holdout(warm_start_process):
+    process = warm_start_process()
+    process.train_model()
+    report = process.warm_start_report
+
+    X_holdout, y_holdout = process.warm_start_sets["holdout"]
+    assert report["holdout_rows"] == len(y_holdout) == 16 * 12
+    assert report["previous"] == regression_metrics(y_holdout, process.previous_model.predict(X_holdout))
+    metric = str(process.config.all_params["METRIC"]).lower()
+    assert report["promoted"] == (report["candidate"][metric] <= report["previous"][metric])
+    assert report["ranges"]["holdout"][1] == str(feature_frame()["date"].max().date())